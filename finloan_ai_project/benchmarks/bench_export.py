@@ -0,0 +1,103 @@
+"""Memory and throughput of the streaming exports at growing table sizes.
+
+Peak Python memory (tracemalloc) should stay flat as the table grows. Also
+reports how long pandas takes to load the exported file. Uses a scratch
+database (see benchmarks/settings.py). Run from the project directory:
+
+    python benchmarks/bench_export.py [--rows 10000,100000,1000000]
+        [--format csv|ndjson|parquet|arrow] [--gzip]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django
+
+django.setup()
+
+from django.test import Client
+
+from benchmarks.fixtures import database_path, fill_applications, prepare_database
+
+
+def stream(client, query, out=None):
+    response = client.get('/export-csv/' + query)
+    size = 0
+    for chunk in response.streaming_content:
+        size += len(chunk)
+        if out is not None:
+            out.write(chunk)
+    return size
+
+
+def load_seconds(client, query, export_format):
+    """Time loading the exported file into a pandas DataFrame"""
+    import pandas as pd
+
+    with tempfile.NamedTemporaryFile(suffix='.' + export_format) as out:
+        stream(client, query, out)
+        out.flush()
+        start = time.perf_counter()
+        if export_format == 'parquet':
+            pd.read_parquet(out.name)
+        elif export_format == 'arrow':
+            import pyarrow as pa
+            with pa.ipc.open_stream(out.name) as reader:
+                reader.read_pandas()
+        elif export_format == 'ndjson':
+            pd.read_json(out.name, lines=True)
+        else:
+            pd.read_csv(out.name)
+        return time.perf_counter() - start
+
+
+def export(client, query):
+    """Stream one export, returning (bytes, seconds, peak traced bytes).
+
+    Time and memory are measured in separate passes, as tracemalloc slows
+    the export down considerably.
+    """
+    start = time.perf_counter()
+    size = stream(client, query)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    stream(client, query)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default='10000,100000,1000000')
+    parser.add_argument('--format', default='csv', choices=['csv', 'ndjson', 'parquet', 'arrow'])
+    parser.add_argument('--gzip', action='store_true')
+    args = parser.parse_args()
+
+    prepare_database()
+    print(f"database: {database_path()}")
+    client = Client()
+    query = f'?format={args.format}' + ('&gzip=1' if args.gzip else '')
+
+    # Warm up imports and URL resolution so they are not counted
+    stream(client, query + '&status=Warmup')
+
+    for rows in sorted(int(n) for n in args.rows.split(',')):
+        rows = fill_applications(rows)
+        size, elapsed, peak = export(client, query)
+        line = (f"{rows:>9} rows: {size / 1e6:8.1f} MB in {elapsed:6.2f}s "
+                f"({rows / elapsed:8.0f} rows/s), peak traced memory {peak / 1e6:6.2f} MB")
+        if not args.gzip:
+            line += f", pandas load {load_seconds(client, query, args.format):6.2f}s"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
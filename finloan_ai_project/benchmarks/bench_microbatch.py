@@ -0,0 +1,148 @@
+"""Throughput of concurrent predictions: direct predict() vs the micro-batcher.
+
+Simulates N concurrent clients, each scoring applications back to back:
+as N threads (threaded WSGI) and as N coroutines on one event loop (ASGI,
+where direct calls go through a thread pool of N workers). Reports
+predictions per second and p50/p99 latency for the compiled scorer and
+the sklearn pipeline. Run from the project directory:
+
+    python benchmarks/bench_microbatch.py [--concurrency 50,100,200,500]
+        [--requests 20000] [--window 0.002] [--max-size 64]
+        [--server thread,async] [--scorer compiled,sklearn]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finloan_ai.settings')
+
+import django
+
+django.setup()
+
+from bench_predict import sample_application
+from loan_predictor.batching import MicroBatcher
+from loan_predictor.ml_predictor import LoanPredictor
+
+
+def thread_load(predict, concurrency, requests):
+    """Seconds and per-call latencies for `requests` calls from `concurrency` threads"""
+    latencies = []
+    barrier = threading.Barrier(concurrency + 1)
+    
+    def client(calls):
+        application = sample_application()
+        own = []
+        barrier.wait()
+        for _ in range(calls):
+            start = time.perf_counter()
+            predict(application)
+            own.append(time.perf_counter() - start)
+        latencies.extend(own)
+    
+    threads = [threading.Thread(target=client, args=(calls,)) for calls in split(requests, concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def async_load(apredict, concurrency, requests):
+    """thread_load() with `concurrency` coroutines on one event loop"""
+    latencies = []
+    
+    async def client(calls):
+        application = sample_application()
+        for _ in range(calls):
+            start = time.perf_counter()
+            await apredict(application)
+            latencies.append(time.perf_counter() - start)
+    
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*(client(calls) for calls in split(requests, concurrency)))
+        return time.perf_counter() - start
+    
+    return asyncio.run(main()), latencies
+
+
+def split(requests, concurrency):
+    return [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+
+
+def direct_async(predictor, concurrency):
+    """Direct predict() for coroutines, through a pool of `concurrency` threads"""
+    pool = ThreadPoolExecutor(concurrency)
+    
+    async def apredict(application):
+        return await asyncio.get_running_loop().run_in_executor(pool, predictor.predict, application)
+    return apredict
+
+
+def report(label, seconds, latencies, baseline=None):
+    latencies = np.array(latencies) * 1e3
+    throughput = len(latencies) / seconds
+    line = (f"{label:<28}{throughput:>10.0f}/s   p50 {np.percentile(latencies, 50):7.2f} ms"
+            f"   p99 {np.percentile(latencies, 99):7.2f} ms")
+    if baseline:
+        line += f"   {throughput / baseline:5.1f}x"
+    print(line)
+    return throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', default='50,100,200,500')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--window', type=float, default=0.002)
+    parser.add_argument('--max-size', type=int, default=64)
+    parser.add_argument('--server', default='thread,async')
+    parser.add_argument('--scorer', default='compiled,sklearn')
+    args = parser.parse_args()
+    
+    predictor = LoanPredictor()
+    predictor.load_models()
+    bundle = predictor.bundle
+    if bundle is None:
+        sys.exit('No model bundle loaded, nothing to benchmark')
+    compiled = bundle.compiled
+    if bundle.models is None:
+        # Serving artifact: rebuild the sklearn estimators for the reference path
+        bundle.models, bundle.encoders, bundle.scaler = bundle.build_estimators()
+    
+    batcher = MicroBatcher(predictor, window=args.window, max_size=args.max_size)
+    for scorer in args.scorer.split(','):
+        bundle.compiled = compiled if scorer == 'compiled' else None
+        if scorer == 'compiled' and compiled is None:
+            print("compiled scorer unavailable, skipped")
+            continue
+        # sklearn calls are ~100x slower; keep its runs short
+        requests = args.requests if scorer == 'compiled' else max(args.requests // 10, 1000)
+        print(f"\n{scorer} scorer, {requests} predictions, window {args.window * 1e3:g} ms, "
+              f"max {args.max_size}")
+        for concurrency in [int(c) for c in args.concurrency.split(',')]:
+            if 'thread' in args.server:
+                baseline = report(f'thread  c={concurrency} direct',
+                                  *thread_load(predictor.predict, concurrency, requests))
+                report(f'thread  c={concurrency} batched',
+                       *thread_load(batcher.predict, concurrency, requests), baseline)
+            if 'async' in args.server:
+                baseline = report(f'async   c={concurrency} direct',
+                                  *async_load(direct_async(predictor, concurrency), concurrency, requests))
+                report(f'async   c={concurrency} batched',
+                       *async_load(batcher.apredict, concurrency, requests), baseline)
+    bundle.compiled = compiled
+
+
+if __name__ == '__main__':
+    main()
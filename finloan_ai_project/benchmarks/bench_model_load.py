@@ -0,0 +1,102 @@
+"""Load time and memory of the serving artifact vs the four joblib files.
+
+Each load runs in a fresh interpreter (after Django and pandas are imported,
+as in a worker), so import and unpickling costs are included. Also checks
+that both bundles give the same probabilities. Run from the project directory:
+
+    python benchmarks/bench_model_load.py [--repeat 5]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finloan_ai.settings')
+
+JOBLIB_FILES = ['loan_models.joblib', 'encoders.joblib', 'scaler.joblib', 'features.joblib']
+SERVING_FILES = ['loan_serving.npz']
+
+CHILD = '''
+import json, sys, time, warnings
+warnings.simplefilter('ignore')
+sys.path.insert(0, {project!r})
+from loan_predictor.ml_predictor import ModelBundle, resident_memory_mb
+before = resident_memory_mb()
+start = time.perf_counter()
+bundle = ModelBundle.load({directory!r}, 'bench')
+bundle.compile()
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'rss_mb': resident_memory_mb() - before,
+                  'compiled': bundle.compiled is not None}}))
+'''
+
+
+def bundle_dir(files):
+    """Temporary directory holding only the given files of ml_models/"""
+    directory = tempfile.mkdtemp(prefix='finloan_bundle_')
+    for name in files:
+        os.symlink(os.path.join(PROJECT_DIR, 'ml_models', name), os.path.join(directory, name))
+    return directory
+
+
+def measure(directory, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', CHILD.format(project=PROJECT_DIR, directory=directory)],
+            check=True, capture_output=True, text=True, env=os.environ,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(PROJECT_DIR, 'ml_models', 'loan_serving.npz')):
+        sys.exit('ml_models/loan_serving.npz missing: run train_loan_model.py --serving-only in ml_models/')
+
+    import warnings
+    warnings.simplefilter('ignore')
+    import numpy as np
+    from loan_predictor.ml_predictor import ModelBundle
+
+    directories = {'joblib (4 files)': bundle_dir(JOBLIB_FILES), 'serving .npz': bundle_dir(SERVING_FILES)}
+    sizes = {
+        label: sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        for label, directory in directories.items()
+    }
+
+    print(f"{'bundle':<18}{'size':>10}{'load (median)':>16}{'RSS growth':>13}")
+    for label, directory in directories.items():
+        runs = measure(directory, args.repeat)
+        seconds = statistics.median(run['seconds'] for run in runs)
+        rss = statistics.median(run['rss_mb'] for run in runs)
+        print(f"{label:<18}{sizes[label] / 1024:>8.0f} KB{seconds * 1000:>13.1f} ms{rss:>10.1f} MB")
+
+    # Same predictions from both bundles
+    joblib_bundle = ModelBundle.load(directories['joblib (4 files)'], 'joblib')
+    serving_bundle = ModelBundle.load(directories['serving .npz'], 'serving')
+    joblib_bundle.compile()
+    serving_bundle.compile()
+    mean = np.asarray(joblib_bundle.scaler.mean_)
+    scale = np.asarray(joblib_bundle.scaler.scale_)
+    X = np.vstack([mean + k * scale for k in np.linspace(-3, 3, 61)])
+    expected = joblib_bundle.models['logistic_regression'].predict_proba(joblib_bundle.scaler.transform(X))[:, 1]
+    difference = np.max(np.abs(serving_bundle.compiled.probabilities(X) - expected))
+    print(f"max probability difference vs sklearn: {difference:.3g}")
+
+    for directory in directories.values():
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
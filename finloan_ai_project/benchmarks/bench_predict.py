@@ -0,0 +1,79 @@
+"""Per-call latency of LoanPredictor.predict: compiled scorer vs sklearn pipeline.
+
+Also reports LoanPredictor.predict_many throughput on unsaved applications.
+Run from the project directory:
+
+    python benchmarks/bench_predict.py [--calls 20000] [--batch-rows 200000]
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finloan_ai.settings')
+
+import django
+
+django.setup()
+
+from loan_predictor.ml_predictor import LoanPredictor
+from loan_predictor.models import LoanApplication
+
+
+def sample_application():
+    return LoanApplication(
+        applicant_name='Benchmark', gender='Male', married='Yes', dependents='1',
+        education='Graduate', self_employed='No', applicant_income=5000,
+        coapplicant_income=2000, loan_amount=150, loan_amount_term=360,
+        credit_history=True, property_area='Urban',
+    )
+
+
+def time_per_call(func, calls):
+    """Best-of-5 latency in microseconds"""
+    best = min(timeit.repeat(func, number=calls, repeat=5))
+    return best / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--batch-rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    predictor = LoanPredictor()
+    predictor.load_models()
+    if predictor.compiled is None:
+        sys.exit('Compiled scorer unavailable, nothing to compare')
+    application = sample_application()
+
+    compiled = predictor.compiled
+    compiled_result = predictor.predict(application)
+    compiled_us = time_per_call(lambda: predictor.predict(application), args.calls)
+
+    bundle = predictor.bundle
+    if bundle.models is None:
+        # Serving artifact: rebuild the sklearn estimators for the reference path
+        bundle.models, bundle.encoders, bundle.scaler = bundle.build_estimators()
+    bundle.compiled = None
+    sklearn_result = predictor.predict(application)
+    sklearn_us = time_per_call(lambda: predictor.predict(application), max(args.calls // 100, 10))
+    bundle.compiled = compiled
+
+    difference = abs(compiled_result['approval_probability'] - sklearn_result['approval_probability'])
+    print(f"sklearn pipeline : {sklearn_us:10.1f} us/call")
+    print(f"compiled scorer  : {compiled_us:10.1f} us/call")
+    print(f"speedup          : {sklearn_us / compiled_us:10.1f}x")
+    print(f"probability diff : {difference:10.3g} (percentage points)")
+
+    applications = [sample_application() for _ in range(args.batch_rows)]
+    start = time.perf_counter()
+    predictor.predict_many(applications, chunk_size=10000)
+    elapsed = time.perf_counter() - start
+    print(f"predict_many     : {args.batch_rows / elapsed:10.0f} rows/s ({args.batch_rows} rows in {elapsed:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
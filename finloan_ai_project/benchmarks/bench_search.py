@@ -0,0 +1,76 @@
+"""Applicant search: FTS5 index vs the old icontains scan, at growing table sizes.
+
+Times the dashboard's first page (50 newest matches) for a set of name
+prefixes sampled from the table. Uses a scratch database (see
+benchmarks/settings.py). Run from the project directory:
+
+    python benchmarks/bench_search.py [--rows 100000,1000000] [--queries 20]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django
+
+django.setup()
+
+from django.db.models import Q
+
+from benchmarks.fixtures import database_path, fill_applications, prepare_database
+from loan_predictor.models import LoanApplication
+from loan_predictor.search import search_applications
+
+
+def first_page_ms(queryset):
+    start = time.perf_counter()
+    list(queryset.order_by('-created_at')[:50])
+    return (time.perf_counter() - start) * 1000
+
+
+def icontains(text):
+    return LoanApplication.objects.filter(
+        Q(applicant_name__icontains=text) | Q(loan_status__icontains=text)
+    )
+
+
+def sample_queries(count, seed=7):
+    """Name prefixes of random lengths taken from existing applicants"""
+    rng = random.Random(seed)
+    high = LoanApplication.objects.order_by('-id').values_list('id', flat=True).first()
+    queries = []
+    while len(queries) < count:
+        name = LoanApplication.objects.filter(id__gte=rng.randint(1, high)).values_list(
+            'applicant_name', flat=True).first()
+        if name:
+            surname = name.split()[-1]
+            queries.append(surname[:rng.randint(3, len(surname))])
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default='100000,1000000')
+    parser.add_argument('--queries', type=int, default=20)
+    args = parser.parse_args()
+
+    prepare_database()
+    print(f"database: {database_path()}")
+
+    for rows in sorted(int(n) for n in args.rows.split(',')):
+        rows = fill_applications(rows)
+        queries = sample_queries(args.queries)
+        old = [first_page_ms(icontains(q)) for q in queries]
+        new = [first_page_ms(search_applications(LoanApplication.objects.all(), q)) for q in queries]
+        print(f"{rows:>9} rows: icontains median {statistics.median(old):8.2f} ms "
+              f"(max {max(old):8.2f}), FTS5 median {statistics.median(new):8.2f} ms "
+              f"(max {max(new):8.2f})")
+
+
+if __name__ == '__main__':
+    main()
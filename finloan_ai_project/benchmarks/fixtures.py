@@ -0,0 +1,88 @@
+"""Scratch-database and dataset helpers shared by the benchmarks."""
+import os
+import random
+import tempfile
+
+from django.core.management import call_command
+from django.db import connection
+
+from loan_predictor.models import LoanApplication
+from loan_predictor.stats import rebuild_stats
+from loan_predictor.synthetic import FIRST_NAMES, SYLLABLES, write_csv
+
+
+def prepare_database():
+    """Create the benchmark schema if needed"""
+    call_command('migrate', verbosity=0)
+
+
+def fill_applications(rows, seed=42, batch_size=10000):
+    """Grow the applications table to `rows` rows of random applications"""
+    existing = LoanApplication.objects.count()
+    rng = random.Random(seed + existing)
+    
+    while existing < rows:
+        batch = min(batch_size, rows - existing)
+        LoanApplication.objects.bulk_create(
+            [random_application(rng, existing + i) for i in range(batch)],
+            batch_size=batch_size,
+        )
+        existing += batch
+    
+    # bulk_create bypasses the counter signals
+    rebuild_stats()
+    return existing
+
+
+def random_application(rng, index):
+    """One random LoanApplication (unsaved)"""
+    status = rng.choice(['Approved', 'Rejected', None])
+    return LoanApplication(
+        applicant_name=f'{rng.choice(FIRST_NAMES)} {random_surname(rng)}',
+        gender=rng.choice(['Male', 'Female']),
+        married=rng.choice(['Yes', 'No']),
+        dependents=rng.choice(['0', '1', '2', '3+']),
+        education=rng.choice(['Graduate', 'Not Graduate']),
+        self_employed=rng.choice(['Yes', 'No']),
+        applicant_income=rng.randint(1000, 20000),
+        coapplicant_income=rng.choice([0, rng.randint(500, 8000)]),
+        loan_amount=rng.randint(20, 600),
+        loan_amount_term=rng.choice([180, 240, 360, 480]),
+        credit_history=rng.random() < 0.85,
+        property_area=rng.choice(['Urban', 'Semiurban', 'Rural']),
+        loan_status=status,
+        approval_probability=rng.uniform(0, 100) if status else None,
+    )
+
+
+def random_surname(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+DATASET_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'loan_dataset.csv'
+)
+
+
+def scaled_dataset(rows, seed=42):
+    """Path of a CSV shaped like data/loan_dataset.csv with `rows` rows.
+
+    Rows come from the synthetic generator (loan_predictor.synthetic), so
+    category, missing-value and joint frequencies stay realistic. rows=0
+    returns the real dataset. Files are cached in the temp directory by size
+    and seed.
+    """
+    if not rows:
+        return DATASET_PATH
+    path = os.path.join(tempfile.gettempdir(), f'finloan_dataset_{rows}_{seed}.csv')
+    if os.path.exists(path):
+        return path
+    
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    write_csv(tmp_path, rows, seed, DATASET_PATH)
+    os.replace(tmp_path, path)
+    return path
+
+
+def database_path():
+    return connection.settings_dict['NAME']
@@ -0,0 +1,16 @@
+"""Django settings for benchmarks: the project settings on a scratch database."""
+import os
+import tempfile
+
+from finloan_ai.settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get(
+            'FINLOAN_BENCH_DB', os.path.join(tempfile.gettempdir(), 'finloan_bench.sqlite3')
+        ),
+    }
+}
+
+ALLOWED_HOSTS = ['testserver']
@@ -0,0 +1,242 @@
+"""Benchmark suite for the scoring, training and web paths.
+
+Runs offline against data/loan_dataset.csv, synthetic datasets and
+a scratch database (see benchmarks/settings.py) grown to each --rows size.
+Every result is "lower is better" and written as JSON; pass --baseline to
+compare with an earlier run (exit status 1 on regressions). Run from the
+project directory:
+
+    python benchmarks/suite.py [--rows 10000,100000,1000000]
+        [--train-rows 0,5000] [--only predict,train,views]
+        [--output results.json] [--baseline baseline.json] [--tolerance 0.2]
+
+--train-rows 0 means the real 614-row dataset. train_models() runs single-job
+with default parameters, as the training script does without options.
+"""
+import argparse
+import contextlib
+import datetime
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django
+
+django.setup()
+
+from django.test import Client
+
+from benchmarks.fixtures import database_path, fill_applications, prepare_database, scaled_dataset
+from loan_predictor.ml_predictor import LoanPredictor
+from loan_predictor.models import LoanApplication
+
+GROUPS = ['predict', 'train', 'views']
+
+FORM_DATA = {
+    'applicant_name': 'Benchmark Applicant', 'gender': 'Male', 'married': 'Yes',
+    'dependents': '1', 'education': 'Graduate', 'self_employed': 'No',
+    'applicant_income': 5000, 'coapplicant_income': 2000, 'loan_amount': 150,
+    'loan_amount_term': 360, 'credit_history': 'on', 'property_area': 'Urban',
+}
+
+
+def sample_application():
+    return LoanApplication(
+        applicant_name='Benchmark', gender='Male', married='Yes', dependents='1',
+        education='Graduate', self_employed='No', applicant_income=5000,
+        coapplicant_income=2000, loan_amount=150, loan_amount_term=360,
+        credit_history=True, property_area='Urban',
+    )
+
+
+def per_call(func, number, repeat=5):
+    """Best-of-`repeat` seconds per call"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def once(func):
+    """Seconds for one call, and its return value"""
+    start = time.perf_counter()
+    value = func()
+    return time.perf_counter() - start, value
+
+
+def predict_cases(args):
+    predictor = LoanPredictor()
+    predictor.load_models()
+    application = sample_application()
+    n = args.calls
+
+    yield 'predict.preprocess_application', per_call(
+        lambda: predictor.preprocess_application(application), n) * 1e6, 'us/call'
+    yield 'predict.predict', per_call(lambda: predictor.predict(application), n) * 1e6, 'us/call'
+    yield 'predict.rule_based_prediction', per_call(
+        lambda: predictor.rule_based_prediction(application), n) * 1e6, 'us/call'
+
+    bundle = predictor.bundle
+    if bundle is not None:
+        compiled = bundle.compiled
+        if bundle.models is None:
+            bundle.models, bundle.encoders, bundle.scaler = bundle.build_estimators()
+        bundle.compiled = None
+        yield 'predict.predict[sklearn]', per_call(
+            lambda: predictor.predict(application), max(n // 100, 10)) * 1e6, 'us/call'
+        bundle.compiled = compiled
+
+    applications = [sample_application() for _ in range(args.batch_rows)]
+    seconds, _ = once(lambda: predictor.predict_many(applications, chunk_size=10000))
+    yield 'predict.predict_many', seconds / args.batch_rows * 1e6, 'us/row'
+
+
+def load_training_module():
+    path = os.path.join(PROJECT_DIR, 'ml_models', 'train_loan_model.py')
+    spec = importlib.util.spec_from_file_location('train_loan_model', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def train_cases(args):
+    training = load_training_module()
+    for rows in args.train_rows:
+        csv_path = scaled_dataset(rows)
+        label = f'rows={rows or "dataset"}'
+        trainer = training.LoanPredictor()
+        # The training script reports progress with print()
+        with contextlib.redirect_stdout(io.StringIO()):
+            load_seconds, df = once(lambda: trainer.load_and_preprocess_data(csv_path))
+            encode_seconds, df_encoded = once(lambda: trainer.encode_features(df))
+            train_seconds, _ = once(lambda: trainer.train_models(df_encoded))
+        yield f'train.load_and_preprocess_data[{label}]', load_seconds, 's'
+        yield f'train.encode_features[{label}]', encode_seconds, 's'
+        yield f'train.train_models[{label}]', train_seconds, 's'
+
+
+def drain(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def view_cases(args):
+    prepare_database()
+    client = Client()
+    # Warm up imports, templates and URL resolution
+    drain(client.get('/admin-dashboard/'))
+
+    for rows in args.rows:
+        fill_applications(rows)
+        label = f'rows={rows}'
+
+        def apply():
+            response = client.post('/apply/', FORM_DATA)
+            assert response.status_code == 302, response.status_code
+
+        yield f'views.loan_application_view[{label}]', per_call(apply, args.requests, 3) * 1e3, 'ms/request'
+        yield f'views.admin_dashboard_view[{label}]', per_call(
+            lambda: drain(client.get('/admin-dashboard/')), args.requests, 3) * 1e3, 'ms/request'
+        yield f'views.admin_dashboard_view[{label},filtered]', per_call(
+            lambda: drain(client.get('/admin-dashboard/?status=Approved&education=Graduate&search=Rahul')),
+            args.requests, 3) * 1e3, 'ms/request'
+        seconds, _ = once(lambda: drain(client.get('/export-csv/')))
+        yield f'views.export_applications_csv[{label}]', seconds, 's'
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Print current vs baseline; returns the names that regressed"""
+    regressions = []
+    print(f"\n{'benchmark':<58}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            print(f"{name:<58}{'-':>12}{result['value']:>12.4g}{'new':>9}")
+            continue
+        change = result['value'] / before['value'] - 1 if before['value'] else 0.0
+        flag = ''
+        if change > tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<58}{before['value']:>12.4g}{result['value']:>12.4g}{change:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default='10000,100000,1000000',
+                        help='Table sizes for the view benchmarks')
+    parser.add_argument('--train-rows', default='0,5000',
+                        help='Training set sizes (0 = data/loan_dataset.csv)')
+    parser.add_argument('--only', default=','.join(GROUPS),
+                        help=f'Comma-separated groups: {",".join(GROUPS)}')
+    parser.add_argument('--calls', type=int, default=20000, help='Calls per timing for predictor benchmarks')
+    parser.add_argument('--batch-rows', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=20, help='Requests per timing for view benchmarks')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown vs baseline before flagging (0.2 = 20%%)')
+    args = parser.parse_args()
+    args.rows = sorted(int(n) for n in args.rows.split(','))
+    args.train_rows = sorted(int(n) for n in args.train_rows.split(','))
+
+    groups = [group.strip() for group in args.only.split(',')]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+
+    cases = {'predict': predict_cases, 'train': train_cases, 'views': view_cases}
+    if 'views' in groups:
+        print(f"database: {database_path()}")
+
+    results = {}
+    for group in groups:
+        for name, value, unit in cases[group](args):
+            results[name] = {'value': value, 'unit': unit}
+            print(f"{name:<58}{value:>12.4g} {unit}", flush=True)
+
+    report = {
+        'meta': {
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,14 @@
+# ASGI entry point, e.g. gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker finloan_ai.asgi
+#
+# home, loan_result_view, get_application_data and api/score/ are async
+# views: under ASGI one worker serves many of them concurrently, with
+# inference on the micro-batcher's bounded thread pool (loan_predictor/batching.py).
 import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finloan_ai.settings')
 application = get_asgi_application()
+
+# Load and warm the models now, not on the first request (LOAN_PREDICTOR_EAGER_LOAD)
+from loan_predictor.apps import load_for_serving  # noqa: E402
+load_for_serving()
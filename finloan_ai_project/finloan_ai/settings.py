@@ -32,6 +32,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'loan_predictor.middleware.RequestMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'finloan_ai.urls'
@@ -96,3 +97,88 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# ML prediction
+# Score with the compiled (pandas-free) logistic regression instead of sklearn
+LOAN_PREDICTOR_COMPILED = True
+# Load and warm the models when the WSGI/ASGI application is created instead of on
+# first request; management commands (migrate, test, ...) never load them
+LOAN_PREDICTOR_EAGER_LOAD = True
+# gc.freeze() after loading, so preloaded models stay shared between forked workers
+LOAN_PREDICTOR_GC_FREEZE = True
+# Versioned model bundles (see loan_predictor/model_registry.py); without a
+# CURRENT pointer the unversioned ml_models/*.joblib files are used
+LOAN_MODEL_REGISTRY = os.path.join(BASE_DIR, 'ml_models', 'registry')
+# Seconds between checks of the registry pointer (0 disables hot reload)
+LOAN_MODEL_RELOAD_INTERVAL = 5
+# Memory-mapped training features extracted from LoanApplication by
+# manage.py train_model (see loan_predictor/feature_cache.py)
+LOAN_FEATURE_CACHE = os.path.join(BASE_DIR, 'ml_models', 'feature_cache')
+# Share of predictions whose inputs/scores are logged when the
+# loan_predictor.ml_predictor.payload logger is at DEBUG
+LOAN_PREDICTOR_DEBUG_SAMPLE_RATE = 0.01
+# Combine concurrent predictions into one vectorized call (see
+# loan_predictor/batching.py): up to SIZE applications collected for at most
+# WINDOW seconds. Worth it for the sklearn pipeline and async views; the
+# compiled scorer is faster called directly from threads
+# (benchmarks/bench_microbatch.py)
+LOAN_PREDICTOR_MICROBATCH = os.environ.get('LOAN_PREDICTOR_MICROBATCH', '') == '1'
+LOAN_PREDICTOR_MICROBATCH_WINDOW = 0.002
+LOAN_PREDICTOR_MICROBATCH_SIZE = 64
+# Threads async views score on when micro-batching is off
+LOAN_PREDICTOR_ASYNC_WORKERS = 4
+
+# Scoring of submitted applications (see loan_predictor/scoring_queue.py):
+# 'sync' scores in the request, 'thread' saves as Pending and scores on
+# in-process worker threads, 'db' leaves Pending rows for manage.py score_pending
+LOAN_SCORING_MODE = os.environ.get('LOAN_SCORING_MODE', 'sync')
+LOAN_SCORING_WORKERS = 2
+# Worker micro-batches: up to this many applications, collected for at most LINGER seconds
+LOAN_SCORING_BATCH_SIZE = 256
+LOAN_SCORING_LINGER = 0.005
+# Seconds the result page waits for a queued application before showing Pending
+LOAN_SCORING_RESULT_WAIT = 1.0
+# Times the result page then reloads itself before showing "still queued"
+LOAN_SCORING_RESULT_REFRESHES = 30
+
+# Cache of predict() results keyed by the preprocessed application and the
+# model bundle (see loan_predictor/prediction_cache.py): up to SIZE results
+# per process (0 disables), plus a shared tier in the CACHES alias below
+# (None disables it) whose entries expire after TIMEOUT seconds. Off by
+# default: a hit saves little over the compiled scorer; it pays off with
+# LOAN_PREDICTOR_COMPILED = False or a shared tier
+LOAN_PREDICTION_CACHE_SIZE = 0
+LOAN_PREDICTION_CACHE_ALIAS = None
+LOAN_PREDICTION_CACHE_TIMEOUT = 3600
+
+# Serve in-process metrics at /metrics (Prometheus text format)
+LOAN_METRICS_ENABLED = True
+
+# Logging
+# loan_predictor logs through a queue, so writes never block a request.
+# Set per-logger levels here, e.g. 'loan_predictor.ml_predictor.payload': DEBUG
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'background': {
+            'class': 'loan_predictor.log.QueueStreamHandler',
+            'formatter': 'plain',
+        },
+    },
+    'loggers': {
+        'loan_predictor': {
+            'handlers': ['background'],
+            'level': os.environ.get('LOAN_PREDICTOR_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'loan_predictor.ml_predictor.payload': {
+            'level': 'WARNING',
+        },
+    },
+}
@@ -3,3 +3,7 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'finloan_ai.settings')
 application = get_wsgi_application()
+
+# Load and warm the models now, not on the first request (LOAN_PREDICTOR_EAGER_LOAD)
+from loan_predictor.apps import load_for_serving  # noqa: E402
+load_for_serving()
@@ -0,0 +1,17 @@
+# Gunicorn settings: gunicorn -c gunicorn.conf.py finloan_ai.wsgi
+#
+# preload_app imports finloan_ai.wsgi (which loads and warms the ML models,
+# see loan_predictor.apps.load_for_serving) once in the master process. Forked
+# workers then share the model memory copy-on-write and never serve a cold
+# request.
+
+bind = '0.0.0.0:8000'
+workers = 4
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Database connections must never be shared across processes
+    from django.db import connections
+    for connection in connections.all():
+        connection.close()
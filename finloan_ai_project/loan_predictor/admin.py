@@ -19,7 +19,7 @@ class LoanApplicationAdmin(admin.ModelAdmin):
         'created_at'
     ]
     search_fields = ['applicant_name', 'loan_status']
-    readonly_fields = ['loan_status', 'approval_probability', 'created_at']
+    readonly_fields = ['loan_status', 'approval_probability', 'model_version', 'created_at']
     
     fieldsets = (
         ('Personal Information', {
@@ -35,7 +35,7 @@ class LoanApplicationAdmin(admin.ModelAdmin):
             'fields': ('credit_history', 'property_area')
         }),
         ('ML Prediction Results', {
-            'fields': ('loan_status', 'approval_probability', 'created_at'),
+            'fields': ('loan_status', 'approval_probability', 'model_version', 'created_at'),
             'classes': ('collapse',)
         }),
     )
@@ -1,5 +1,53 @@
+import gc
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_migrate
+
+logger = logging.getLogger(__name__)
 
 class LoanPredictorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'loan_predictor'
+    
+    def ready(self):
+        # Keep the dashboard counters table in sync with LoanApplication
+        from . import signals  # noqa: F401
+        
+        # Migrations that rebuild the applications table drop the search triggers
+        from .search import repair_search_index
+        post_migrate.connect(repair_search_index, sender=self)
+    
+    def load_predictor(self):
+        """Load and warm the ML models once, at startup.
+
+        Called through load_for_serving() by the WSGI/ASGI entry points. With
+        gunicorn --preload (see gunicorn.conf.py) this runs in the master
+        before workers fork, so they share the model pages copy-on-write.
+        """
+        from .ml_predictor import loan_predictor
+        
+        stats = loan_predictor.warm_up()
+        resident = f"{stats['resident_mb']:.0f} MB" if stats['resident_mb'] is not None else 'unknown'
+        logger.info(
+            "Loan predictor ready: load %.0f ms, warm-up %.1f ms, RSS %s, ml_models=%s, compiled=%s, version=%s",
+            stats['load_seconds'] * 1000, stats['warm_up_seconds'] * 1000, resident,
+            stats['ml_models'], stats['compiled'], stats['model_version'],
+        )
+        
+        # Move everything loaded so far out of the GC's reach, so collections
+        # in forked workers don't touch (and copy) the shared pages
+        if getattr(settings, 'LOAN_PREDICTOR_GC_FREEZE', False):
+            gc.freeze()
+
+
+def load_for_serving():
+    """Eager-load the predictor from finloan_ai/wsgi.py and asgi.py.
+
+    Kept out of ready() so migrate, makemigrations, test and other management
+    commands don't pay for loading the models or gc.freeze().
+    """
+    if getattr(settings, 'LOAN_PREDICTOR_EAGER_LOAD', False):
+        from django.apps import apps
+        apps.get_app_config('loan_predictor').load_predictor()
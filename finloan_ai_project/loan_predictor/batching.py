@@ -0,0 +1,140 @@
+"""Micro-batching of concurrent predictions inside the web process.
+
+Under concurrent load most of the cost of scoring one application is
+per-call overhead (building the input, one sklearn or NumPy call per row).
+MicroBatcher queues applications from any number of request threads or
+coroutines; a dispatcher thread collects them for up to `window` seconds
+or `max_size` applications and scores them with one
+LoanPredictor.predict_many call, then hands every caller its own result.
+
+predict() blocks the calling thread (threaded WSGI, sync views);
+apredict() awaits the same future from an event loop (ASGI, async views).
+With LOAN_PREDICTOR_MICROBATCH off, predict() scores the application
+directly and apredict() on a bounded pool of LOAN_PREDICTOR_ASYNC_WORKERS
+threads, so concurrent async requests queue for inference instead of each
+taking a thread. Batched or not, results go through the predictor's
+prediction cache: hits are answered without queueing.
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+
+from .metrics import ERRORS, Histogram
+from .ml_predictor import loan_predictor
+
+logger = logging.getLogger(__name__)
+
+BATCH_ROWS = Histogram(
+    'loan_predictor_microbatch_rows',
+    'Applications scored per micro-batch.',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+
+
+class MicroBatcher:
+    """Combine concurrent predict() calls into vectorized predict_many() calls.
+    
+    The dispatcher thread and the executor start on first use in each
+    process, so they survive forking web servers.
+    """
+    
+    def __init__(self, predictor, window=0.002, max_size=64, enabled=True, async_workers=4):
+        self.predictor = predictor
+        self.window = window
+        self.max_size = max_size
+        self.enabled = enabled
+        self.async_workers = async_workers
+        self.queue = queue.SimpleQueue()
+        self.executor = None
+        self._lock = threading.Lock()
+        self._pid = None
+    
+    def start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A forked child inherits the queue and executor but not their threads
+            self.queue = queue.SimpleQueue()
+            self.executor = ThreadPoolExecutor(self.async_workers, thread_name_prefix='loan-predict')
+            threading.Thread(target=self.run, name='loan-microbatch', daemon=True).start()
+            self._pid = os.getpid()
+    
+    def submit(self, application, cache_entry=None):
+        """Queue an application; returns a concurrent.futures.Future of its result.
+        
+        cache_entry is from LoanPredictor.cached_prediction(); the result is
+        cached under it once scored.
+        """
+        if self._pid != os.getpid():
+            self.start()
+        future = Future()
+        self.queue.put((application, cache_entry, future))
+        return future
+    
+    def predict(self, application):
+        """Same result as LoanPredictor.predict(), scored in a micro-batch"""
+        if not self.enabled:
+            return self.predictor.predict(application)
+        result, cache_entry = self.predictor.cached_prediction(application)
+        if result is not None:
+            return result
+        return self.submit(application, cache_entry).result()
+    
+    async def apredict(self, application):
+        """predict() for async code; never blocks the event loop"""
+        if not self.enabled:
+            if self._pid != os.getpid():
+                self.start()
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.predictor.predict, application
+            )
+        result, cache_entry = self.predictor.cached_prediction(application)
+        if result is not None:
+            return result
+        return await asyncio.wrap_future(self.submit(application, cache_entry))
+    
+    def next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            BATCH_ROWS.observe(len(batch))
+            try:
+                results = self.predictor.predict_many(
+                    [application for application, _, _ in batch], chunk_size=len(batch)
+                )
+            except Exception as e:
+                logger.exception("Scoring a micro-batch of %d applications failed", len(batch))
+                ERRORS.inc('microbatch')
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, cache_entry, future), result in zip(batch, results):
+                self.predictor.cache_prediction(cache_entry, result)
+                future.set_result(result)
+
+
+micro_batcher = MicroBatcher(
+    loan_predictor,
+    window=getattr(settings, 'LOAN_PREDICTOR_MICROBATCH_WINDOW', 0.002),
+    max_size=getattr(settings, 'LOAN_PREDICTOR_MICROBATCH_SIZE', 64),
+    enabled=getattr(settings, 'LOAN_PREDICTOR_MICROBATCH', False),
+    async_workers=getattr(settings, 'LOAN_PREDICTOR_ASYNC_WORKERS', 4),
+)
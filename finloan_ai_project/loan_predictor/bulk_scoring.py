@@ -0,0 +1,278 @@
+"""Stateless bulk scoring for POST api/score/batch/.
+
+Rows are read from the request body as they arrive (NDJSON objects, or CSV
+with a header row), validated like LoanApplicationForm, scored in
+vectorized chunks and written back in the input's format, one result per
+input row, as soon as each chunk is scored. Only one chunk is held in
+memory. With persist, valid rows are saved with bulk_create and the
+dashboard counters adjusted to match.
+"""
+import codecs
+import csv
+import io
+import itertools
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .forms import LoanApplicationForm, LoanScoringForm
+from .metrics import Counter
+from .ml_predictor import SCORING_FIELDS, loan_predictor
+from .models import LoanApplication
+from .stats import add_contribution, application_contribution, apply_deltas, new_deltas
+
+BATCH_CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+}
+
+# Dataset column names (data/loan_dataset.csv) are accepted as CSV headers too
+COLUMN_FIELDS = {column: field for field, column in SCORING_FIELDS.items()}
+# CSV cells carry no types: these decode to credit_history booleans
+CSV_BOOLEANS = {'1': True, '1.0': True, 'true': True, 'yes': True,
+                '0': False, '0.0': False, 'false': False, 'no': False, '': False}
+CSV_COLUMNS = ['row', 'id', 'approved', 'approval_probability', 'confidence', 'model_version', 'errors']
+
+CHOICE_FIELDS = ['gender', 'married', 'dependents', 'education', 'self_employed', 'property_area']
+INTEGER_RE = re.compile(r'-?\d{1,9}')
+
+BULK_ROWS = Counter(
+    'loan_predictor_bulk_rows',
+    'Rows received by api/score/batch/, by outcome (scored, invalid, saved).',
+    ['outcome'],
+)
+
+
+def checkbox_value(value):
+    """credit_history as the form's CheckboxInput reads it"""
+    if isinstance(value, str):
+        value = {'true': True, 'false': False}.get(value.lower(), value)
+    return bool(value)
+
+
+class RowValidator:
+    """Clean row dicts as form_class would.
+    
+    Rows already in canonical form (valid choice strings, integers,
+    booleans) are checked with set lookups; any other row goes through
+    form_class itself, so the rules and error messages are the form's.
+    """
+    
+    def __init__(self, form_class):
+        self.form_class = form_class
+        fields = form_class.base_fields
+        self.choices = {name: {value for value, _ in fields[name].choices if value} for name in CHOICE_FIELDS}
+        self.name_length = fields['applicant_name'].max_length if 'applicant_name' in fields else None
+    
+    def clean(self, data):
+        """(applicant_name, *SCORING_FIELDS values), or None and the form errors"""
+        values = self.fast_clean(data)
+        if values is not None:
+            return values, None
+        form = self.form_class(data)
+        if not form.is_valid():
+            return None, form.errors.get_json_data()
+        return (form.cleaned_data.get('applicant_name', ''),
+                *(form.cleaned_data[field] for field in SCORING_FIELDS)), None
+    
+    def fast_clean(self, data):
+        """Cleaned values of a canonical row, None for anything the form should judge"""
+        if self.name_length is None:
+            values = ['']
+        else:
+            name = data.get('applicant_name')
+            if not isinstance(name, str):
+                return None
+            name = name.strip()
+            if not 0 < len(name) <= self.name_length or '\x00' in name:
+                return None
+            values = [name]
+        
+        for field in SCORING_FIELDS:
+            value = data.get(field)
+            if field in self.choices:
+                if type(value) is int:
+                    value = str(value)
+                if not isinstance(value, str) or value not in self.choices[field]:
+                    return None
+            elif field == 'credit_history':
+                value = checkbox_value(value)
+            elif isinstance(value, str) and INTEGER_RE.fullmatch(value):
+                value = int(value)
+            elif type(value) is not int or not -2 ** 31 <= value < 2 ** 31:
+                return None
+            values.append(value)
+        return values
+
+
+def invalid(message):
+    return {'__all__': [{'message': message, 'code': 'invalid'}]}
+
+
+def ndjson_records(lines):
+    """(record, None) per non-blank line, or (None, errors) for lines that aren't JSON objects"""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield None, invalid(f'Invalid JSON: {e}')
+            continue
+        if isinstance(record, dict):
+            yield record, None
+        else:
+            yield None, invalid('Expected a JSON object')
+
+
+def csv_records(lines):
+    """(record, None) per CSV row, keyed by the header row"""
+    reader = csv.reader(lines)
+    header = [COLUMN_FIELDS.get(name.strip(), name.strip()) for name in next(reader, [])]
+    for cells in reader:
+        if not cells:
+            continue
+        record = dict(zip(header, cells))
+        if 'credit_history' in record:
+            cell = record['credit_history']
+            record['credit_history'] = CSV_BOOLEANS.get(cell.strip().lower(), cell)
+        yield record, None
+
+
+class NdjsonWriter:
+    content_type = 'application/x-ndjson'
+    
+    def __init__(self, persist):
+        self.persist = persist
+        self.versions = {}
+    
+    def header(self):
+        return ''
+    
+    def block(self, outcomes):
+        lines = []
+        for row, pk, result, errors in outcomes:
+            if errors is not None:
+                lines.append(json.dumps({'row': row, 'errors': errors}))
+                continue
+            version = self.versions.get(result['model_version'])
+            if version is None:
+                version = self.versions[result['model_version']] = json.dumps(result['model_version'])
+            # Formatted by hand: json.dumps per row would dominate the cost
+            lines.append(
+                f'{{"row": {row}, '
+                + (f'"id": {pk}, ' if self.persist else '')
+                + f'"approved": {"true" if result["approved"] else "false"}, '
+                f'"approval_probability": {float(result["approval_probability"])!r}, '
+                f'"confidence": {float(result["confidence"])!r}, '
+                f'"model_version": {version}}}'
+            )
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+class CsvWriter:
+    content_type = 'text/csv'
+    
+    def __init__(self, persist):
+        self.persist = persist
+    
+    def header(self):
+        return ','.join(CSV_COLUMNS) + '\r\n'
+    
+    def block(self, outcomes):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(
+            [row, '', '', '', '', '', json.dumps(errors)] if errors is not None else
+            [row, pk if pk is not None else '', result['approved'], result['approval_probability'],
+             result['confidence'], result['model_version'], '']
+            for row, pk, result, errors in outcomes
+        )
+        return buffer.getvalue()
+
+
+WRITERS = {'ndjson': NdjsonWriter, 'csv': CsvWriter}
+READERS = {'ndjson': ndjson_records, 'csv': csv_records}
+
+
+def score_stream(lines, input_format, persist=False, chunk_size=BATCH_CHUNK_SIZE):
+    """Yield the scored output as text blocks, one per chunk of input rows.
+    
+    lines is an iterable of bytes lines, e.g. the HttpRequest itself.
+    All chunks are scored with the bundle active when scoring starts.
+    """
+    validator = RowValidator(LoanApplicationForm if persist else LoanScoringForm)
+    writer = WRITERS[input_format](persist)
+    records = enumerate(READERS[input_format](codecs.iterdecode(lines, 'utf-8-sig')), 1)
+    bundle = loan_predictor.serving_bundle()
+    
+    header = writer.header()
+    if header:
+        yield header
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        
+        cleaned = [
+            (row, *(validator.clean(record) if errors is None else (None, errors)))
+            for row, (record, errors) in chunk
+        ]
+        valid = [values for _, values, _ in cleaned if values is not None]
+        results = loan_predictor.score_rows([(None, *values[1:]) for values in valid], bundle) if valid else []
+        ids = save_scored(valid, results) if persist and valid else [None] * len(valid)
+        
+        scored = zip(ids, results)
+        outcomes = []
+        for row, values, errors in cleaned:
+            if values is None:
+                outcomes.append((row, None, None, errors))
+            else:
+                outcomes.append((row, *next(scored), None))
+        BULK_ROWS.inc('scored', amount=len(valid))
+        if len(chunk) - len(valid):
+            BULK_ROWS.inc('invalid', amount=len(chunk) - len(valid))
+        yield writer.block(outcomes)
+
+
+def save_scored(rows, results):
+    """bulk_create scored (applicant_name, *SCORING_FIELDS) rows; returns their ids"""
+    applications = [
+        LoanApplication(
+            applicant_name=values[0],
+            **dict(zip(SCORING_FIELDS, values[1:])),
+            loan_status='Approved' if result['approved'] else 'Rejected',
+            approval_probability=result['approval_probability'],
+            model_version=result['model_version'],
+        )
+        for values, result in zip(rows, results)
+    ]
+    deltas = new_deltas()
+    with transaction.atomic():
+        LoanApplication.objects.bulk_create(applications)
+        # bulk_create bypasses the post_save counter signals
+        for application in applications:
+            add_contribution(deltas, application_contribution(application), 1)
+        apply_deltas(deltas)
+    BULK_ROWS.inc('saved', amount=len(applications))
+    return [application.pk for application in applications]
+
+
+async def async_blocks(blocks):
+    """Iterate a blocking block generator from the event loop, one thread hop per block.
+    
+    Under ASGI Django 4.2 would otherwise read a sync streaming response
+    into memory before sending it.
+    """
+    step = sync_to_async(lambda: next(blocks, None), thread_sensitive=True)
+    while True:
+        block = await step()
+        if block is None:
+            return
+        yield block
@@ -0,0 +1,239 @@
+import csv
+import io
+import json
+import zlib
+
+# Parquet and Arrow exports need pyarrow (optional dependency)
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+
+# Columns read for exports, in output order
+EXPORT_FIELDS = [
+    'id', 'applicant_name', 'gender', 'married', 'dependents', 'education',
+    'self_employed', 'applicant_income', 'coapplicant_income', 'loan_amount',
+    'loan_amount_term', 'credit_history', 'property_area', 'loan_status',
+    'approval_probability', 'created_at',
+]
+
+CSV_HEADER = [
+    'ID', 'Applicant Name', 'Gender', 'Married', 'Dependents', 'Education', 
+    'Self Employed', 'Applicant Income', 'Coapplicant Income', 'Loan Amount', 
+    'Loan Term', 'Credit History', 'Property Area', 'Status', 'ML Probability', 
+    'Total Income', 'Loan-Income Ratio', 'Date Created'
+]
+
+# Rows per database fetch and per yielded CSV block
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_rows(applications, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream EXPORT_FIELDS tuples without creating model instances"""
+    return applications.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def csv_row(row):
+    """Format one EXPORT_FIELDS tuple as a CSV row"""
+    (app_id, applicant_name, gender, married, dependents, education, self_employed,
+     applicant_income, coapplicant_income, loan_amount, loan_amount_term, credit_history,
+     property_area, loan_status, approval_probability, created_at) = row
+    
+    total_income = applicant_income + (coapplicant_income or 0)
+    loan_income_ratio = (loan_amount * 1000) / total_income if total_income > 0 else 0
+    
+    return [
+        app_id,
+        applicant_name or 'N/A',
+        gender or 'N/A',
+        married or 'N/A',
+        dependents or 'N/A',
+        education or 'N/A',
+        self_employed or 'N/A',
+        applicant_income or 0,
+        coapplicant_income or 0,
+        loan_amount or 0,
+        loan_amount_term or 360,
+        'Yes' if credit_history else 'No',
+        property_area or 'N/A',
+        loan_status or 'Pending',
+        f"{approval_probability:.1f}%" if approval_probability else 'N/A',
+        total_income,
+        f"{loan_income_ratio:.2f}",
+        created_at.strftime('%Y-%m-%d %H:%M:%S') if created_at else 'N/A'
+    ]
+
+
+def csv_stream(rows, block_rows=EXPORT_CHUNK_SIZE):
+    """Yield the CSV export as text blocks of up to block_rows rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    
+    pending = 0
+    for row in rows:
+        writer.writerow(csv_row(row))
+        pending += 1
+        if pending >= block_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def gzip_stream(blocks, level=6):
+    """Gzip-compress a stream of text or bytes blocks on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for block in blocks:
+        if isinstance(block, str):
+            block = block.encode('utf-8')
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def ndjson_stream(rows, block_rows=EXPORT_CHUNK_SIZE):
+    """Yield the export as newline-delimited JSON with typed values"""
+    lines = []
+    for row in rows:
+        record = typed_record(row)
+        lines.append(json.dumps(record))
+        if len(lines) >= block_rows:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def typed_record(row):
+    """EXPORT_FIELDS tuple -> JSON-ready dict with derived columns"""
+    record = dict(zip(EXPORT_FIELDS, row))
+    total_income = record['applicant_income'] + (record['coapplicant_income'] or 0)
+    record['total_income'] = total_income
+    record['loan_income_ratio'] = (record['loan_amount'] * 1000) / total_income if total_income > 0 else 0.0
+    record['created_at'] = record['created_at'].isoformat() if record['created_at'] else None
+    return record
+
+
+def arrow_schema():
+    """Typed schema for Parquet/Arrow exports: EXPORT_FIELDS plus derived columns"""
+    # Low-cardinality columns are dictionary-encoded (pandas categoricals)
+    category = pa.dictionary(pa.int8(), pa.string())
+    return pa.schema([
+        ('id', pa.int64()),
+        ('applicant_name', pa.string()),
+        ('gender', category),
+        ('married', category),
+        ('dependents', category),
+        ('education', category),
+        ('self_employed', category),
+        ('applicant_income', pa.int64()),
+        ('coapplicant_income', pa.int64()),
+        ('loan_amount', pa.int64()),
+        ('loan_amount_term', pa.int64()),
+        ('credit_history', pa.bool_()),
+        ('property_area', category),
+        ('loan_status', category),
+        ('approval_probability', pa.float64()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+        ('total_income', pa.int64()),
+        ('loan_income_ratio', pa.float64()),
+    ])
+
+
+def record_batches(rows, schema, batch_rows=EXPORT_CHUNK_SIZE * 10):
+    """Group EXPORT_FIELDS tuples into Arrow record batches"""
+    while True:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= batch_rows:
+                break
+        if not chunk:
+            return
+        
+        columns = [
+            pa.array(values, type=schema.field(name).type)
+            for name, values in zip(EXPORT_FIELDS, zip(*chunk))
+        ]
+        applicant_income, coapplicant_income, loan_amount = columns[7], columns[8], columns[9]
+        total_income = pc.add(applicant_income, pc.fill_null(coapplicant_income, 0))
+        ratio = pc.divide(pc.multiply(pc.cast(loan_amount, pa.float64()), 1000.0),
+                          pc.cast(total_income, pa.float64()))
+        columns.append(total_income)
+        columns.append(pc.if_else(pc.greater(total_income, 0), ratio, 0.0))
+        
+        yield pa.RecordBatch.from_arrays(columns, schema=schema)
+        if len(chunk) < batch_rows:
+            return
+
+
+class StreamSink:
+    """Write-only file object drained after every record batch"""
+    
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+    
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def flush(self):
+        pass
+    
+    def writable(self):
+        return True
+    
+    def close(self):
+        self.closed = True
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_stream(rows):
+    """Yield a Parquet file, one row group per record batch"""
+    schema = arrow_schema()
+    sink = StreamSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+    for batch in record_batches(rows, schema):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def arrow_stream(rows):
+    """Yield an Arrow IPC stream, one message per record batch"""
+    schema = arrow_schema()
+    sink = StreamSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema)
+    for batch in record_batches(rows, schema):
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+# format -> (stream function, content type, file extension, needs pyarrow)
+EXPORT_FORMATS = {
+    'csv': (csv_stream, 'text/csv', 'csv', False),
+    'ndjson': (ndjson_stream, 'application/x-ndjson', 'ndjson', False),
+    'parquet': (parquet_stream, 'application/vnd.apache.parquet', 'parquet', True),
+    'arrow': (arrow_stream, 'application/vnd.apache.arrow.stream', 'arrows', True),
+}
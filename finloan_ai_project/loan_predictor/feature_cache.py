@@ -0,0 +1,237 @@
+"""On-disk training features extracted from LoanApplication.
+
+Labelled applications are encoded once (streaming.encode_chunk, with the
+model field choices as category classes) and appended to memory-mapped
+.npy files, with their ids. meta.json records the row count and an
+(updated_at, id) watermark, so each sync only reads rows saved since the
+last one and extraction costs time proportional to changed data:
+
+- rows labelled since the last sync (scored later, or by an admin) are
+  appended;
+- cached rows that changed are re-encoded in place;
+- cached rows that lost their label get DROPPED as their label and are
+  left out of training.
+
+Deleted applications stay in the cache until FeatureCache.clear()
+(train_model --rebuild) re-extracts everything.
+"""
+import datetime
+import itertools
+import json
+import os
+import shutil
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+from .ml_predictor import CATEGORICAL_COLUMNS
+from .models import LoanApplication
+from .streaming import (
+    CHUNK_SIZE, FEATURE_NAMES, FIELD_COLUMNS, LABELS, StreamingMedian, encode_chunk, records_frame
+)
+
+FEATURES = 'features.npy'
+TARGETS = 'labels.npy'
+IDS = 'ids.npy'
+META = 'meta.json'
+# Bumped when the files' layout changes; older caches are rebuilt
+FORMAT = 2
+# Label of cached rows that are no longer labelled
+DROPPED = -1
+# Files are reallocated at double the size when full
+INITIAL_CAPACITY = 65536
+
+
+def cache_dir():
+    return str(getattr(settings, 'LOAN_FEATURE_CACHE',
+                       os.path.join(settings.BASE_DIR, 'ml_models', 'feature_cache')))
+
+
+def field_classes():
+    """Sorted category classes from the LoanApplication field choices"""
+    fields = {column: field for field, column in FIELD_COLUMNS.items()}
+    return {
+        col: sorted(value for value, _ in LoanApplication._meta.get_field(fields[col]).choices)
+        for col in CATEGORICAL_COLUMNS
+    }
+
+
+class FeatureCache:
+    """Encoded features and labels of labelled applications, in the order they were first labelled"""
+    
+    def __init__(self, directory=None):
+        self.directory = directory or cache_dir()
+        self.meta = self.read_meta()
+    
+    def path(self, name):
+        return os.path.join(self.directory, name)
+    
+    def empty_meta(self):
+        return {'rows': 0, 'capacity': 0, 'watermark': None, 'last_id': None,
+                'feature_names': FEATURE_NAMES, 'format': FORMAT}
+    
+    def read_meta(self):
+        try:
+            with open(self.path(META)) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return self.empty_meta()
+        # Features or layout changed since the cache was built: start over
+        if meta.get('feature_names') != FEATURE_NAMES or meta.get('format') != FORMAT:
+            return self.empty_meta()
+        return meta
+    
+    def write_meta(self):
+        tmp_path = self.path(META + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, self.path(META))
+    
+    @property
+    def rows(self):
+        return self.meta['rows']
+    
+    @property
+    def watermark(self):
+        return datetime.datetime.fromisoformat(self.meta['watermark']) if self.meta['watermark'] else None
+    
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.meta = self.empty_meta()
+    
+    def pending(self, queryset):
+        """Rows of queryset saved since the watermark, labelled or not, oldest first"""
+        if self.watermark:
+            queryset = queryset.filter(
+                Q(updated_at__gt=self.watermark) | Q(updated_at=self.watermark, pk__gt=self.meta['last_id'])
+            )
+        return queryset.order_by('updated_at', 'pk')
+    
+    def sync(self, queryset=None, chunk_size=CHUNK_SIZE):
+        """Extract the rows saved since the watermark; returns how many were added or re-encoded"""
+        queryset = LoanApplication.objects.all() if queryset is None else queryset
+        rows = self.pending(queryset).values_list(*FIELD_COLUMNS, 'updated_at', 'pk').iterator(chunk_size=chunk_size)
+        classes = field_classes()
+        status = list(FIELD_COLUMNS).index('loan_status')
+        index = self.index()
+        extracted = 0
+        while True:
+            batch = list(itertools.islice(rows, chunk_size))
+            if not batch:
+                return extracted
+            pks = np.array([row[-1] for row in batch], dtype=np.int64)
+            positions = self.positions(index, pks)
+            labelled = np.array([row[status] in LABELS for row in batch], dtype=bool)
+            
+            if labelled.any():
+                # Undefined Loan_Income_Ratio stays NaN until training
+                X, y = encode_chunk(
+                    records_frame([row for row, keep in zip(batch, labelled) if keep], extra=('updated_at', 'pk')),
+                    classes,
+                )
+                positions_labelled = positions[labelled]
+                cached = positions_labelled >= 0
+                self.overwrite(positions_labelled[cached], X[cached], y[cached])
+                self.append(X[~cached], y[~cached], pks[labelled][~cached])
+                extracted += len(y)
+            self.overwrite(positions[~labelled & (positions >= 0)], None, DROPPED)
+            
+            updated_at, pk = batch[-1][-2:]
+            self.meta.update(watermark=updated_at.isoformat(), last_id=pk)
+            # Only now do the appended rows count
+            self.write_meta()
+    
+    def index(self):
+        """(sorted cached ids, their row numbers), for finding rows to re-encode"""
+        if not self.rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        ids = np.load(self.path(IDS), mmap_mode='r')[:self.rows]
+        order = np.argsort(ids, kind='stable')
+        return np.asarray(ids[order]), order
+    
+    def positions(self, index, pks):
+        """Row number of each pk in the cache, -1 for pks not cached"""
+        ids, order = index
+        if not len(ids):
+            return np.full(len(pks), -1, dtype=np.int64)
+        at = np.minimum(np.searchsorted(ids, pks), len(ids) - 1)
+        return np.where(ids[at] == pks, order[at], -1)
+    
+    def overwrite(self, positions, X, y):
+        """Replace the features (unless X is None) and labels of cached rows"""
+        if not len(positions):
+            return
+        if X is not None:
+            features = np.load(self.path(FEATURES), mmap_mode='r+')
+            features[positions] = X
+            features.flush()
+        targets = np.load(self.path(TARGETS), mmap_mode='r+')
+        targets[positions] = y
+        targets.flush()
+    
+    def append(self, X, y, ids):
+        rows = self.meta['rows']
+        needed = rows + len(y)
+        if needed == rows:
+            return
+        if needed > self.meta['capacity']:
+            self.grow(max(needed, 2 * self.meta['capacity'], INITIAL_CAPACITY))
+        
+        for name, values in [(FEATURES, X), (TARGETS, y), (IDS, ids)]:
+            array = np.load(self.path(name), mmap_mode='r+')
+            array[rows:needed] = values
+            array.flush()
+        self.meta['rows'] = needed
+    
+    def grow(self, capacity):
+        """Reallocate the memory-mapped files with room for capacity rows"""
+        os.makedirs(self.directory, exist_ok=True)
+        rows = self.meta['rows']
+        layouts = [
+            (FEATURES, (capacity, len(FEATURE_NAMES)), np.float64),
+            (TARGETS, (capacity,), np.int8),
+            (IDS, (capacity,), np.int64),
+        ]
+        for name, shape, dtype in layouts:
+            tmp_path = self.path(name + '.tmp')
+            grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=shape)
+            if rows:
+                grown[:rows] = np.load(self.path(name), mmap_mode='r')[:rows]
+            grown.flush()
+            del grown
+            os.replace(tmp_path, self.path(name))
+        self.meta['capacity'] = capacity
+        self.write_meta()
+    
+    def arrays(self):
+        """Read-only memory-mapped (features, labels) of the cached rows; DROPPED rows included"""
+        if not self.rows:
+            return np.empty((0, len(FEATURE_NAMES))), np.empty(0, dtype=np.int8)
+        features = np.load(self.path(FEATURES), mmap_mode='r')[:self.rows]
+        targets = np.load(self.path(TARGETS), mmap_mode='r')[:self.rows]
+        return features, targets
+    
+    def training_batches(self, chunk_size=CHUNK_SIZE):
+        """Callable yielding (X, y) chunks for StreamingTrainer.fit_batches.
+        
+        DROPPED rows are skipped; undefined Loan_Income_Ratio values get the
+        column median.
+        """
+        features, targets = self.arrays()
+        column = FEATURE_NAMES.index('Loan_Income_Ratio')
+        median = StreamingMedian()
+        for start in range(0, len(targets), chunk_size):
+            keep = targets[start:start + chunk_size] != DROPPED
+            median.update(features[start:start + chunk_size, column][keep])
+        fill = median.median()
+        
+        def batches():
+            for start in range(0, len(targets), chunk_size):
+                keep = targets[start:start + chunk_size] != DROPPED
+                if not keep.any():
+                    continue
+                X = np.array(features[start:start + chunk_size])[keep]
+                X[np.isnan(X[:, column]), column] = fill
+                yield X, targets[start:start + chunk_size][keep].astype(np.int64)
+        return batches
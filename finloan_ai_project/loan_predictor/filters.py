@@ -0,0 +1,43 @@
+from .models import LoanApplication
+from .search import search_applications
+from .stats import PENDING_Q
+
+
+def filter_applications(params):
+    """Apply the admin dashboard filters (search, status, education, property_area).
+
+    Returns the filtered queryset and the filter values, so views can pass
+    them back to templates or links. Used by the dashboard and the exports.
+    """
+    applications = LoanApplication.objects.all()
+    
+    # Apply search filter
+    search_query = params.get('search', '')
+    if search_query:
+        applications = search_applications(applications, search_query)
+    
+    # Apply status filter
+    status_filter = params.get('status', '')
+    if status_filter:
+        if status_filter == 'Pending':
+            applications = applications.filter(PENDING_Q)
+        else:
+            applications = applications.filter(loan_status=status_filter)
+    
+    # Apply education filter
+    education_filter = params.get('education', '')
+    if education_filter:
+        applications = applications.filter(education=education_filter)
+    
+    # Apply property area filter
+    property_area_filter = params.get('property_area', '')
+    if property_area_filter:
+        applications = applications.filter(property_area=property_area_filter)
+    
+    filters = {
+        'search_query': search_query,
+        'status_filter': status_filter,
+        'education_filter': education_filter,
+        'property_area_filter': property_area_filter,
+    }
+    return applications, filters
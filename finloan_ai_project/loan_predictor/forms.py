@@ -49,3 +49,9 @@ class LoanApplicationForm(forms.ModelForm):
         for field_name in required_fields:
             if field_name in self.fields:
                 self.fields[field_name].required = True
+
+
+class LoanScoringForm(LoanApplicationForm):
+    """Applicant data for scoring without saving; the name is optional"""
+    class Meta(LoanApplicationForm.Meta):
+        fields = [field for field in LoanApplicationForm.Meta.fields if field != 'applicant_name']
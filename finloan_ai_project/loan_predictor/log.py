@@ -0,0 +1,88 @@
+"""Logging helpers for the predictor and views.
+
+QueueStreamHandler keeps log I/O off the request thread; sampled() guards
+per-prediction debug payloads so they can stay enabled in production.
+Configured from settings.LOGGING.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+from django.conf import settings
+
+
+def sampled(logger):
+    """True for a random LOAN_PREDICTOR_DEBUG_SAMPLE_RATE share of calls when
+    logger is enabled for DEBUG.
+
+    Wrap building expensive debug payloads in it: with DEBUG off the cost is
+    one cached isEnabledFor() check.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    rate = getattr(settings, 'LOAN_PREDICTOR_DEBUG_SAMPLE_RATE', 1.0)
+    return rate >= 1 or random.random() < rate
+
+
+class QueueStreamHandler(logging.handlers.QueueHandler):
+    """Write records to a stream from a background thread.
+
+    emit() only puts the record on a bounded queue; formatting and the write
+    happen on a QueueListener thread. When the queue is full the record is
+    dropped (and counted in dropped) instead of blocking the caller. The
+    listener is restarted after fork, so preloaded gunicorn workers each get
+    their own.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.maxsize = maxsize
+        self.target = logging.StreamHandler(stream)
+        self.dropped = 0
+        self.listener = None
+        self._pid = None
+        atexit.register(self.stop)
+    
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+    
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            # A forked child inherits the queue but not the listener thread
+            self.queue = queue.Queue(self.maxsize)
+            self.listener = logging.handlers.QueueListener(self.queue, self.target)
+            self.listener.start()
+            self._pid = os.getpid()
+    
+    def prepare(self, record):
+        # Formatting happens on the listener thread
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+    
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+    
+    def stop(self):
+        """Flush queued records and stop the listener thread"""
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+        self.listener = None
+        self._pid = None
+    
+    def close(self):
+        self.stop()
+        super().close()
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from loan_predictor import model_registry
+
+
+class Command(BaseCommand):
+    help = 'Verify a registry model version and make it the active one'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('model_version', nargs='?',
+                            help='Version to activate (omit to list versions)')
+    
+    def handle(self, *args, **options):
+        version = options['model_version']
+        if not version:
+            current = model_registry.current_version()
+            for name in model_registry.list_versions():
+                marker = '*' if name == current else ' '
+                self.stdout.write(f"{marker} {name}")
+            return
+        
+        try:
+            model_registry.activate(version)
+        except model_registry.RegistryError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Model version {version} active; running workers switch within "
+            f"LOAN_MODEL_RELOAD_INTERVAL seconds."
+        ))
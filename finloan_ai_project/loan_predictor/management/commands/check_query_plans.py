@@ -0,0 +1,75 @@
+import itertools
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from loan_predictor.exports import EXPORT_FIELDS
+from loan_predictor.filters import filter_applications
+from loan_predictor.pagination import after_cursor, encode_cursor
+
+
+TABLE = 'loan_predictor_loanapplication'
+
+# Dashboard/export filter values to combine ('' = filter not set)
+FILTER_VALUES = {
+    'search': ['', 'john'],
+    'status': ['', 'Approved', 'Rejected', 'Pending'],
+    'education': ['', 'Graduate'],
+    'property_area': ['', 'Urban'],
+}
+
+# Plan lines that mean the whole table is read without an index
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(rf'\bSCAN {TABLE}\b(?!.*USING (COVERING )?INDEX)'),
+    'postgresql': re.compile(rf'Seq Scan on {TABLE}\b'),
+}
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every dashboard/export/page filter combination and fail on full table scans'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--show-plans', action='store_true', help='Print every query plan')
+    
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Query plan checks are not supported on {connection.vendor}")
+        
+        failures = []
+        checked = 0
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Small tables are cheaper to seq-scan; check the indexes are usable
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            
+            for params, label, queryset in self.queries():
+                plan = queryset.explain()
+                checked += 1
+                if options['show_plans']:
+                    self.stdout.write(f"{label}\n{plan}\n")
+                if any(pattern.search(line) for line in plan.splitlines()):
+                    failures.append((label, plan))
+        
+        for label, plan in failures:
+            self.stdout.write(self.style.ERROR(f"Full scan: {label}\n{plan}\n"))
+        if failures:
+            raise CommandError(f"{len(failures)} of {checked} queries fall back to a full table scan")
+        self.stdout.write(self.style.SUCCESS(f"All {checked} dashboard/export queries use an index."))
+    
+    def queries(self):
+        """Yield (params, label, queryset) for every filter combination"""
+        names = list(FILTER_VALUES)
+        cursor = encode_cursor(timezone.now(), 1)
+        for values in itertools.product(*FILTER_VALUES.values()):
+            params = {name: value for name, value in zip(names, values) if value}
+            applications, _ = filter_applications(params)
+            applications = applications.order_by('-created_at')
+            label = ', '.join(f"{k}={v}" for k, v in params.items()) or 'no filters'
+            
+            yield params, f"dashboard [{label}]", applications
+            yield params, f"dashboard page [{label}]", after_cursor(applications, cursor)
+            yield params, f"export [{label}]", applications.values_list(*EXPORT_FIELDS)
@@ -0,0 +1,47 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from loan_predictor import synthetic
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic loan data shaped like data/loan_dataset.csv (CSV, Parquet or database rows)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write to this .csv or .parquet file')
+        parser.add_argument('--database', action='store_true',
+                            help='bulk_create LoanApplication rows instead of writing a file')
+        parser.add_argument('--batch-size', type=int, default=10000, help='bulk_create batch size')
+        parser.add_argument('--source', help='Dataset to learn from (default: data/loan_dataset.csv)')
+    
+    def handle(self, *args, **options):
+        rows = options['rows']
+        if rows < 1:
+            raise CommandError("--rows must be positive")
+        if bool(options['output']) == options['database']:
+            raise CommandError("Give exactly one of --output or --database")
+        
+        if options['database']:
+            created = synthetic.insert_applications(
+                rows, options['seed'], options['batch_size'], options['source']
+            )
+            self.stdout.write(self.style.SUCCESS(f"Created {created} synthetic loan applications."))
+            return
+        
+        path = options['output']
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.csv':
+            synthetic.write_csv(path, rows, options['seed'], options['source'])
+        elif extension == '.parquet':
+            try:
+                synthetic.write_parquet(path, rows, options['seed'], options['source'])
+            except ImportError:
+                raise CommandError("Parquet output requires pyarrow")
+        else:
+            raise CommandError(f"Unknown output format {extension!r}: use .csv or .parquet")
+        
+        size_mb = os.path.getsize(path) / 1024 ** 2
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} rows to {path} ({size_mb:.1f} MB)."))
@@ -0,0 +1,30 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from loan_predictor import model_registry
+
+
+class Command(BaseCommand):
+    help = 'Copy a trained model bundle into the model registry as a new version'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=os.path.join(settings.BASE_DIR, 'ml_models'),
+                            help='Directory holding the output of train_loan_model.py')
+        parser.add_argument('--name', dest='model_version',
+                            help='Version name (default: current timestamp)')
+        parser.add_argument('--activate', action='store_true',
+                            help='Point CURRENT at the new version once published')
+    
+    def handle(self, *args, **options):
+        try:
+            version = model_registry.publish(options['source'], options['model_version'])
+            self.stdout.write(f"Published model version {version} to {model_registry.bundle_dir(version)}")
+            if options['activate']:
+                model_registry.activate(version)
+                self.stdout.write(f"Activated model version {version}")
+        except model_registry.RegistryError as e:
+            raise CommandError(str(e))
+        
+        self.stdout.write(self.style.SUCCESS("Done."))
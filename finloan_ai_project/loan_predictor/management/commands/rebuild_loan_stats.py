@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from loan_predictor.stats import find_drift, rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the dashboard counters table (LoanStatsBucket) from LoanApplication'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only compare the counters with live counts; fail on drift')
+    
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = find_drift()
+            for key, (stored, live) in sorted(drift.items(), key=lambda item: str(item[0])):
+                day, status, education, property_area = key
+                self.stdout.write(
+                    f"  {day} {status}/{education}/{property_area}: "
+                    f"stored count={stored[0]} probabilities={stored[2]}, "
+                    f"live count={live[0]} probabilities={live[2]}"
+                )
+            if drift:
+                raise CommandError(f"{len(drift)} counter bucket(s) drifted from live counts")
+            self.stdout.write(self.style.SUCCESS('Counters match live counts.'))
+            return
+        
+        buckets = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} counter bucket(s)."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from loan_predictor.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = 'Create or repair the applicant search index (SQLite FTS5 / PostgreSQL trigram)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+    
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        install_search_index(connection)
+        self.stdout.write(self.style.SUCCESS(f"Applicant search index rebuilt on {connection.vendor}."))
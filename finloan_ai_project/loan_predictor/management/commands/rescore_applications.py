@@ -0,0 +1,168 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+def init_worker():
+    """Pool initializer: set up Django and load the model once per process"""
+    import django
+    django.setup()
+    
+    # Never reuse database connections inherited from the parent process
+    for connection in connections.all():
+        connection.close()
+    
+    from loan_predictor.ml_predictor import loan_predictor
+    loan_predictor._ensure_models_loaded()
+
+
+def score_range(start, end, since, dry_run, chunk_size):
+    """Re-score every application with start <= pk < end, chunk_size rows at a time.
+    
+    Each chunk is read in full before it is written, and its write (one
+    transaction) is retried while other workers hold the database lock.
+    """
+    from loan_predictor.ml_predictor import SCORING_FIELDS, loan_predictor
+    from loan_predictor.scoring_queue import retry_locked
+    
+    # Only what scoring and the counter updates read
+    applications = filter_since(start, end, since).only(
+        *SCORING_FIELDS, 'created_at', 'loan_status', 'approval_probability'
+    ).order_by('pk')
+    rows = approved = 0
+    last = None
+    while True:
+        chunk = list((applications if last is None else applications.filter(pk__gt=last))[:chunk_size])
+        if not chunk:
+            break
+        results = retry_locked(
+            lambda: loan_predictor.predict_many(chunk, chunk_size=chunk_size, save=not dry_run)
+        )
+        rows += len(results)
+        approved += sum(1 for result in results if result['approved'])
+        last = chunk[-1].pk
+    return start, end, rows, approved
+
+
+def filter_since(start, end, since):
+    from loan_predictor.models import LoanApplication
+    
+    applications = LoanApplication.objects.filter(pk__gte=start, pk__lt=end)
+    if since is None:
+        return applications
+    parsed = parse_datetime(since)
+    if parsed is not None:
+        return applications.filter(created_at__gte=parsed)
+    return applications.filter(created_at__date__gte=parse_date(since))
+
+
+class Command(BaseCommand):
+    help = 'Re-score LoanApplication rows with the current ML model, in parallel primary-key ranges'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (1 scores in this process)')
+        parser.add_argument('--since',
+                            help='Only re-score applications created on/after this date or datetime')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Score but do not write results or checkpoints')
+        parser.add_argument('--range-size', type=int, default=50000,
+                            help='Primary keys per work unit')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows per vectorized scoring batch and bulk_update')
+        parser.add_argument('--checkpoint', default='rescore_checkpoint.json',
+                            help='File recording completed ranges')
+        parser.add_argument('--resume', action='store_true',
+                            help='Skip ranges already recorded in the checkpoint file')
+    
+    def handle(self, *args, **options):
+        from loan_predictor.models import LoanApplication
+        
+        since = options['since']
+        if since and parse_datetime(since) is None and parse_date(since) is None:
+            raise CommandError(f"Invalid --since value: {since}")
+        if options['workers'] < 1 or options['range_size'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers, --range-size and --chunk-size must be positive')
+        
+        bounds = LoanApplication.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            self.stdout.write('No applications to re-score.')
+            return
+        
+        # Fixed multiples of range_size, so a checkpoint still names the same
+        # ranges after rows are deleted or inserted between runs
+        range_size = options['range_size']
+        ranges = [
+            (start, start + range_size)
+            for start in range(bounds['low'] // range_size * range_size, bounds['high'] + 1, range_size)
+        ]
+        
+        checkpoint = options['checkpoint']
+        done = set()
+        if options['resume'] and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                state = json.load(f)
+            if state.get('since') != since or state.get('range_size') != range_size:
+                raise CommandError('Checkpoint was written with a different --since/--range-size')
+            done = {tuple(r) for r in state['done']}
+        pending = [r for r in ranges if r not in done]
+        
+        self.stdout.write(
+            f"Re-scoring {len(pending)} of {len(ranges)} pk ranges with {options['workers']} worker(s)"
+            + (' (dry run)' if options['dry_run'] else '')
+        )
+        
+        args = (since, options['dry_run'], options['chunk_size'])
+        started = time.perf_counter()
+        total_rows = total_approved = 0
+        
+        for start, end, rows, approved in self.run_ranges(pending, args, options['workers']):
+            done.add((start, end))
+            total_rows += rows
+            total_approved += approved
+            if not options['dry_run']:
+                self.write_checkpoint(checkpoint, since, range_size, done)
+            
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"  [{len(done)}/{len(ranges)}] pk {start}-{end - 1}: {rows} rows, "
+                f"{total_rows / elapsed if elapsed else 0:.0f} rows/s overall"
+            )
+        
+        elapsed = time.perf_counter() - started
+        if not options['dry_run'] and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-scored {total_rows} applications ({total_approved} approved) in {elapsed:.1f}s"
+            f" - {total_rows / elapsed if elapsed else 0:.0f} rows/s"
+        ))
+    
+    def run_ranges(self, ranges, args, workers):
+        """Yield (start, end, rows, approved) as each range finishes"""
+        if workers == 1:
+            from loan_predictor.ml_predictor import loan_predictor
+            loan_predictor._ensure_models_loaded()
+            for start, end in ranges:
+                yield score_range(start, end, *args)
+            return
+        
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            futures = [pool.submit(score_range, start, end, *args) for start, end in ranges]
+            for future in as_completed(futures):
+                yield future.result()
+    
+    def write_checkpoint(self, path, since, range_size, done):
+        """Atomically record completed ranges"""
+        state = {'since': since, 'range_size': range_size, 'done': sorted(done)}
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
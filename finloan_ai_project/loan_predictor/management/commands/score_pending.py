@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from loan_predictor.models import LoanApplication
+from loan_predictor.scoring_queue import QUEUED_Q, release_stale_claims, score_batch
+
+
+class Command(BaseCommand):
+    help = 'Score applications queued as Pending (LOAN_SCORING_MODE=db); run as many as needed'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='Seconds to sleep when nothing is queued')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of polling')
+    
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            close_old_connections()
+            pks = list(
+                LoanApplication.objects.filter(QUEUED_Q)
+                .order_by('created_at', 'pk')
+                .values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if pks:
+                scored = score_batch(LoanApplication.objects.filter(pk__in=pks))
+                total += scored
+                if scored:
+                    self.stdout.write(f"Scored {scored} applications ({total} total)")
+                continue
+            
+            if release_stale_claims():
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll'])
+        
+        self.stdout.write(self.style.SUCCESS(f"Scored {total} applications."))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import CommandError
+
+from loan_predictor.feature_cache import FeatureCache, field_classes
+from loan_predictor.streaming import StreamingTrainer
+
+from .train_streaming import Command as StreamingCommand
+
+
+class Command(StreamingCommand):
+    help = ('Train on labelled LoanApplication rows, extracting only rows saved since the last run '
+            'into the memory-mapped feature cache')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Drop the feature cache and extract every row again')
+        parser.add_argument('--sync-only', action='store_true',
+                            help='Update the feature cache without training')
+        self.add_training_arguments(parser)
+    
+    def handle(self, *args, **options):
+        cache = FeatureCache()
+        if options['rebuild']:
+            cache.clear()
+        
+        start = time.perf_counter()
+        added = cache.sync(chunk_size=options['chunk_size'])
+        self.stdout.write(
+            f"Extracted {added} new or changed rows in {time.perf_counter() - start:.2f}s "
+            f"({cache.rows} cached, watermark {cache.meta['watermark']})"
+        )
+        if options['sync_only']:
+            return
+        
+        trainer = StreamingTrainer(epochs=options['epochs'], holdout=options['holdout'])
+        trainer.classes = field_classes()
+        try:
+            trainer.fit_batches(cache.training_batches(options['chunk_size']))
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.save(trainer, options)
@@ -0,0 +1,74 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from loan_predictor import model_registry
+from loan_predictor.models import LoanApplication
+from loan_predictor.streaming import CHUNK_SIZE, StreamingTrainer, csv_chunks, queryset_chunks
+
+
+class Command(BaseCommand):
+    help = 'Train a logistic model out-of-core from a CSV or the LoanApplication table, in bounded memory'
+    
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--csv', help='CSV laid out like data/loan_dataset.csv')
+        source.add_argument('--from-db', action='store_true',
+                            help='Train on approved/rejected LoanApplication rows')
+        self.add_training_arguments(parser)
+    
+    def add_training_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--epochs', type=int, default=5)
+        parser.add_argument('--holdout', type=int, default=5,
+                            help='Keep every Nth row out of training for the accuracy report')
+        parser.add_argument('--output', help='Directory for loan_serving.npz (default: a temp directory)')
+        parser.add_argument('--publish', action='store_true', help='Publish the result to the model registry')
+        parser.add_argument('--name', dest='model_version',
+                            help='Version name when publishing (default: current timestamp)')
+        parser.add_argument('--activate', action='store_true',
+                            help='Point CURRENT at the new version once published')
+    
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if options['csv']:
+            if not os.path.exists(options['csv']):
+                raise CommandError(f"No such file: {options['csv']}")
+            chunks = lambda: csv_chunks(options['csv'], chunk_size)
+        else:
+            chunks = lambda: queryset_chunks(LoanApplication.objects.all(), chunk_size)
+        
+        trainer = StreamingTrainer(epochs=options['epochs'], holdout=options['holdout'])
+        try:
+            trainer.fit(chunks)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.save(trainer, options)
+    
+    def save(self, trainer, options):
+        """Report, write loan_serving.npz and optionally publish/activate it"""
+        for stage, seconds in trainer.timings.items():
+            self.stdout.write(f"{stage:<12} {seconds:8.2f}s")
+        accuracy = f"{trainer.accuracy:.4f}" if trainer.accuracy is not None else 'n/a'
+        self.stdout.write(
+            f"Trained on {trainer.train_rows} rows, holdout accuracy {accuracy} on {trainer.holdout_rows} rows"
+        )
+        
+        output = options['output'] or tempfile.mkdtemp(prefix='finloan-streaming-')
+        os.makedirs(output, exist_ok=True)
+        path = trainer.save_serving_artifact(os.path.join(output, model_registry.SERVING_ARTIFACT))
+        self.stdout.write(f"Wrote {path}")
+        
+        if options['publish']:
+            try:
+                version = model_registry.publish(output, options['model_version'],
+                                                 files=[model_registry.SERVING_ARTIFACT])
+                self.stdout.write(f"Published model version {version}")
+                if options['activate']:
+                    model_registry.activate(version)
+                    self.stdout.write(f"Activated model version {version}")
+            except model_registry.RegistryError as e:
+                raise CommandError(str(e))
+        
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,290 @@
+"""In-process metrics in Prometheus text format.
+
+Every thread records into its own cell of each series (a list only that
+thread writes), so observe() and inc() take no lock; the /metrics view sums
+the cells when scraped. The per-prediction hot path goes further: it appends
+one tuple to an EventLog, which is folded into the metrics in vectorized
+batches. Values are per process: with several gunicorn workers each scrape
+reports the worker that answered it.
+"""
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+# Latency buckets in seconds: 5 us .. 10 s
+LATENCY_BUCKETS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_metrics = []
+_event_logs = []
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def label_text(names, values, extra=''):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class CellOwner:
+    """Stands in for a thread in its Series cells' finalizers"""
+    __slots__ = ('__weakref__',)
+
+
+class Series:
+    """One label combination of a metric; each thread writes its own cell.
+
+    A cell is a plain list: [value] for counters, per-bucket counts plus the
+    sum for histograms. Only the owning thread writes it, so no lock is needed.
+    When a thread exits its cell is folded into the series' base values, so
+    short-lived threads don't leave cells behind.
+    """
+
+    def __init__(self, size, buckets=None):
+        self.size = size
+        self.buckets = buckets
+        self._local = threading.local()
+        self._cells = []
+        self._base = [0] * size
+        self._lock = threading.Lock()
+    
+    def _new_cell(self):
+        cell = self._local.cell = [0] * self.size
+        # Only the thread's local holds the owner: it is collected when the thread exits
+        owner = self._local.owner = CellOwner()
+        weakref.finalize(owner, self._retire, cell).atexit = False
+        with self._lock:
+            self._cells.append(cell)
+        return cell
+    
+    def _retire(self, cell):
+        """Fold the cell of an exited thread into the base values"""
+        with self._lock:
+            for index, value in enumerate(cell):
+                self._base[index] += value
+            # By identity: cells with equal counts compare equal
+            self._cells = [live for live in self._cells if live is not cell]
+    
+    def inc(self, amount=1):
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._new_cell()
+        cell[0] += amount
+    
+    def observe(self, value):
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._new_cell()
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+    
+    def observe_many(self, values):
+        """Histogram observe() for an array of values"""
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._new_cell()
+        indexes = np.searchsorted(self.buckets, values, side='left')
+        for index, count in enumerate(np.bincount(indexes, minlength=self.size - 1).tolist()):
+            cell[index] += count
+        cell[-1] += float(np.sum(values))
+    
+    def total(self):
+        """Element-wise sum of all threads' cells"""
+        with self._lock:
+            cells = [list(self._base), *self._cells]
+        return [sum(column) for column in zip(*cells)]
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+    
+    def new_series(self):
+        raise NotImplementedError
+    
+    def labels(self, *values):
+        """The Series for these label values; bind once for hot paths"""
+        try:
+            return self._children[values]
+        except KeyError:
+            with self._lock:
+                return self._children.setdefault(values, self.new_series())
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def new_series(self):
+        return Series(1)
+    
+    def inc(self, *labels, amount=1):
+        self.labels(*labels).inc(amount)
+    
+    def samples(self):
+        for labels, series in sorted(self._children.items()):
+            yield f'{self.name}_total{label_text(self.labelnames, labels)} {series.total()[0]}'
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+    
+    def new_series(self):
+        # One count per bucket, +Inf, then the sum
+        return Series(len(self.buckets) + 2, self.buckets)
+    
+    def observe(self, value, *labels):
+        self.labels(*labels).observe(value)
+    
+    @contextmanager
+    def time(self, *labels):
+        series = self.labels(*labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            series.observe(time.perf_counter() - start)
+    
+    def samples(self):
+        for labels, series in sorted(self._children.items()):
+            values = series.total()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                bucket_labels = label_text(self.labelnames, labels, 'le="%s"' % le)
+                yield f'{self.name}_bucket{bucket_labels} {cumulative}'
+            yield f'{self.name}_sum{label_text(self.labelnames, labels)} {values[-1]}'
+            yield f'{self.name}_count{label_text(self.labelnames, labels)} {cumulative}'
+
+
+class Gauge(Metric):
+    """A value read when scraped: function() returns {label values: value}"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+    
+    def samples(self):
+        for labels, value in sorted(self.function().items()):
+            yield f'{self.name}{label_text(self.labelnames, labels)} {value}'
+
+
+class EventLog:
+    """Lock-free recorder for per-call events.
+
+    record() is one deque.append, which is atomic. fold(events) turns a batch
+    of events into metric updates; it runs when the backlog reaches drain_at
+    and before every scrape. A thread that finds another one draining skips
+    the drain instead of waiting.
+    """
+
+    def __init__(self, fold, drain_at=2048):
+        self.fold = fold
+        self.drain_at = drain_at
+        self.events = deque()
+        self._lock = threading.Lock()
+        _event_logs.append(self)
+    
+    def record(self, event):
+        self.events.append(event)
+        if len(self.events) >= self.drain_at:
+            self.drain()
+    
+    def drain(self, wait=False):
+        if not self._lock.acquire(blocking=wait):
+            return
+        try:
+            batch = []
+            pop = self.events.popleft
+            try:
+                while True:
+                    batch.append(pop())
+            except IndexError:
+                pass
+            if batch:
+                self.fold(batch)
+        finally:
+            self._lock.release()
+
+
+def render():
+    """All metrics in Prometheus text exposition format"""
+    for event_log in _event_logs:
+        event_log.drain(wait=True)
+    return '\n'.join(metric.render() for metric in _metrics) + '\n'
+
+
+# Prediction metrics, recorded by ml_predictor
+
+STAGE_SECONDS = Histogram(
+    'loan_predictor_stage_seconds',
+    'Time spent per prediction stage (preprocess, encode, infer); mode is single or batch.',
+    ['stage', 'mode'],
+)
+PREDICTION_SECONDS = Histogram(
+    'loan_predictor_prediction_seconds',
+    'End-to-end LoanPredictor.predict() latency.',
+    ['model'],
+)
+PREDICTIONS = Counter(
+    'loan_predictor_predictions',
+    'Decisions made, by model kind, model version and outcome.',
+    ['model', 'model_version', 'outcome'],
+)
+FALLBACKS = Counter(
+    'loan_predictor_fallbacks',
+    'Predictions answered by the rule-based scorer, by reason.',
+    ['reason'],
+)
+ERRORS = Counter(
+    'loan_predictor_errors',
+    'Exceptions raised while scoring, by entry point.',
+    ['where'],
+)
+
+# Request metrics, recorded by RequestMetricsMiddleware
+
+REQUEST_SECONDS = Histogram(
+    'loan_predictor_request_seconds',
+    'Request latency by view and method.',
+    ['view', 'method'],
+)
+REQUESTS = Counter(
+    'loan_predictor_requests',
+    'Requests by view, method and status code.',
+    ['view', 'method', 'status'],
+)
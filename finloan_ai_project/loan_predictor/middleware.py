@@ -0,0 +1,41 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import REQUEST_SECONDS, REQUESTS
+
+
+class RequestMetricsMiddleware:
+    """Record latency and status of every request, labelled by URL name.
+
+    For streaming responses the time covers the view, not sending the body.
+    Sync and async capable, so async views under ASGI run without a thread
+    switch.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, start)
+        return response
+    
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, start)
+        return response
+    
+    def record(self, request, response, start):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        REQUEST_SECONDS.observe(time.perf_counter() - start, view, request.method)
+        REQUESTS.inc(view, request.method, str(response.status_code))
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:29
+
+from django.db import migrations, models
+
+
+def populate_stats(apps, schema_editor):
+    from loan_predictor.stats import rebuild_stats
+    rebuild_stats(apps.get_model('loan_predictor', 'LoanApplication'),
+                  apps.get_model('loan_predictor', 'LoanStatsBucket'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan_predictor', '0003_alter_loanapplication_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanStatsBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=10)),
+                ('education', models.CharField(max_length=20)),
+                ('property_area', models.CharField(max_length=10)),
+                ('count', models.IntegerField(default=0)),
+                ('probability_sum', models.FloatField(default=0)),
+                ('probability_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Loan Stats Bucket',
+                'verbose_name_plural': 'Loan Stats Buckets',
+                'unique_together': {('day', 'status', 'education', 'property_area')},
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan_predictor', '0004_loanstatsbucket'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['created_at'], name='loanapp_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['loan_status', 'created_at'], name='loanapp_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['education', 'created_at'], name='loanapp_edu_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['property_area', 'education', 'created_at'], name='loanapp_area_edu_created_idx'),
+        ),
+    ]
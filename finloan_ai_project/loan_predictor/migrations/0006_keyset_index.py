@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan_predictor', '0005_loanapplication_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='loanapplication',
+            name='loanapp_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['created_at', 'id'], name='loanapp_created_id_idx'),
+        ),
+    ]
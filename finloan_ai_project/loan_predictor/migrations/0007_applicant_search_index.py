@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:41
+
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from loan_predictor.search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from loan_predictor.search import uninstall_search_index
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan_predictor', '0006_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan_predictor', '0007_applicant_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanapplication',
+            name='model_version',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def install_search_index(apps, schema_editor):
+    # SQLite rebuilds the table for AddField, dropping the FTS sync triggers
+    from loan_predictor.search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan_predictor', '0008_loanapplication_model_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanapplication',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['updated_at', 'id'], name='loanapp_updated_id_idx'),
+        ),
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
@@ -1,58 +1,433 @@
+import hashlib
 import joblib
+import itertools
+import logging
+import math
 import pandas as pd
 import numpy as np
 import os
+import threading
+import time
+from types import SimpleNamespace
 from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from . import model_registry
+from .log import sampled
+from .metrics import ERRORS, FALLBACKS, PREDICTION_SECONDS, PREDICTIONS, STAGE_SECONDS, EventLog, Gauge
+from .prediction_cache import PredictionCache, cache_key
+
+
+logger = logging.getLogger(__name__)
+# Per-prediction inputs and scores; sampled, enable with level DEBUG
+payload_logger = logging.getLogger(__name__ + '.payload')
+
+
+# Categorical columns the training script label-encodes
+CATEGORICAL_COLUMNS = ['Gender', 'Married', 'Dependents', 'Education', 'Self_Employed', 'Property_Area']
+
+# LoanApplication fields read when scoring, mapped to training feature names
+SCORING_FIELDS = {
+    'gender': 'Gender',
+    'married': 'Married',
+    'dependents': 'Dependents',
+    'education': 'Education',
+    'self_employed': 'Self_Employed',
+    'applicant_income': 'ApplicantIncome',
+    'coapplicant_income': 'CoapplicantIncome',
+    'loan_amount': 'LoanAmount',
+    'loan_amount_term': 'Loan_Amount_Term',
+    'credit_history': 'Credit_History',
+    'property_area': 'Property_Area',
+}
+
+# Maximum allowed difference between compiled and sklearn probabilities
+COMPILED_TOLERANCE = 1e-9
+
+# Layout version of the serving artifact written by train_loan_model.py
+SERVING_FORMAT = 1
+
+# model_version recorded for the unversioned ml_models/*.joblib files and for
+# rule-based fallbacks
+LEGACY_VERSION = 'legacy'
+RULE_BASED_VERSION = 'rule-based'
+
+
+def resident_memory_mb():
+    """Current resident set size of this process in MB (peak RSS if unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class CompiledScorer:
+    """Pandas-free logistic regression scorer.
+
+    Folds the StandardScaler into the logistic regression coefficients so an
+    application is scored with plain dict lookups, one dot product and a sigmoid.
+    """
+
+    def __init__(self, feature_names, category_maps, coef, intercept, mean, scale):
+        self.feature_names = list(feature_names)
+        # LabelEncoder.transform -> dict lookup
+        self.category_maps = category_maps
+
+        # (x - mean) / scale . coef + intercept == x . (coef / scale) + bias
+        coef = np.asarray(coef, dtype=np.float64).ravel()
+        self.weights = coef / scale
+        self.bias = float(intercept - np.dot(mean / scale, coef))
+
+    def feature_vector(self, data):
+        """Build the model input vector from preprocessed application data"""
+        values = []
+        for col in self.feature_names:
+            mapping = self.category_maps.get(col)
+            if mapping is None:
+                values.append(data[col])
+            elif col == 'Dependents':
+                # Same fallback as the sklearn path for unseen values
+                values.append(mapping.get(data[col], 0))
+            else:
+                values.append(mapping[data[col]])
+        return np.array(values, dtype=np.float64)
+
+    def probability(self, data):
+        """Return the approval probability (class 1) for preprocessed data"""
+        return self.score(self.feature_vector(data))
+
+    def score(self, vector):
+        """Return the approval probability for one encoded feature vector"""
+        z = float(np.dot(self.weights, vector)) + self.bias
+        # Numerically stable sigmoid
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        exp_z = math.exp(z)
+        return exp_z / (1.0 + exp_z)
+
+    def probabilities(self, X):
+        """Vectorized approval probabilities for an encoded feature matrix"""
+        z = X @ self.weights + self.bias
+        return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+
+def category_maps_from(classes):
+    """{column: {label: code}} from each column's LabelEncoder classes"""
+    return {
+        col: {label: code for code, label in enumerate(classes[col])}
+        for col in CATEGORICAL_COLUMNS
+    }
+
+
+class ModelBundle:
+    """One model version: models, encoders, scaler and feature names.
+
+    A bundle is not modified once loaded. LoanPredictor swaps whole bundles,
+    so a prediction never mixes files from two versions. Bundles loaded from
+    the serving artifact hold plain arrays; the sklearn estimators are only
+    rebuilt when the compiled scorer is turned off.
+    """
+
+    def __init__(self, version, models, encoders, scaler, feature_names, artifact=None):
+        self.version = version
+        self.models = models
+        self.encoders = encoders
+        self.scaler = scaler
+        self.feature_names = feature_names
+        self.artifact = artifact
+        self.compiled = None
+        self._fingerprint = None
+        
+        if artifact is not None:
+            self.category_maps = category_maps_from(
+                {col: artifact[f'classes_{col}'].tolist() for col in CATEGORICAL_COLUMNS}
+            )
+        else:
+            self.category_maps = category_maps_from(
+                {col: list(encoders[col].classes_) for col in CATEGORICAL_COLUMNS}
+            )
+    
+    @classmethod
+    def load(cls, directory, version):
+        """Load the serving artifact if the directory has one, else the joblib files"""
+        serving_path = os.path.join(directory, model_registry.SERVING_ARTIFACT)
+        if os.path.exists(serving_path):
+            return cls.load_serving(serving_path, version)
+        
+        return cls(
+            version,
+            joblib.load(os.path.join(directory, 'loan_models.joblib')),
+            joblib.load(os.path.join(directory, 'encoders.joblib')),
+            joblib.load(os.path.join(directory, 'scaler.joblib')),
+            joblib.load(os.path.join(directory, 'features.joblib')),
+        )
+    
+    @classmethod
+    def load_serving(cls, path, version):
+        """Load the pickle-free .npz written by train_loan_model.py"""
+        with np.load(path, allow_pickle=False) as arrays:
+            artifact = {name: arrays[name] for name in arrays.files}
+        if int(artifact['format']) != SERVING_FORMAT:
+            raise ValueError(f"Unsupported serving artifact format {int(artifact['format'])}")
+        return cls(version, None, None, None, artifact['feature_names'].tolist(), artifact=artifact)
+    
+    @property
+    def fingerprint(self):
+        """Version plus a digest of the scoring parameters, e.g. for cache keys.
+
+        Retrained legacy files keep the 'legacy' version, not the fingerprint.
+        """
+        if self._fingerprint is None:
+            if self.artifact is not None:
+                arrays = [self.artifact[name] for name in ('coef', 'intercept', 'mean', 'scale')]
+            else:
+                model = self.models['logistic_regression']
+                arrays = [model.coef_, model.intercept_, self.scaler.mean_, self.scaler.scale_]
+            digest = hashlib.sha256(repr((self.feature_names, self.category_maps)).encode())
+            for array in arrays:
+                digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+            self._fingerprint = f'{self.version}:{digest.hexdigest()[:16]}'
+        return self._fingerprint
+    
+    def compile(self):
+        """Build the compiled scorer and check it against the sklearn pipeline"""
+        self.compiled = None
+        use_compiled = getattr(settings, 'LOAN_PREDICTOR_COMPILED', True)
+        
+        if self.artifact is not None:
+            if use_compiled:
+                # The arrays are the model; there is no sklearn pipeline to check against
+                self.compiled = CompiledScorer(
+                    self.feature_names, self.category_maps, self.artifact['coef'],
+                    float(self.artifact['intercept']), self.artifact['mean'], self.artifact['scale'],
+                )
+            elif self.models is None:
+                self.models, self.encoders, self.scaler = self.build_estimators()
+            return
+        
+        if not use_compiled:
+            return
+        
+        try:
+            model = self.models['logistic_regression']
+            compiled = CompiledScorer(
+                self.feature_names, self.category_maps, model.coef_, model.intercept_[0],
+                np.asarray(self.scaler.mean_, dtype=np.float64),
+                np.asarray(self.scaler.scale_, dtype=np.float64),
+            )
+            
+            # Probe with the training means and a few offsets around them
+            probe = np.asarray(self.scaler.mean_, dtype=np.float64)
+            scale = np.asarray(self.scaler.scale_, dtype=np.float64)
+            X = np.vstack([probe + k * scale for k in (-2, -1, 0, 1, 2)])
+            expected = model.predict_proba(self.scaler.transform(
+                pd.DataFrame(X, columns=self.feature_names)))[:, 1]
+            difference = np.max(np.abs(compiled.probabilities(X) - expected))
+            if difference > COMPILED_TOLERANCE:
+                logger.warning("Compiled scorer disabled: differs from sklearn by %.3g", difference)
+                return
+            
+            self.compiled = compiled
+        except Exception:
+            logger.exception("Error compiling models")
+    
+    def build_estimators(self):
+        """Rebuild fitted sklearn objects from the serving artifact arrays"""
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
+        
+        artifact = self.artifact
+        feature_names = np.array(self.feature_names, dtype=object)
+        
+        model = LogisticRegression()
+        model.coef_ = artifact['coef'].reshape(1, -1)
+        model.intercept_ = np.array([float(artifact['intercept'])])
+        model.classes_ = artifact['classes']
+        # Fitted on scaled arrays, as train_loan_model.py does: no feature names
+        model.n_features_in_ = len(feature_names)
+        
+        scaler = StandardScaler()
+        scaler.mean_ = artifact['mean']
+        scaler.scale_ = artifact['scale']
+        scaler.var_ = artifact['scale'] ** 2
+        scaler.n_features_in_ = len(feature_names)
+        scaler.feature_names_in_ = feature_names
+        
+        encoders = {}
+        for col in CATEGORICAL_COLUMNS:
+            encoders[col] = LabelEncoder()
+            encoders[col].classes_ = artifact[f'classes_{col}']
+        
+        return {'logistic_regression': model}, encoders, scaler
 
 
 class LoanPredictor:
-    def __init__(self):
-        self.models = None
-        self.encoders = None
-        self.scaler = None
-        self.feature_names = None
+    def __init__(self, cache=None):
+        self.bundle = None
+        # PredictionCache for predict(), or None
+        self.cache = cache
         self._models_loaded = False
+        self._load_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._next_pointer_check = 0.0
+        self._failed_version = None
+    
+    # Read-only views of the active bundle
+    
+    @property
+    def models(self):
+        return self.bundle.models if self.bundle else None
+    
+    @property
+    def encoders(self):
+        return self.bundle.encoders if self.bundle else None
+    
+    @property
+    def scaler(self):
+        return self.bundle.scaler if self.bundle else None
+    
+    @property
+    def feature_names(self):
+        return self.bundle.feature_names if self.bundle else None
+    
+    @property
+    def compiled(self):
+        return self.bundle.compiled if self.bundle else None
+    
+    @property
+    def model_version(self):
+        return self.bundle.version if self.bundle else None
     
     def _ensure_models_loaded(self):
         if not self._models_loaded:
-            self.load_models()
-            self._models_loaded = True
+            with self._load_lock:
+                if not self._models_loaded:
+                    self.load_models()
     
-    def predict(self, application):
+    def warm_up(self):
+        """Load the models and run a synthetic prediction through each path.
+
+        Called from LoanPredictorConfig.load_predictor() so the first real request does
+        not pay for unpickling or first-call imports. Returns load time, warm-up
+        time and resident memory.
+        """
+        start = time.perf_counter()
         self._ensure_models_loaded()
+        loaded = time.perf_counter()
+        
+        application = SimpleNamespace(
+            pk=None, applicant_name='Warm-up', gender='Male', married='Yes', dependents='1',
+            education='Graduate', self_employed='No', applicant_income=5000,
+            coapplicant_income=2000, loan_amount=150, loan_amount_term=360,
+            credit_history=True, property_area='Urban',
+        )
+        self.predict(application)
+        self.predict_many([application])
+        warmed = time.perf_counter()
+        
+        return {
+            'load_seconds': loaded - start,
+            'warm_up_seconds': warmed - loaded,
+            'resident_mb': resident_memory_mb(),
+            'ml_models': self.bundle is not None,
+            'compiled': self.compiled is not None,
+            'model_version': self.model_version,
+        }
     
     def load_models(self):
-        """Load pre-trained models"""
+        """Load the active registry version, or the legacy ml_models/ files"""
+        self._models_loaded = True
+        self._next_pointer_check = time.monotonic() + getattr(settings, 'LOAN_MODEL_RELOAD_INTERVAL', 5)
+        
+        version = model_registry.current_version()
+        if version:
+            try:
+                self.bundle = self.load_bundle(version)
+                logger.info("ML models loaded successfully! (version %s)", version)
+            except Exception:
+                logger.exception("Error loading model version %s", version)
+                self.bundle = None
+            return
+        
         try:
             model_path = os.path.join(settings.BASE_DIR, 'ml_models')
             
             # Check if model files exist
-            model_files = [
-                'loan_models.joblib',
-                'encoders.joblib', 
-                'scaler.joblib',
-                'features.joblib'
-            ]
-            
             missing_files = []
-            for file in model_files:
+            for file in model_registry.bundle_files(model_path):
                 if not os.path.exists(f'{model_path}/{file}'):
                     missing_files.append(file)
             
             if missing_files:
-                print(f"ML model files missing: {missing_files}")
-                print("Using rule-based prediction as fallback")
-                self.models = None
+                logger.warning("ML model files missing: %s. Using rule-based prediction as fallback", missing_files)
+                self.bundle = None
                 return
             
-            self.models = joblib.load(f'{model_path}/loan_models.joblib')
-            self.encoders = joblib.load(f'{model_path}/encoders.joblib')
-            self.scaler = joblib.load(f'{model_path}/scaler.joblib')
-            self.feature_names = joblib.load(f'{model_path}/features.joblib')
-            print("ML models loaded successfully!")
-        except Exception as e:
-            print(f"Error loading models: {e}")
-            self.models = None
+            bundle = ModelBundle.load(model_path, LEGACY_VERSION)
+            logger.info("ML models loaded successfully!")
+        except Exception:
+            logger.exception("Error loading models")
+            self.bundle = None
+            return
+        
+        bundle.compile()
+        self.bundle = bundle
+    
+    def load_bundle(self, version):
+        """Verify and load a registry version, without activating it"""
+        model_registry.verify(version)
+        bundle = ModelBundle.load(model_registry.bundle_dir(version), version)
+        bundle.compile()
+        return bundle
+    
+    def swap_to(self, version):
+        """Load a registry version and make it the active bundle.
+
+        The swap is a single reference assignment: predictions already running
+        finish with the bundle they started with.
+        """
+        bundle = self.load_bundle(version)
+        self.bundle = bundle
+        self._models_loaded = True
+        self._failed_version = None
+        logger.info("Model version %s active", version)
+        return bundle
+    
+    def check_for_new_version(self):
+        """Reload in the background when the registry pointer has moved.
+
+        The pointer is read at most every LOAN_MODEL_RELOAD_INTERVAL seconds
+        (0 disables watching); the new bundle is loaded off the request thread.
+        """
+        interval = getattr(settings, 'LOAN_MODEL_RELOAD_INTERVAL', 5)
+        now = time.monotonic()
+        if not interval or now < self._next_pointer_check:
+            return
+        self._next_pointer_check = now + interval
+        
+        version = model_registry.current_version()
+        if not version or version in (self.model_version, self._failed_version):
+            return
+        if self._reload_lock.acquire(blocking=False):
+            threading.Thread(target=self._reload, args=(version,), daemon=True).start()
+    
+    def _reload(self, version):
+        try:
+            self.swap_to(version)
+        except Exception:
+            # Keep serving the current bundle; don't retry until CURRENT changes
+            logger.exception("Error loading model version %s", version)
+            self._failed_version = version
+        finally:
+            self._reload_lock.release()
     
     def preprocess_application(self, application):
         """Convert Django model to ML input format"""
@@ -72,26 +447,109 @@ class LoanPredictor:
         
         # Calculate engineered features
         data['Total_Income'] = data['ApplicantIncome'] + data['CoapplicantIncome']
-        data['Loan_Income_Ratio'] = data['LoanAmount'] * 1000 / data['Total_Income'] if data['Total_Income'] > 0 else 999
+        # Same definitions as train_loan_model.py (LoanAmount is in thousands)
+        data['Loan_Income_Ratio'] = data['LoanAmount'] / data['Total_Income'] if data['Total_Income'] > 0 else 999
         
         # Handle dependents conversion
-        dependents_num = 1 if data['Dependents'] == '3+' else int(data['Dependents'])
+        dependents_num = 3 if data['Dependents'] == '3+' else int(data['Dependents'])
         data['Income_per_Dependent'] = data['Total_Income'] / (dependents_num + 1)
         
         return data
     
     def predict(self, application):
         """Make loan prediction using trained ML models"""
-        if not self.models:
-            return self.rule_based_prediction(application)
+        start = time.perf_counter()
+        self._ensure_models_loaded()
+        self.check_for_new_version()
+        # The whole prediction uses this bundle, even if a swap happens meanwhile
+        bundle = self.bundle
+        if bundle is None:
+            FALLBACKS.inc('no_model')
+            result, stages = self.rule_based_prediction(application), None
+        elif self.cache is not None:
+            result, stages = self._predict_cached(bundle, application)
+        else:
+            result, stages = self._predict_with(bundle, application)
         
+        PREDICTION_EVENTS.record(
+            (result['model_version'], result['approved'], time.perf_counter() - start, stages)
+        )
+        return result
+    
+    def _predict_cached(self, bundle, application):
+        """_predict_with() through the prediction cache; hits have no stage durations"""
         try:
-            # Preprocess input
             input_data = self.preprocess_application(application)
+        except Exception:
+            # Let _predict_with report the error and fall back
+            return self._predict_with(bundle, application)
+        
+        key = cache_key(bundle.fingerprint, input_data)
+        result = self.cache.get(bundle.fingerprint, key)
+        if result is not None:
+            return result, None
+        result, stages = self._predict_with(bundle, application, input_data)
+        # stages is None for rule-based fallbacks, which are not cached
+        if stages is not None:
+            self.cache.set(bundle.fingerprint, key, result)
+        return result, stages
+    
+    def cached_prediction(self, application):
+        """(cached result or None, entry) for callers that score outside predict().
+        
+        Pass entry to cache_prediction() with the result once it is scored.
+        Uses the loaded bundle as is, so it never blocks on loading one.
+        """
+        bundle = self.bundle
+        if self.cache is None or bundle is None:
+            return None, None
+        start = time.perf_counter()
+        try:
+            key = cache_key(bundle.fingerprint, self.preprocess_application(application))
+        except Exception:
+            # Scoring reports the error and falls back
+            return None, None
+        result = self.cache.get(bundle.fingerprint, key)
+        if result is not None:
+            PREDICTION_EVENTS.record(
+                (result['model_version'], result['approved'], time.perf_counter() - start, None)
+            )
+        return result, (bundle, key)
+    
+    def cache_prediction(self, entry, result):
+        """Cache a result scored after a cached_prediction() miss"""
+        if entry is None:
+            return
+        bundle, key = entry
+        # Neither a rule-based fallback nor a result of a bundle swapped in meanwhile
+        if result['model_version'] == bundle.version:
+            self.cache.set(bundle.fingerprint, key, result)
+    
+    def _predict_with(self, bundle, application, input_data=None):
+        """Score one application with bundle, falling back to the rules on error.
+
+        Returns the result and the (preprocess, encode, infer) durations.
+        input_data is the application's preprocess_application() output, if
+        the caller already has it.
+        """
+        try:
+            # Preprocess input
+            started = time.perf_counter()
+            if input_data is None:
+                input_data = self.preprocess_application(application)
+            preprocessed = time.perf_counter()
+            
+            if bundle.compiled is not None:
+                vector = bundle.compiled.feature_vector(input_data)
+                encoded = time.perf_counter()
+                probability = bundle.compiled.score(vector)
+                stages = (preprocessed - started, encoded - preprocessed, time.perf_counter() - encoded)
+                return self._compiled_result(input_data, probability, bundle), stages
+            
             input_df = pd.DataFrame([input_data])
             
             # Encode categorical features
-            for col, encoder in self.encoders.items():
+            for col, encoder in bundle.encoders.items():
                 if col != 'Loan_Status' and col in input_df.columns:
                     if col in ['Gender', 'Married', 'Education', 'Self_Employed', 'Property_Area']:
                         input_df[col] = encoder.transform(input_df[col])
@@ -102,95 +560,406 @@ class LoanPredictor:
                         except ValueError:
                             input_df[col] = 0
             
+            encoded = time.perf_counter()
+            
             # Use Logistic Regression (best performer)
-            model = self.models['logistic_regression']
+            model = bundle.models['logistic_regression']
             
-            # Make prediction
-            prediction = model.predict(input_df)[0]
-            probabilities = model.predict_proba(input_df)[0]
+            # Make prediction on scaled features, as in training
+            probabilities = model.predict_proba(bundle.scaler.transform(input_df[bundle.feature_names]))[0]
+            prediction = model.classes_[np.argmax(probabilities)]
+            stages = (preprocessed - started, encoded - preprocessed, time.perf_counter() - encoded)
 
-            print(f"DEBUG ML INPUT: {input_df.to_dict()}")
-            print(f"DEBUG ML PREDICTION: {prediction}")
-            print(f"DEBUG ML PROBABILITIES: {probabilities}")
-            print(f"DEBUG PREPROCESSED DATA: {input_data}")
+            if sampled(payload_logger):
+                payload_logger.debug(
+                    "ML input %s prediction %s probabilities %s preprocessed %s",
+                    input_df.to_dict(), prediction, probabilities, input_data,
+                )
             
             return {
                 'approved': bool(prediction == 1),
                 'approval_probability': float(probabilities[1] * 100),
                 'confidence': float(max(probabilities) * 100),
-                'model_used': 'Logistic Regression (86% accuracy)'
-            }
+                'model_used': 'Logistic Regression (86% accuracy)',
+                'model_version': bundle.version,
+            }, stages
             
-        except Exception as e:
-            print(f"Prediction error: {e}")
-            return self.rule_based_prediction(application)
+        except Exception:
+            logger.exception("Prediction error for %s", application.applicant_name)
+            ERRORS.inc('predict')
+            FALLBACKS.inc('error')
+            return self.rule_based_prediction(application), None
+    
+    def compiled_prediction(self, input_data, bundle=None):
+        """Score preprocessed data with the compiled scorer"""
+        bundle = bundle or self.bundle
+        return self._compiled_result(input_data, bundle.compiled.probability(input_data), bundle)
+    
+    def _compiled_result(self, input_data, probability, bundle):
+        if sampled(payload_logger):
+            payload_logger.debug("Compiled input %s probability %.4f (version %s)",
+                                 input_data, probability, bundle.version)
+        
+        return {
+            'approved': probability > 0.5,
+            'approval_probability': probability * 100,
+            'confidence': max(probability, 1.0 - probability) * 100,
+            'model_used': 'Logistic Regression (86% accuracy)',
+            'model_version': bundle.version,
+        }
+    
+    def predict_many(self, applications, chunk_size=2000, save=False):
+        """Score many applications at once, returning results in input order.
+
+        Accepts a LoanApplication queryset (only the scoring columns are read,
+        via values_list) or any iterable of LoanApplication instances. Each
+        chunk is encoded and scored as one NumPy matrix. With save=True the
+        approval_probability, loan_status and model_version are written back
+        with bulk_update and the dashboard counters are adjusted to match. All
+        chunks are scored with the bundle active when the call started.
+        """
+        from .models import LoanApplication
+        from .stats import add_contribution, apply_deltas, bucket_key, new_deltas
+        
+        bundle = self.serving_bundle()
+        
+        fields = list(SCORING_FIELDS)
+        if save:
+            # Current values, so the counters can be moved between buckets
+            fields += ['created_at', 'loan_status', 'approval_probability']
+        if isinstance(applications, QuerySet):
+            rows = applications.values_list('pk', *fields).iterator(chunk_size=chunk_size)
+        else:
+            rows = ((app.pk, *(getattr(app, field) for field in fields)) for app in applications)
+        
+        results = []
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            
+            chunk_results = self._predict_rows(chunk, bundle)
+            results.extend(chunk_results)
+            
+            if save:
+                updates = []
+                deltas = new_deltas()
+                # bulk_update doesn't apply auto_now
+                updated_at = timezone.now()
+                for row, result in zip(chunk, chunk_results):
+                    if row[0] is None:
+                        continue
+                    values = dict(zip(fields, row[1:]))
+                    status = 'Approved' if result['approved'] else 'Rejected'
+                    updates.append(LoanApplication(
+                        pk=row[0],
+                        approval_probability=result['approval_probability'],
+                        loan_status=status,
+                        model_version=result['model_version'],
+                        updated_at=updated_at,
+                    ))
+                    
+                    # bulk_update bypasses the post_save counter signals
+                    old_key = bucket_key(values['created_at'], values['loan_status'],
+                                         values['education'], values['property_area'])
+                    add_contribution(deltas, (old_key, values['approval_probability']), -1)
+                    add_contribution(deltas, (old_key[:1] + (status,) + old_key[2:],
+                                              result['approval_probability']), 1)
+                
+                with transaction.atomic():
+                    LoanApplication.objects.bulk_update(
+                        updates, ['approval_probability', 'loan_status', 'model_version', 'updated_at'],
+                        batch_size=chunk_size
+                    )
+                    apply_deltas(deltas)
+        
+        return results
+    
+    def serving_bundle(self):
+        """The bundle to score with now (None means rule-based), after any pending reload"""
+        self._ensure_models_loaded()
+        self.check_for_new_version()
+        return self.bundle
+    
+    def score_rows(self, rows, bundle):
+        """Score (pk, *SCORING_FIELDS) tuples as one vectorized batch with bundle.
+
+        pk is only used to name rows in fallback logs and may be None.
+        """
+        return self._predict_rows(rows, bundle)
+    
+    def _predict_rows(self, rows, bundle):
+        """Score (pk, *SCORING_FIELDS) rows as one vectorized batch"""
+        if bundle is None:
+            FALLBACKS.inc('no_model', amount=len(rows))
+            return self._rule_based_rows(rows)
+        
+        started = time.perf_counter()
+        try:
+            X, valid = self.encode_rows(rows, bundle)
+        except Exception:
+            return self._predict_rows_isolated(rows, bundle)
+        encoded = time.perf_counter()
+        
+        try:
+            if bundle.compiled is not None:
+                probabilities = bundle.compiled.probabilities(X)
+            else:
+                model = bundle.models['logistic_regression']
+                scaled = bundle.scaler.transform(pd.DataFrame(X, columns=bundle.feature_names))
+                probabilities = model.predict_proba(scaled)[:, 1]
+            STAGE_SECONDS.observe(encoded - started, 'encode', 'batch')
+            STAGE_SECONDS.observe(time.perf_counter() - encoded, 'infer', 'batch')
+        except Exception:
+            logger.exception("Batch prediction error")
+            ERRORS.inc('predict_many')
+            FALLBACKS.inc('error', amount=len(rows))
+            return self._rule_based_rows(rows)
+        
+        results = []
+        approved = 0
+        model_used = 'Logistic Regression (86% accuracy)'
+        for row, probability, is_valid in zip(rows, probabilities.tolist(), valid.tolist()):
+            if not is_valid:
+                # Unknown category: same fallback as predict()
+                FALLBACKS.inc('unknown_category')
+                results.extend(self._rule_based_rows([row]))
+                continue
+            approved += probability > 0.5
+            results.append({
+                'approved': probability > 0.5,
+                'approval_probability': probability * 100,
+                'confidence': max(probability, 1.0 - probability) * 100,
+                'model_used': model_used,
+                'model_version': bundle.version,
+            })
+        
+        scored = int(valid.sum())
+        if approved:
+            PREDICTIONS.inc('ml', bundle.version, 'approved', amount=approved)
+        if scored - approved:
+            PREDICTIONS.inc('ml', bundle.version, 'rejected', amount=scored - approved)
+        return results
+    
+    def _predict_rows_isolated(self, rows, bundle):
+        """Score rows whose batch failed to encode, isolating the bad ones.
+
+        Rows that don't encode on their own fall back to the rules; the rest
+        are still scored with bundle, so one malformed row doesn't cost the
+        whole batch its model predictions.
+        """
+        good, failed = [], []
+        for index, row in enumerate(rows):
+            try:
+                self.encode_rows([row], bundle)
+            except Exception:
+                logger.exception("Prediction error for #%s", row[0])
+                failed.append(index)
+            else:
+                good.append(index)
+        
+        ERRORS.inc('predict_many')
+        if not failed:
+            # Only fails as a batch: nothing to isolate
+            logger.error("Batch prediction error with no failing row, using rule-based fallback")
+            FALLBACKS.inc('error', amount=len(rows))
+            return self._rule_based_rows(rows)
+        
+        FALLBACKS.inc('error', amount=len(failed))
+        results = [None] * len(rows)
+        for index, result in zip(failed, self._rule_based_rows([rows[i] for i in failed])):
+            results[index] = result
+        if good:
+            for index, result in zip(good, self._predict_rows([rows[i] for i in good], bundle)):
+                results[index] = result
+        return results
+    
+    def _rule_based_rows(self, rows):
+        """rule_based_prediction for (pk, *SCORING_FIELDS) rows"""
+        results = [self.rule_based_prediction(self._row_namespace(row)) for row in rows]
+        approved = sum(result['approved'] for result in results)
+        if approved:
+            PREDICTIONS.inc('rule_based', RULE_BASED_VERSION, 'approved', amount=approved)
+        if len(results) - approved:
+            PREDICTIONS.inc('rule_based', RULE_BASED_VERSION, 'rejected', amount=len(results) - approved)
+        return results
+    
+    def encode_rows(self, rows, bundle=None):
+        """Build the encoded feature matrix for (pk, *SCORING_FIELDS) rows.
+
+        Returns the matrix and a boolean mask of rows whose categorical values
+        were all known to the encoders.
+        """
+        bundle = bundle or self.bundle
+        n_rows = len(rows)
+        columns = dict(zip(SCORING_FIELDS.values(), list(zip(*rows))[1:]))
+        valid = np.ones(n_rows, dtype=bool)
+        features = {}
+        
+        for col in CATEGORICAL_COLUMNS:
+            mapping = bundle.category_maps[col]
+            if col == 'Dependents':
+                codes = np.fromiter((mapping.get(str(v), 0) for v in columns[col]), np.float64, n_rows)
+            else:
+                codes = np.fromiter((mapping.get(v, -1) for v in columns[col]), np.float64, n_rows)
+                valid &= codes >= 0
+                codes[codes < 0] = 0
+            features[col] = codes
+        
+        applicant_income = np.asarray(columns['ApplicantIncome'], dtype=np.float64)
+        coapplicant_income = np.array([v or 0 for v in columns['CoapplicantIncome']], dtype=np.float64)
+        loan_amount = np.asarray(columns['LoanAmount'], dtype=np.float64)
+        features['ApplicantIncome'] = applicant_income
+        features['CoapplicantIncome'] = coapplicant_income
+        features['LoanAmount'] = loan_amount
+        features['Loan_Amount_Term'] = np.asarray(columns['Loan_Amount_Term'], dtype=np.float64)
+        features['Credit_History'] = np.array([1.0 if v else 0.0 for v in columns['Credit_History']])
+        
+        # Engineered features, matching preprocess_application
+        total_income = applicant_income + coapplicant_income
+        features['Total_Income'] = total_income
+        with np.errstate(divide='ignore', invalid='ignore'):
+            features['Loan_Income_Ratio'] = np.where(
+                total_income > 0, loan_amount / total_income, 999.0
+            )
+        dependents = np.fromiter(
+            (3 if v == '3+' else int(v) for v in columns['Dependents']), np.float64, n_rows
+        )
+        features['Income_per_Dependent'] = total_income / (dependents + 1)
+        
+        X = np.column_stack([features[name] for name in bundle.feature_names])
+        return X, valid
+    
+    def _row_namespace(self, row):
+        """Wrap a (pk, *SCORING_FIELDS) row for rule_based_prediction"""
+        application = SimpleNamespace(**dict(zip(SCORING_FIELDS, row[1:])))
+        application.applicant_name = f'#{row[0]}'
+        return application
     
     def rule_based_prediction(self, application):
         """FIXED: Rule-based prediction with correct logic"""
         score = 0
-        
-        print(f"DEBUG: Rule-based prediction for {application.applicant_name}")
+        # (factor, points) for the debug log
+        points = []
         
         # Credit history (most important factor - 35 points)
         if application.credit_history:
             score += 35
-            print(f"DEBUG: Credit history: +35, total: {score}")
+            points.append(('credit history', 35))
         
         # Income level (25 points max)
         total_income = application.applicant_income + (application.coapplicant_income or 0)
-        print(f"DEBUG: Total income: {total_income}")
         
         if total_income >= 8000:
             score += 25
-            print(f"DEBUG: High income: +25, total: {score}")
+            points.append(('high income', 25))
         elif total_income >= 5000:
             score += 20
-            print(f"DEBUG: Medium income: +20, total: {score}")
+            points.append(('medium income', 20))
         elif total_income >= 3000:
             score += 15
-            print(f"DEBUG: Low income: +15, total: {score}")
+            points.append(('low income', 15))
         
         # Education (15 points)
         if application.education == 'Graduate':
             score += 15
-            print(f"DEBUG: Graduate: +15, total: {score}")
+            points.append(('graduate', 15))
         
         # Property area (10 points)
         if application.property_area == 'Urban':
             score += 10
-            print(f"DEBUG: Urban: +10, total: {score}")
+            points.append(('urban', 10))
         elif application.property_area == 'Semiurban':
             score += 5
-            print(f"DEBUG: Semiurban: +5, total: {score}")
+            points.append(('semiurban', 5))
         
         # FIXED: Loan-income ratio (15 points max)
+        loan_income_ratio = None
         if total_income > 0:
             loan_income_ratio = (application.loan_amount * 1000) / total_income
-            print(f"DEBUG: Loan-income ratio: {loan_income_ratio:.2f}")
             
             if loan_income_ratio <= 10:
                 score += 15
-                print(f"DEBUG: Excellent ratio: +15, total: {score}")
+                points.append(('excellent ratio', 15))
             elif loan_income_ratio <= 15:
                 score += 10
-                print(f"DEBUG: Good ratio: +10, total: {score}")
+                points.append(('good ratio', 10))
             elif loan_income_ratio <= 20:
                 score += 5
-                print(f"DEBUG: Fair ratio: +5, total: {score}")
+                points.append(('fair ratio', 5))
         
         # FIXED: Lower threshold for approval
         probability = min(score, 100)
         approved = probability >= 65  # Changed from 60 to 65
         
-        print(f"DEBUG: Final score: {score}, probability: {probability}%, approved: {approved}")
+        if sampled(payload_logger):
+            payload_logger.debug(
+                "Rule-based prediction for %s: total income %s, loan-income ratio %s, points %s, "
+                "score %s, approved %s",
+                application.applicant_name, total_income, loan_income_ratio, points, score, approved,
+            )
         
         return {
             'approved': approved,
             'approval_probability': float(probability),
             'confidence': 85.0,
-            'model_used': 'Rule-based (fallback)'
+            'model_used': 'Rule-based (fallback)',
+            'model_version': RULE_BASED_VERSION,
         }
 
 
+def fold_predictions(events):
+    """Turn predict() events into metric updates, one vectorized batch per version.
+
+    Events are (model_version, approved, seconds, stage durations or None).
+    """
+    groups = {}
+    for event in events:
+        groups.setdefault(event[0], []).append(event)
+    
+    for version, group in groups.items():
+        model = 'rule_based' if version == RULE_BASED_VERSION else 'ml'
+        approved = sum(1 for event in group if event[1])
+        if approved:
+            PREDICTIONS.inc(model, version, 'approved', amount=approved)
+        if len(group) - approved:
+            PREDICTIONS.inc(model, version, 'rejected', amount=len(group) - approved)
+        PREDICTION_SECONDS.labels(model).observe_many(np.array([event[2] for event in group]))
+        
+        stages = np.array([event[3] for event in group if event[3] is not None]).reshape(-1, 3)
+        if len(stages):
+            for column, stage in enumerate(('preprocess', 'encode', 'infer')):
+                STAGE_SECONDS.labels(stage, 'single').observe_many(stages[:, column])
+
+
+PREDICTION_EVENTS = EventLog(fold_predictions)
+
+def prediction_cache_from_settings():
+    """The PredictionCache configured by LOAN_PREDICTION_CACHE_*, or None"""
+    max_entries = getattr(settings, 'LOAN_PREDICTION_CACHE_SIZE', 0)
+    if not max_entries:
+        return None
+    return PredictionCache(
+        max_entries,
+        alias=getattr(settings, 'LOAN_PREDICTION_CACHE_ALIAS', None),
+        timeout=getattr(settings, 'LOAN_PREDICTION_CACHE_TIMEOUT', 3600),
+    )
+
+
 # Initialize global predictor
-loan_predictor = LoanPredictor()
\ No newline at end of file
+loan_predictor = LoanPredictor(cache=prediction_cache_from_settings())
+
+MODEL_INFO = Gauge(
+    'loan_predictor_model_info',
+    'The model bundle this process is serving (value is always 1).',
+    ['model_version', 'compiled'],
+    function=lambda: {
+        (loan_predictor.model_version or RULE_BASED_VERSION, str(loan_predictor.compiled is not None).lower()): 1
+    },
+)
+
+PREDICTION_CACHE_ENTRIES = Gauge(
+    'loan_predictor_prediction_cache_entries',
+    'Results held in this process\'s prediction cache.',
+    function=lambda: {(): len(loan_predictor.cache.entries) if loan_predictor.cache else 0},
+)
@@ -0,0 +1,147 @@
+"""Versioned model bundles on disk.
+
+Layout::
+
+    <LOAN_MODEL_REGISTRY>/
+        CURRENT                   name of the active version
+        20261016-120000/
+            manifest.json         version, created_at and sha256 of every file
+            loan_serving.npz      pickle-free serving artifact, or the four
+                                  joblib files of train_loan_model.py
+
+Published versions are never modified. Activating a version only rewrites
+CURRENT (atomically), which running LoanPredictors pick up without restart.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.utils import timezone
+
+
+BUNDLE_FILES = ['loan_models.joblib', 'encoders.joblib', 'scaler.joblib', 'features.joblib']
+SERVING_ARTIFACT = 'loan_serving.npz'
+MANIFEST = 'manifest.json'
+POINTER = 'CURRENT'
+
+VERSION_RE = re.compile(r'^[\w.-]+$')
+
+
+class RegistryError(Exception):
+    pass
+
+
+def registry_dir():
+    return str(getattr(settings, 'LOAN_MODEL_REGISTRY',
+                       os.path.join(settings.BASE_DIR, 'ml_models', 'registry')))
+
+
+def bundle_dir(version):
+    if not version or not VERSION_RE.match(version):
+        raise RegistryError(f"Invalid model version: {version!r}")
+    return os.path.join(registry_dir(), version)
+
+
+def pointer_path():
+    return os.path.join(registry_dir(), POINTER)
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def bundle_files(source_dir):
+    """Files that make up the bundle in source_dir; the serving artifact wins"""
+    if os.path.exists(os.path.join(source_dir, SERVING_ARTIFACT)):
+        return [SERVING_ARTIFACT]
+    return BUNDLE_FILES
+
+
+def publish(source_dir, version=None, files=None):
+    """Copy a trained bundle into the registry as a new version; returns the version"""
+    files = files or bundle_files(source_dir)
+    version = version or timezone.now().strftime('%Y%m%d-%H%M%S')
+    target = bundle_dir(version)
+    if os.path.exists(target):
+        raise RegistryError(f"Model version {version} already exists")
+    missing = [name for name in files if not os.path.exists(os.path.join(source_dir, name))]
+    if missing:
+        raise RegistryError(f"Model files missing from {source_dir}: {missing}")
+    
+    os.makedirs(registry_dir(), exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.publish-', dir=registry_dir())
+    try:
+        checksums = {}
+        for name in files:
+            shutil.copy2(os.path.join(source_dir, name), os.path.join(staging, name))
+            checksums[name] = file_checksum(os.path.join(staging, name))
+        manifest = {
+            'version': version,
+            'created_at': timezone.now().isoformat(),
+            'files': checksums,
+        }
+        with open(os.path.join(staging, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        # Readers never see a partially written version
+        os.rename(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return version
+
+
+def read_manifest(version):
+    path = os.path.join(bundle_dir(version), MANIFEST)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise RegistryError(f"Cannot read manifest for model version {version}: {e}") from e
+
+
+def verify(version):
+    """Check every file of a version against its manifest; returns the manifest"""
+    manifest = read_manifest(version)
+    for name, expected in manifest['files'].items():
+        path = os.path.join(bundle_dir(version), name)
+        if not os.path.exists(path):
+            raise RegistryError(f"Model version {version} is missing {name}")
+        if file_checksum(path) != expected:
+            raise RegistryError(f"Checksum mismatch for {name} in model version {version}")
+    return manifest
+
+
+def list_versions():
+    """Published versions, oldest first"""
+    if not os.path.isdir(registry_dir()):
+        return []
+    return sorted(
+        name for name in os.listdir(registry_dir())
+        if VERSION_RE.match(name) and os.path.exists(os.path.join(registry_dir(), name, MANIFEST))
+    )
+
+
+def current_version():
+    """The active version named by CURRENT, or None when no version is active"""
+    try:
+        with open(pointer_path()) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def activate(version):
+    """Verify a version and atomically point CURRENT at it"""
+    verify(version)
+    tmp_path = f'{pointer_path()}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, pointer_path())
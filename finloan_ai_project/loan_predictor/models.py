@@ -18,7 +18,11 @@ class LoanApplication(models.Model):
     # Results fields
     loan_status = models.CharField(max_length=10, choices=[('Approved', 'Approved'), ('Rejected', 'Rejected')], blank=True, null=True)
     approval_probability = models.FloatField(blank=True, null=True)
+    # Registry version (or 'legacy' / 'rule-based') that produced the result
+    model_version = models.CharField(max_length=64, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set on every save; bulk_update callers set it themselves (feature_cache.py syncs on it)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.applicant_name} - {self.loan_status or 'Pending'}"
@@ -27,3 +31,31 @@ class LoanApplication(models.Model):
         ordering = ['-created_at']  # Show newest applications first
         verbose_name = "Loan Application"
         verbose_name_plural = "Loan Applications"
+        # Match the admin dashboard/export filters, newest first
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='loanapp_created_id_idx'),
+            models.Index(fields=['loan_status', 'created_at'], name='loanapp_status_created_idx'),
+            models.Index(fields=['education', 'created_at'], name='loanapp_edu_created_idx'),
+            models.Index(fields=['property_area', 'education', 'created_at'], name='loanapp_area_edu_created_idx'),
+            models.Index(fields=['updated_at', 'id'], name='loanapp_updated_id_idx'),
+        ]
+
+
+class LoanStatsBucket(models.Model):
+    """Per-day application counters, kept up to date by loan_predictor.signals"""
+    day = models.DateField()
+    status = models.CharField(max_length=10)
+    education = models.CharField(max_length=20)
+    property_area = models.CharField(max_length=10)
+    
+    count = models.IntegerField(default=0)
+    probability_sum = models.FloatField(default=0)
+    probability_count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.day} {self.status}/{self.education}/{self.property_area}: {self.count}"
+    
+    class Meta:
+        unique_together = [('day', 'status', 'education', 'property_area')]
+        verbose_name = "Loan Stats Bucket"
+        verbose_name_plural = "Loan Stats Buckets"
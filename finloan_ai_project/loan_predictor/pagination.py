@@ -0,0 +1,63 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+# Rows per dashboard/API page
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    """Opaque cursor for the position after (created_at, pk)"""
+    payload = json.dumps([created_at.isoformat(), pk])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises InvalidCursor for malformed input"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        parsed = parse_datetime(created_at)
+        if parsed is None:
+            raise ValueError(created_at)
+        return parsed, int(pk)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def after_cursor(queryset, cursor):
+    """Rows of `queryset` after the cursor position, ordered newest first"""
+    queryset = queryset.order_by('-created_at', '-id')
+    if not cursor:
+        return queryset
+    created_at, pk = decode_cursor(cursor)
+    return queryset.filter(created_at__lte=created_at).filter(
+        Q(created_at__lt=created_at) | Q(id__lt=pk)
+    )
+
+
+def keyset_page(queryset, cursor=None, page_size=PAGE_SIZE):
+    """One page of `queryset`, newest first, after the position in `cursor`.
+
+    Pages are selected with WHERE (created_at, id) < cursor on the created_at
+    index instead of OFFSET, so deep pages cost the same as the first one.
+    Works with model and values() querysets. Returns (rows, next_cursor);
+    next_cursor is None on the last page.
+    """
+    rows = list(after_cursor(queryset, cursor)[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    
+    last = rows[page_size - 1]
+    if isinstance(last, dict):
+        return rows[:page_size], encode_cursor(last['created_at'], last['id'])
+    return rows[:page_size], encode_cursor(last.created_at, last.pk)
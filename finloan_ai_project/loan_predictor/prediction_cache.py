@@ -0,0 +1,114 @@
+"""Cache of prediction results for repeated scoring inputs.
+
+Resubmissions, and edits that don't touch the scoring fields, produce the
+same preprocess_application() output; their results are served from here
+instead of being scored again. Keys are that feature dict, with numbers
+normalized to float, together with the bundle fingerprint (version plus a
+digest of the model parameters), so a new bundle never serves results of
+the old one. Two tiers:
+
+- an in-process LRU of max_entries results, emptied when the bundle changes;
+- optionally a shared tier in a Django cache (LOAN_PREDICTION_CACHE_ALIAS),
+  so processes reuse each other's results; old bundles' entries expire.
+
+Only model results are cached, never rule-based fallbacks.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+from .metrics import ERRORS, Counter
+
+logger = logging.getLogger(__name__)
+
+SHARED_PREFIX = 'loan_prediction:'
+
+CACHE_LOOKUPS = Counter(
+    'loan_predictor_prediction_cache',
+    'Prediction cache lookups, by tier (memory, shared) and outcome (hit, miss).',
+    ['tier', 'outcome'],
+)
+
+
+def cache_key(fingerprint, data):
+    """Key for preprocess_application() output scored by the bundle with fingerprint.
+    
+    A tuple, hashed by the in-process dict; the shared tier uses a digest of
+    it (shared_key).
+    """
+    # Field order is fixed by preprocess_application
+    return (fingerprint, *[float(value) if type(value) in (int, float) else value for value in data.values()])
+
+
+def shared_key(key):
+    return SHARED_PREFIX + hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+
+class PredictionCache:
+    """Bounded LRU of prediction results, backed by an optional Django cache"""
+    
+    def __init__(self, max_entries=10000, alias=None, timeout=3600):
+        self.max_entries = max_entries
+        self.alias = alias
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.fingerprint = None
+        self._lock = threading.Lock()
+    
+    def get(self, fingerprint, key):
+        """The cached result for key, or None"""
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                # A new bundle: nothing cached so far can be served
+                self.entries.clear()
+                self.fingerprint = fingerprint
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+        if result is not None:
+            CACHE_LOOKUPS.inc('memory', 'hit')
+            return dict(result)
+        CACHE_LOOKUPS.inc('memory', 'miss')
+        
+        if self.alias is None:
+            return None
+        try:
+            result = caches[self.alias].get(shared_key(key))
+        except Exception:
+            # The shared tier is an optimization; scoring goes on without it
+            logger.exception("Prediction cache read failed")
+            ERRORS.inc('prediction_cache')
+            return None
+        CACHE_LOOKUPS.inc('shared', 'miss' if result is None else 'hit')
+        if result is not None:
+            self.store(fingerprint, key, result)
+            return dict(result)
+        return None
+    
+    def set(self, fingerprint, key, result):
+        result = dict(result)
+        self.store(fingerprint, key, result)
+        if self.alias is None:
+            return
+        try:
+            caches[self.alias].set(shared_key(key), result, self.timeout)
+        except Exception:
+            logger.exception("Prediction cache write failed")
+            ERRORS.inc('prediction_cache')
+    
+    def store(self, fingerprint, key, result):
+        with self._lock:
+            # Finished with a bundle that has been replaced meanwhile
+            if fingerprint != self.fingerprint:
+                return
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
@@ -0,0 +1,246 @@
+"""Asynchronous scoring: applications are saved once as Pending and scored in the background.
+
+LOAN_SCORING_MODE selects who scores a submitted application:
+
+- 'sync' (default): the view scores it inline, as before;
+- 'thread': an in-process queue feeds LOAN_SCORING_WORKERS threads, which
+  score queued applications in micro-batches with predict_many(save=True);
+- 'db': the view only saves; `manage.py score_pending` worker processes
+  poll the table for queued rows.
+
+A queued row is loan_status='Pending' with model_version QUEUED_VERSION,
+set by the view that saved it; other Pending rows (older applications, or
+ones an admin set to Pending) are never scored automatically. Workers claim
+a batch with one conditional UPDATE of model_version before scoring it, so
+any number of threads and processes can share the table without scoring
+a row twice. Rows left queued by a restart or a full in-process queue are
+picked up by score_pending.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections
+from django.db.models import Q
+
+from .metrics import ERRORS, Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# model_version of rows waiting for a worker
+QUEUED_VERSION = 'queued'
+QUEUED_Q = Q(loan_status='Pending', model_version=QUEUED_VERSION)
+# model_version of claimed rows: claim:<unix time>:<pid>:<thread id>:<sequence>
+CLAIM_PREFIX = 'claim:'
+# Claims older than this (seconds) belong to a dead worker and are released
+CLAIM_TIMEOUT = 300
+# Queued or being scored
+WAITING_Q = QUEUED_Q | Q(model_version__startswith=CLAIM_PREFIX)
+# How often result waiters re-check the row when nothing wakes them
+POLL_INTERVAL = 0.05
+# Attempts at writing a scored batch back while the database is locked
+WRITE_ATTEMPTS = 5
+
+QUEUE_ROWS = Counter(
+    'loan_predictor_queue_rows',
+    'Applications handled by the async scoring queue, by outcome (scored, overflow, error).',
+    ['outcome'],
+)
+
+
+def scoring_mode():
+    return getattr(settings, 'LOAN_SCORING_MODE', 'sync')
+
+
+def is_waiting(application):
+    """Python-side WAITING_Q for a loaded application"""
+    return application.loan_status == 'Pending' and (
+        application.model_version == QUEUED_VERSION
+        or (application.model_version or '').startswith(CLAIM_PREFIX)
+    )
+
+
+# Tells apart the claims one thread takes within the same second
+_claim_sequence = itertools.count()
+
+
+def claim_token():
+    return f'{CLAIM_PREFIX}{int(time.time())}:{os.getpid()}:{threading.get_ident()}:{next(_claim_sequence)}'
+
+
+def score_batch(queryset):
+    """Claim the queued rows of queryset and score them; returns how many were scored"""
+    from .ml_predictor import loan_predictor
+    from .models import LoanApplication
+    
+    token = claim_token()
+    if not queryset.filter(QUEUED_Q).update(model_version=token):
+        return 0
+    # Read the batch up front: an open read cursor during predict_many's
+    # write transaction can deadlock against other writers on SQLite
+    claimed = list(LoanApplication.objects.filter(model_version=token))
+    try:
+        # predict_many overwrites the claim with the real model_version, in
+        # one transaction (a single chunk), so a locked attempt can be repeated
+        return len(retry_locked(
+            lambda: loan_predictor.predict_many(claimed, chunk_size=len(claimed), save=True)
+        ))
+    except OperationalError:
+        # Hand the rows back rather than leaving them claimed until CLAIM_TIMEOUT
+        LoanApplication.objects.filter(model_version=token).update(model_version=QUEUED_VERSION)
+        raise
+
+
+def retry_locked(write, attempts=WRITE_ATTEMPTS):
+    """Call write(), retrying with backoff while the database is locked.
+    
+    SQLite fails a write transaction at once instead of waiting when it has
+    to upgrade a read lock (the applicant search triggers read first), so
+    contention between workers surfaces here. write must be safe to repeat:
+    one transaction, over rows read before the first attempt.
+    """
+    for attempt in range(attempts):
+        try:
+            return write()
+        except OperationalError as e:
+            if 'locked' not in str(e) or attempt == attempts - 1:
+                raise
+            time.sleep(random.uniform(0.01, 0.05) * 2 ** attempt)
+
+
+def release_stale_claims(timeout=CLAIM_TIMEOUT):
+    """Re-queue rows claimed by workers that died before scoring them"""
+    from .models import LoanApplication
+    
+    cutoff = time.time() - timeout
+    stale = [
+        pk for pk, token in LoanApplication.objects.filter(
+            model_version__startswith=CLAIM_PREFIX
+        ).values_list('pk', 'model_version')
+        if int(token[len(CLAIM_PREFIX):].split(':')[0]) < cutoff
+    ]
+    if stale:
+        LoanApplication.objects.filter(
+            pk__in=stale, model_version__startswith=CLAIM_PREFIX
+        ).update(model_version=QUEUED_VERSION)
+    return len(stale)
+
+
+class ScoringQueue:
+    """In-process queue of application pks, scored by a pool of worker threads.
+    
+    Each worker blocks for one pk, then collects more for up to linger
+    seconds or batch_size pks and scores them in one predict_many call.
+    Workers start on the first submit() in each process, so they survive
+    forking web servers.
+    """
+    
+    def __init__(self, workers=2, batch_size=256, linger=0.005, maxsize=10000):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.linger = linger
+        self.queue = queue.Queue(maxsize)
+        self.scored = threading.Condition()
+        self._lock = threading.Lock()
+        self._pid = None
+    
+    def start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A forked child inherits the queue but not the threads
+            self.queue = queue.Queue(self.queue.maxsize)
+            for i in range(self.workers):
+                threading.Thread(target=self.run, name=f'loan-scoring-{i}', daemon=True).start()
+            self._pid = os.getpid()
+    
+    def submit(self, pk):
+        """Queue an application for scoring; returns False if the queue is full"""
+        if self._pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(pk)
+            return True
+        except queue.Full:
+            # The row stays queued in the database for score_pending
+            QUEUE_ROWS.inc('overflow')
+            logger.warning("Scoring queue full, application %s left for score_pending", pk)
+            return False
+    
+    def next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def run(self):
+        while True:
+            self.score(self.next_batch())
+    
+    def score(self, batch):
+        """Score one batch of pks, as a worker thread does, and wake result waiters"""
+        from .models import LoanApplication
+        
+        close_old_connections()
+        try:
+            QUEUE_ROWS.inc('scored', amount=score_batch(LoanApplication.objects.filter(pk__in=batch)))
+        except Exception:
+            logger.exception("Scoring %d queued applications failed", len(batch))
+            ERRORS.inc('scoring_queue')
+            QUEUE_ROWS.inc('error', amount=len(batch))
+        with self.scored:
+            self.scored.notify_all()
+    
+    def wait_for_result(self, pk, timeout):
+        """Wait up to timeout seconds for pk to be scored; True once it is"""
+        from .models import LoanApplication
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            if not LoanApplication.objects.filter(WAITING_Q, pk=pk).exists():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # Woken by this process's workers; rows scored elsewhere are polled
+            with self.scored:
+                self.scored.wait(min(remaining, POLL_INTERVAL))
+    
+    async def await_result(self, pk, timeout):
+        """wait_for_result() for async views: polls without blocking the event loop"""
+        from .models import LoanApplication
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            if not await LoanApplication.objects.filter(WAITING_Q, pk=pk).aexists():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(remaining, POLL_INTERVAL))
+
+
+scoring_queue = ScoringQueue(
+    workers=getattr(settings, 'LOAN_SCORING_WORKERS', 2),
+    batch_size=getattr(settings, 'LOAN_SCORING_BATCH_SIZE', 256),
+    linger=getattr(settings, 'LOAN_SCORING_LINGER', 0.005),
+)
+
+QUEUE_DEPTH = Gauge(
+    'loan_predictor_queue_depth',
+    'Applications waiting in this process\'s async scoring queue.',
+    function=lambda: {(): scoring_queue.queue.qsize()},
+)
@@ -0,0 +1,157 @@
+import logging
+import re
+
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+from .models import LoanApplication
+
+
+logger = logging.getLogger(__name__)
+
+TABLE = LoanApplication._meta.db_table
+FTS_TABLE = 'loan_predictor_applicant_fts'
+FTS_TRIGGERS = [f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete', f'{FTS_TABLE}_update']
+
+# SQLite: FTS5 index over applicant_name/loan_status, synced by triggers
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        applicant_name, loan_status,
+        content='{TABLE}', content_rowid='id', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, applicant_name, loan_status)
+        VALUES (new.id, new.applicant_name, new.loan_status);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, applicant_name, loan_status)
+        VALUES ('delete', old.id, old.applicant_name, old.loan_status);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF applicant_name, loan_status ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, applicant_name, loan_status)
+        VALUES ('delete', old.id, old.applicant_name, old.loan_status);
+        INSERT INTO {FTS_TABLE}(rowid, applicant_name, loan_status)
+        VALUES (new.id, new.applicant_name, new.loan_status);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# PostgreSQL: trigram GIN indexes matching Django's icontains SQL (UPPER(col::text))
+POSTGRESQL_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS loanapp_name_trgm_idx ON {TABLE} USING gin (UPPER(applicant_name::text) gin_trgm_ops)",
+    f"CREATE INDEX IF NOT EXISTS loanapp_status_trgm_idx ON {TABLE} USING gin (UPPER(loan_status::text) gin_trgm_ops)",
+]
+POSTGRESQL_UNINSTALL = [
+    "DROP INDEX IF EXISTS loanapp_name_trgm_idx",
+    "DROP INDEX IF EXISTS loanapp_status_trgm_idx",
+]
+
+# alias -> whether the FTS table and its triggers exist
+_fts_ready = {}
+
+
+def install_search_index(connection):
+    """Create (or repair) the applicant search index for this database.
+
+    On SQLite this also re-creates the sync triggers, which are lost when a
+    migration rebuilds the applications table.
+    """
+    statements = {'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRESQL_INSTALL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    _fts_ready.pop(connection.alias, None)
+
+
+def uninstall_search_index(connection):
+    statements = {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRESQL_UNINSTALL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    _fts_ready.pop(connection.alias, None)
+
+
+def fts_query(text):
+    """User input -> FTS5 query matching every term as a prefix"""
+    return ' '.join(f'"{term}"*' for term in re.findall(r'\w+', text))
+
+
+def missing_fts_objects(connection):
+    """Names of the FTS table and sync triggers absent from this SQLite database"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+            [f'{FTS_TABLE}%'],
+        )
+        present = {row[0] for row in cursor.fetchall()}
+    return [name for name in [FTS_TABLE, *FTS_TRIGGERS] if name not in present]
+
+
+def uses_fts(connection):
+    """True when the SQLite FTS5 table and its sync triggers are in place.
+
+    Without the triggers the index misses new writes, so search falls back
+    to icontains until the index is repaired.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts_ready:
+        missing = missing_fts_objects(connection)
+        if missing and FTS_TABLE not in missing:
+            logger.warning("Applicant search index incomplete (missing %s), using icontains; "
+                           "run manage.py rebuild_search_index", ', '.join(missing))
+        _fts_ready[connection.alias] = not missing
+    return _fts_ready[connection.alias]
+
+
+def repair_search_index(using='default', **kwargs):
+    """post_migrate handler: restore the SQLite triggers a table rebuild dropped.
+
+    Does nothing when the FTS table itself is absent (not installed yet, or
+    migrated back past 0007).
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or TABLE not in connection.introspection.table_names():
+        return
+    missing = missing_fts_objects(connection)
+    if missing and FTS_TABLE not in missing:
+        logger.info("Reinstalling the applicant search index on %s", using)
+        install_search_index(connection)
+
+
+def search_applications(queryset, text, ranked=False):
+    """Filter applications by applicant name or status.
+
+    SQLite uses the FTS5 index (prefix match on every term); other databases
+    use icontains, which PostgreSQL serves from the trigram indexes. With
+    ranked=True results are ordered best match first.
+    """
+    connection = connections[queryset.db]
+    query = fts_query(text)
+    
+    if query and uses_fts(connection):
+        matches = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query])
+        queryset = queryset.filter(id__in=matches)
+        if ranked:
+            # bm25 rank: lower is better
+            queryset = queryset.annotate(search_rank=RawSQL(
+                f"SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id",
+                [query],
+            )).order_by('search_rank', '-created_at')
+        return queryset
+    
+    queryset = queryset.filter(Q(applicant_name__icontains=text) | Q(loan_status__icontains=text))
+    if ranked and connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+        queryset = queryset.annotate(
+            search_rank=TrigramSimilarity('applicant_name', text)
+        ).order_by(F('search_rank').desc(), '-created_at')
+    return queryset
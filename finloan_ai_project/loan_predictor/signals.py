@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import LoanApplication
+from .stats import add_contribution, application_contribution, apply_deltas, bucket_key, new_deltas
+
+
+@receiver(pre_save, sender=LoanApplication)
+def remember_stats_contribution(sender, instance, **kwargs):
+    """Remember what the stored row counted for before it is overwritten"""
+    instance._stats_previous = None
+    if instance.pk is None:
+        return
+    
+    previous = sender.objects.filter(pk=instance.pk).values_list(
+        'created_at', 'loan_status', 'education', 'property_area', 'approval_probability'
+    ).first()
+    if previous is not None:
+        instance._stats_previous = (bucket_key(*previous[:4]), previous[4])
+
+
+@receiver(post_save, sender=LoanApplication)
+def update_stats_on_save(sender, instance, **kwargs):
+    deltas = new_deltas()
+    previous = getattr(instance, '_stats_previous', None)
+    if previous is not None:
+        add_contribution(deltas, previous, -1)
+    add_contribution(deltas, application_contribution(instance), 1)
+    apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=LoanApplication)
+def update_stats_on_delete(sender, instance, **kwargs):
+    deltas = new_deltas()
+    add_contribution(deltas, application_contribution(instance), -1)
+    apply_deltas(deltas)
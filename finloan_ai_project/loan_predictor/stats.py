@@ -0,0 +1,161 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import LoanApplication, LoanStatsBucket
+
+
+# Applications without a decision yet
+PENDING_Q = Q(loan_status__isnull=True) | Q(loan_status='') | Q(loan_status='Pending')
+
+
+def stats_aggregates():
+    return dict(
+        total=Coalesce(Sum('count'), 0),
+        approved=Coalesce(Sum('count', filter=Q(status='Approved')), 0),
+        rejected=Coalesce(Sum('count', filter=Q(status='Rejected')), 0),
+        pending=Coalesce(Sum('count', filter=Q(status='Pending')), 0),
+        probability_sum=Sum('probability_sum'),
+        probability_count=Coalesce(Sum('probability_count'), 0),
+    )
+
+
+def get_application_stats():
+    """Dashboard statistics for all applications, read from the counters table"""
+    return finish_stats(LoanStatsBucket.objects.aggregate(**stats_aggregates()))
+
+
+async def aget_application_stats():
+    """get_application_stats() through the async ORM"""
+    return finish_stats(await LoanStatsBucket.objects.aaggregate(**stats_aggregates()))
+
+
+def finish_stats(stats):
+    total = stats['total']
+    stats['approval_rate'] = round((stats['approved'] / total) * 100, 1) if total > 0 else 0
+    if stats['probability_count']:
+        stats['avg_probability'] = stats['probability_sum'] / stats['probability_count']
+    else:
+        stats['avg_probability'] = None
+    return stats
+
+
+def bucket_key(created_at, loan_status, education, property_area):
+    """Counter bucket for an application; undecided statuses count as Pending"""
+    if timezone.is_aware(created_at):
+        day = timezone.localdate(created_at)
+    else:
+        day = created_at.date()
+    return (day, loan_status or 'Pending', education, property_area)
+
+
+def application_contribution(application):
+    """(bucket key, approval probability) an application adds to the counters"""
+    key = bucket_key(
+        application.created_at, application.loan_status,
+        application.education, application.property_area,
+    )
+    return key, application.approval_probability
+
+
+def new_deltas():
+    """Empty {bucket key: [count, probability_sum, probability_count]} mapping"""
+    return defaultdict(lambda: [0, 0.0, 0])
+
+
+def add_contribution(deltas, contribution, sign):
+    """Add (sign=1) or remove (sign=-1) one application's contribution"""
+    key, probability = contribution
+    delta = deltas[key]
+    delta[0] += sign
+    if probability is not None:
+        delta[1] += sign * probability
+        delta[2] += sign
+
+
+def apply_deltas(deltas):
+    """Apply counter deltas with atomic F() updates.
+    
+    The UPDATE comes first and the bucket is only created when it matched
+    nothing: a transaction that reads before writing can deadlock against a
+    concurrent writer on SQLite (e.g. the async scoring workers).
+    """
+    with transaction.atomic():
+        for (day, status, education, property_area), (count, probability_sum, probability_count) in deltas.items():
+            if not (count or probability_sum or probability_count):
+                continue
+            key = dict(day=day, status=status, education=education, property_area=property_area)
+            changes = dict(
+                count=F('count') + count,
+                probability_sum=F('probability_sum') + probability_sum,
+                probability_count=F('probability_count') + probability_count,
+            )
+            if not LoanStatsBucket.objects.filter(**key).update(**changes):
+                bucket, _ = LoanStatsBucket.objects.get_or_create(**key)
+                LoanStatsBucket.objects.filter(pk=bucket.pk).update(**changes)
+
+
+def live_buckets(application_model=LoanApplication):
+    """Counter values computed from the applications table with GROUP BY"""
+    rows = (
+        application_model.objects.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'loan_status', 'education', 'property_area')
+        .annotate(
+            count=Count('id'),
+            probability_sum=Sum('approval_probability'),
+            probability_count=Count('approval_probability'),
+        )
+    )
+    
+    buckets = new_deltas()
+    for row in rows:
+        bucket = buckets[(row['day'], row['loan_status'] or 'Pending', row['education'], row['property_area'])]
+        bucket[0] += row['count']
+        bucket[1] += row['probability_sum'] or 0.0
+        bucket[2] += row['probability_count']
+    return buckets
+
+
+def stored_buckets(bucket_model=LoanStatsBucket):
+    """Counter values as currently stored, skipping empty buckets"""
+    return {
+        (row.day, row.status, row.education, row.property_area): [
+            row.count, row.probability_sum, row.probability_count
+        ]
+        for row in bucket_model.objects.all()
+        if row.count or row.probability_count
+    }
+
+
+def find_drift(tolerance=1e-6):
+    """Buckets whose stored counters differ from live counts: {key: (stored, live)}"""
+    live = live_buckets()
+    stored = stored_buckets()
+    
+    drift = {}
+    for key in set(live) | set(stored):
+        expected = live.get(key, [0, 0.0, 0])
+        actual = stored.get(key, [0, 0.0, 0])
+        if (expected[0] != actual[0] or expected[2] != actual[2]
+                or abs(expected[1] - actual[1]) > tolerance * max(1.0, abs(expected[1]))):
+            drift[key] = (actual, expected)
+    return drift
+
+
+def rebuild_stats(application_model=LoanApplication, bucket_model=LoanStatsBucket):
+    """Recompute the counters table from scratch; returns the number of buckets"""
+    buckets = live_buckets(application_model)
+    with transaction.atomic():
+        bucket_model.objects.all().delete()
+        bucket_model.objects.bulk_create([
+            bucket_model(
+                day=day, status=status, education=education, property_area=property_area,
+                count=count, probability_sum=probability_sum, probability_count=probability_count,
+            )
+            for (day, status, education, property_area), (count, probability_sum, probability_count) in buckets.items()
+        ], batch_size=1000)
+    return len(buckets)
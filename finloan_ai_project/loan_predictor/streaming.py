@@ -0,0 +1,274 @@
+"""Out-of-core training for datasets larger than memory.
+
+The data is streamed in chunks, from a CSV file or from LoanApplication
+rows through a server-side cursor, and every pass re-reads the source:
+
+1. imputation statistics: value counts for the modes and category classes,
+   histogram medians for LoanAmount and Loan_Income_Ratio;
+2. StandardScaler.partial_fit on the engineered features;
+3. SGDClassifier(loss='log_loss').partial_fit, once per epoch.
+
+Memory is bounded by the chunk size whatever the dataset size. The result
+is a logistic model, saved in the loan_serving.npz format written by
+ml_models/train_loan_model.py, so it can be published to the registry and
+served by the compiled scorer.
+"""
+import itertools
+import logging
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from .ml_predictor import CATEGORICAL_COLUMNS, SERVING_FORMAT
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 50000
+
+# LoanApplication field -> dataset column
+FIELD_COLUMNS = {
+    'gender': 'Gender',
+    'married': 'Married',
+    'dependents': 'Dependents',
+    'education': 'Education',
+    'self_employed': 'Self_Employed',
+    'applicant_income': 'ApplicantIncome',
+    'coapplicant_income': 'CoapplicantIncome',
+    'loan_amount': 'LoanAmount',
+    'loan_amount_term': 'Loan_Amount_Term',
+    'credit_history': 'Credit_History',
+    'property_area': 'Property_Area',
+    'loan_status': 'Loan_Status',
+}
+LABELS = {'Approved': 'Y', 'Rejected': 'N'}
+
+# Filled with their most common value, as in load_and_preprocess_data
+MODE_COLUMNS = ['Gender', 'Married', 'Dependents', 'Self_Employed', 'Loan_Amount_Term', 'Credit_History']
+FEATURE_NAMES = [
+    'Gender', 'Married', 'Dependents', 'Education', 'Self_Employed', 'ApplicantIncome',
+    'CoapplicantIncome', 'LoanAmount', 'Loan_Amount_Term', 'Credit_History', 'Property_Area',
+    'Total_Income', 'Loan_Income_Ratio', 'Income_per_Dependent',
+]
+
+
+def csv_chunks(path, chunk_size=CHUNK_SIZE):
+    """DataFrames of chunk_size rows from a CSV laid out like data/loan_dataset.csv"""
+    # Categories stay strings even in chunks where they look numeric
+    dtypes = {col: str for col in CATEGORICAL_COLUMNS + ['Loan_Status']}
+    yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtypes)
+
+
+def queryset_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """Labelled applications from queryset as dataset-layout DataFrames.
+    
+    iterator() reads through a server-side cursor on PostgreSQL (fetchmany()
+    elsewhere), so only one chunk of rows is held at a time.
+    """
+    rows = (
+        queryset.filter(loan_status__in=list(LABELS))
+        .order_by('pk')
+        .values_list(*FIELD_COLUMNS)
+        .iterator(chunk_size=chunk_size)
+    )
+    while True:
+        batch = list(itertools.islice(rows, chunk_size))
+        if not batch:
+            return
+        yield records_frame(batch)
+
+
+def records_frame(batch, extra=()):
+    """Dataset-layout DataFrame from values_list(*FIELD_COLUMNS, *extra) rows"""
+    df = pd.DataFrame.from_records(batch, columns=[*FIELD_COLUMNS.values(), *extra])
+    df['Credit_History'] = df['Credit_History'].astype(float)
+    df['Loan_Status'] = df['Loan_Status'].map(LABELS)
+    return df
+
+
+class StreamingMedian:
+    """Approximate median from a fixed log-spaced histogram (about 0.1% error)"""
+    EDGES = np.geomspace(1e-6, 1e9, 30001)
+    
+    def __init__(self):
+        self.counts = np.zeros(len(self.EDGES) + 1, dtype=np.int64)
+    
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        # Bucket 0 holds values <= 1e-6, including zeros
+        self.counts += np.bincount(np.searchsorted(self.EDGES, values), minlength=len(self.counts))
+    
+    def median(self):
+        total = self.counts.sum()
+        if not total:
+            return np.nan
+        bucket = int(np.searchsorted(np.cumsum(self.counts), (total + 1) / 2))
+        if bucket == 0:
+            return 0.0
+        if bucket == len(self.EDGES):
+            return float(self.EDGES[-1])
+        return float(np.sqrt(self.EDGES[bucket - 1] * self.EDGES[bucket]))
+
+
+class ImputationStats:
+    """Modes, category classes and medians gathered in one pass"""
+    
+    def __init__(self):
+        self.counts = {col: Counter() for col in dict.fromkeys(MODE_COLUMNS + CATEGORICAL_COLUMNS)}
+        self.loan_amount = StreamingMedian()
+        self.loan_income_ratio = StreamingMedian()
+        self.rows = 0
+    
+    def update(self, df):
+        for col, counts in self.counts.items():
+            counts.update(df[col].value_counts().to_dict())
+        self.loan_amount.update(df['LoanAmount'].to_numpy(dtype=float))
+        # Approximate: rows missing LoanAmount are left out here, where the
+        # batch script fills them with the median first
+        ratio = df['LoanAmount'] / (df['ApplicantIncome'] + df['CoapplicantIncome'])
+        self.loan_income_ratio.update(ratio.replace([np.inf, -np.inf], np.nan).to_numpy(dtype=float))
+        self.rows += len(df)
+    
+    def finish(self):
+        """Resolve the counts into modes, sorted classes and medians"""
+        # Ties go to the smallest value, like Series.mode()[0]
+        self.modes = {col: min(self.counts[col].items(), key=lambda item: (-item[1], item[0]))[0]
+                      for col in MODE_COLUMNS}
+        self.classes = {col: sorted(self.counts[col]) for col in CATEGORICAL_COLUMNS}
+        self.medians = {
+            'LoanAmount': self.loan_amount.median(),
+            'Loan_Income_Ratio': self.loan_income_ratio.median(),
+        }
+        return self
+
+
+def prepare_chunk(df, stats):
+    """Impute, engineer and encode one chunk; returns (X, y) float/int arrays"""
+    df = df.fillna({**stats.modes, 'LoanAmount': stats.medians['LoanAmount']})
+    return encode_chunk(df, stats.classes, stats.medians['Loan_Income_Ratio'])
+
+
+def encode_chunk(df, classes, ratio_fill=np.nan):
+    """Engineer and encode an already imputed chunk; returns (X, y).
+
+    Loan_Income_Ratio is ratio_fill where total income is zero.
+    """
+    total_income = df['ApplicantIncome'] + df['CoapplicantIncome']
+    ratio = (df['LoanAmount'] / total_income).replace([np.inf, -np.inf], np.nan)
+    dependents = df['Dependents'].replace({'3+': '3'}).astype(int)
+    engineered = {
+        'Total_Income': total_income,
+        'Loan_Income_Ratio': ratio.fillna(ratio_fill),
+        'Income_per_Dependent': total_income / (dependents + 1),
+    }
+    
+    X = np.empty((len(df), len(FEATURE_NAMES)))
+    for i, col in enumerate(FEATURE_NAMES):
+        if col in classes:
+            X[:, i] = pd.Categorical(df[col], categories=classes[col]).codes
+        elif col in engineered:
+            X[:, i] = engineered[col]
+        else:
+            X[:, i] = df[col]
+    y = (df['Loan_Status'] == 'Y').to_numpy(dtype=np.int64)
+    return X, y
+
+
+class StreamingTrainer:
+    """Fit a scaler and an SGD logistic model over repeated passes of a chunked source.
+    
+    chunks is a callable returning a fresh iterator of dataset-layout
+    DataFrames, e.g. lambda: csv_chunks(path). Every holdout-th row is kept
+    out of training for the accuracy report.
+    """
+    
+    def __init__(self, epochs=5, holdout=5, alpha=1e-4, random_state=42):
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.preprocessing import StandardScaler
+        
+        self.epochs = epochs
+        self.holdout = holdout
+        self.random_state = random_state
+        self.scaler = StandardScaler()
+        self.model = SGDClassifier(loss='log_loss', alpha=alpha, random_state=random_state)
+        self.stats = None
+        self.classes = None
+        self.timings = {}
+        self.train_rows = 0
+        self.holdout_rows = 0
+        self.accuracy = None
+    
+    def fit(self, chunks):
+        """Gather imputation statistics from chunks, then fit on the prepared chunks"""
+        start = time.perf_counter()
+        self.stats = ImputationStats()
+        for df in chunks():
+            self.stats.update(df)
+        self.stats.finish()
+        self.timings['stats'] = time.perf_counter() - start
+        if not self.stats.rows:
+            raise ValueError("No labelled rows to train on")
+        
+        self.classes = self.stats.classes
+        return self.fit_batches(lambda: (prepare_chunk(df, self.stats) for df in chunks()))
+    
+    def with_holdout(self, batches):
+        """(X, y, holdout mask) per batch of one pass"""
+        offset = 0
+        for X, y in batches():
+            held_out = (offset + np.arange(len(y))) % self.holdout == 0
+            offset += len(y)
+            yield X, y, held_out
+    
+    def fit_batches(self, batches):
+        """Scale, train and evaluate; batches is a callable returning (X, y) arrays.
+
+        self.classes must hold the category classes the features were
+        encoded with.
+        """
+        start = time.perf_counter()
+        self.train_rows = self.holdout_rows = 0
+        for X, y, held_out in self.with_holdout(batches):
+            self.scaler.partial_fit(X[~held_out])
+            self.train_rows += int((~held_out).sum())
+            self.holdout_rows += int(held_out.sum())
+        self.timings['scale'] = time.perf_counter() - start
+        if not self.train_rows:
+            raise ValueError("No labelled rows to train on")
+        
+        rng = np.random.default_rng(self.random_state)
+        for epoch in range(self.epochs):
+            start = time.perf_counter()
+            for X, y, held_out in self.with_holdout(batches):
+                # Shuffle within the batch; SGD is sensitive to row order
+                order = rng.permutation(np.flatnonzero(~held_out))
+                self.model.partial_fit(self.scaler.transform(X[order]), y[order], classes=[0, 1])
+            self.timings[f'epoch.{epoch + 1}'] = time.perf_counter() - start
+            logger.info("Streaming training epoch %d/%d: %.1fs", epoch + 1, self.epochs,
+                        self.timings[f'epoch.{epoch + 1}'])
+        
+        start = time.perf_counter()
+        correct = 0
+        for X, y, held_out in self.with_holdout(batches):
+            if held_out.any():
+                correct += int((self.model.predict(self.scaler.transform(X[held_out])) == y[held_out]).sum())
+        self.accuracy = correct / self.holdout_rows if self.holdout_rows else None
+        self.timings['evaluate'] = time.perf_counter() - start
+        return self
+    
+    def save_serving_artifact(self, path):
+        """Write the model in the loan_serving.npz format"""
+        arrays = {
+            'format': np.array(SERVING_FORMAT),
+            'feature_names': np.array(FEATURE_NAMES, dtype=str),
+            'coef': np.asarray(self.model.coef_, dtype=np.float64).ravel(),
+            'intercept': np.array(self.model.intercept_[0], dtype=np.float64),
+            'classes': np.asarray(self.model.classes_),
+            'mean': np.asarray(self.scaler.mean_, dtype=np.float64),
+            'scale': np.asarray(self.scaler.scale_, dtype=np.float64),
+        }
+        for col in CATEGORICAL_COLUMNS:
+            arrays[f'classes_{col}'] = np.array(self.classes[col], dtype=str)
+        np.savez(path, **arrays)
+        return path
@@ -0,0 +1,263 @@
+"""Synthetic loan datasets learned from data/loan_dataset.csv.
+
+LoanDistribution learns the dataset's joint distribution:
+
+* categorical columns (missing values included as their own category) as a
+  chain of conditional probability tables, e.g. Gender given Married and
+  Loan_Status given Credit_History and Property_Area;
+* ApplicantIncome, CoapplicantIncome and LoanAmount per Education group as
+  a Gaussian copula over their empirical marginals, which keeps the income
+  skew, the ~45% zero co-applicant incomes and the income/loan correlation.
+
+generate() yields fixed-size blocks, each seeded from (seed, block index),
+so the same seed and row count always produce the same rows.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+from django.conf import settings
+
+
+# Rows per generated block; part of the seed -> output mapping, don't change
+BLOCK_SIZE = 100000
+
+DATASET_COLUMNS = [
+    'Loan_ID', 'Gender', 'Married', 'Dependents', 'Education', 'Self_Employed',
+    'ApplicantIncome', 'CoapplicantIncome', 'LoanAmount', 'Loan_Amount_Term',
+    'Credit_History', 'Property_Area', 'Loan_Status',
+]
+
+# Categorical columns in sampling order, with the columns each is conditioned on
+CATEGORICAL_CHAIN = [
+    ('Married', ()),
+    ('Gender', ('Married',)),
+    ('Dependents', ('Married',)),
+    ('Education', ()),
+    ('Self_Employed', ('Education',)),
+    ('Property_Area', ()),
+    ('Credit_History', ('Education',)),
+    ('Loan_Amount_Term', ()),
+    ('Loan_Status', ('Credit_History', 'Property_Area')),
+]
+
+# Numeric columns modelled jointly, per COPULA_GROUP value
+NUMERIC_COLUMNS = ['ApplicantIncome', 'CoapplicantIncome', 'LoanAmount']
+COPULA_GROUP = 'Education'
+
+FIRST_NAMES = [
+    'Aarav', 'Aditi', 'Amit', 'Ananya', 'Arjun', 'Deepa', 'Divya', 'Farhan', 'Gita', 'Harsh',
+    'Isha', 'Jatin', 'Kavya', 'Kiran', 'Lakshmi', 'Manish', 'Meera', 'Neha', 'Nikhil', 'Pooja',
+    'Priya', 'Rahul', 'Rajesh', 'Ravi', 'Rohan', 'Sanjay', 'Sneha', 'Suresh', 'Tanvi', 'Vikram',
+]
+SYLLABLES = [
+    'ra', 'ma', 'sha', 'ka', 'ni', 'de', 'pa', 'til', 'var', 'gu', 'pta', 'jo', 'shi', 'na', 'ir',
+    'mu', 'kh', 'er', 'ja', 'in', 'bha', 'tt', 'ch', 'an', 'dra', 'so', 'ni', 'ya', 'dav', 'el',
+]
+
+
+def dataset_path():
+    return os.path.join(settings.BASE_DIR.parent, 'data', 'loan_dataset.csv')
+
+
+def read_dataset(path=None):
+    return pd.read_csv(path or dataset_path())
+
+
+def missing_as_none(values):
+    """Object Series with NaN replaced by None"""
+    values = pd.Series(values, dtype=object)
+    return values.where(values.notna(), None)
+
+
+def parent_keys(columns):
+    """One string key per row for the combination of parent values"""
+    keys = missing_as_none(columns[0]).astype(str)
+    for values in columns[1:]:
+        keys = keys + '|' + missing_as_none(values).astype(str)
+    return keys.to_numpy()
+
+
+class ConditionalTable:
+    """P(column | parents), falling back to the marginal for unseen parent values"""
+
+    def __init__(self, column, parents, df):
+        self.column = column
+        self.parents = parents
+        values = missing_as_none(df[column]).to_numpy()
+        self.marginal = self._distribution(values)
+        self.tables = {}
+        if parents:
+            keys = parent_keys([df[parent].to_numpy() for parent in parents])
+            for key in set(keys):
+                self.tables[key] = self._distribution(values[keys == key])
+    
+    @staticmethod
+    def _distribution(values):
+        counts = pd.Series(values, dtype=object).value_counts(dropna=False)
+        labels = np.array([None if pd.isna(v) else v for v in counts.index], dtype=object)
+        return labels, counts.to_numpy() / counts.sum()
+    
+    def sample(self, frame, rng, n):
+        """n values, given the already sampled columns in frame"""
+        if not self.parents:
+            labels, probabilities = self.marginal
+            return labels[rng.choice(len(labels), size=n, p=probabilities)]
+        
+        keys = parent_keys([frame[parent] for parent in self.parents])
+        out = np.empty(len(keys), dtype=object)
+        for key in sorted(set(keys)):
+            index = np.flatnonzero(keys == key)
+            labels, probabilities = self.tables.get(key, self.marginal)
+            out[index] = labels[rng.choice(len(labels), size=len(index), p=probabilities)]
+        return out
+
+
+class NumericCopula:
+    """Gaussian copula over empirical marginals of NUMERIC_COLUMNS"""
+
+    def __init__(self, df):
+        complete = df[NUMERIC_COLUMNS].dropna()
+        self.sorted_values = [np.sort(complete[col].to_numpy(dtype=np.float64)) for col in NUMERIC_COLUMNS]
+        
+        # Normal scores of the ranks -> correlation of the copula
+        n = len(complete)
+        scores = ndtri((complete.rank(method='average').to_numpy() - 0.5) / n)
+        correlation = np.corrcoef(scores, rowvar=False)
+        self.cholesky = np.linalg.cholesky(correlation + 1e-9 * np.eye(len(NUMERIC_COLUMNS)))
+        self.missing_rates = df[NUMERIC_COLUMNS].isna().mean().to_numpy()
+    
+    def sample(self, n, rng):
+        u = ndtr(rng.standard_normal((n, len(NUMERIC_COLUMNS))) @ self.cholesky.T)
+        columns = {}
+        for i, (col, values) in enumerate(zip(NUMERIC_COLUMNS, self.sorted_values)):
+            grid = (np.arange(len(values)) + 0.5) / len(values)
+            sampled = np.round(np.interp(u[:, i], grid, values))
+            sampled[rng.random(n) < self.missing_rates[i]] = np.nan
+            columns[col] = sampled
+        return columns
+
+
+class LoanDistribution:
+    """Joint distribution of the loan dataset's columns"""
+
+    def __init__(self, df):
+        self.tables = [ConditionalTable(column, parents, df) for column, parents in CATEGORICAL_CHAIN]
+        groups = parent_keys([df[COPULA_GROUP].to_numpy()])
+        self.copulas = {group: NumericCopula(df[groups == group]) for group in set(groups)}
+        self.overall = NumericCopula(df)
+    
+    def sample(self, n, rng):
+        """n rows as a DataFrame in dataset column order (Loan_ID empty)"""
+        frame = {}
+        for table in self.tables:
+            frame[table.column] = table.sample(frame, rng, n)
+        
+        numeric = {col: np.empty(n) for col in NUMERIC_COLUMNS}
+        groups = parent_keys([frame[COPULA_GROUP]])
+        for group in sorted(set(groups)):
+            index = np.flatnonzero(groups == group)
+            copula = self.copulas.get(group, self.overall)
+            for col, values in copula.sample(len(index), rng).items():
+                numeric[col][index] = values
+        frame.update(numeric)
+        frame['ApplicantIncome'] = np.nan_to_num(frame['ApplicantIncome']).astype(np.int64)
+        frame['Loan_ID'] = None
+        
+        df = pd.DataFrame(frame)[DATASET_COLUMNS]
+        for col in ('Loan_Amount_Term', 'Credit_History'):
+            df[col] = df[col].astype(np.float64)
+        return df
+
+
+def generate(rows, seed=42, source=None):
+    """Yield DataFrames of at most BLOCK_SIZE rows, rows in total"""
+    distribution = LoanDistribution(read_dataset(source))
+    for block, start in enumerate(range(0, rows, BLOCK_SIZE)):
+        n = min(BLOCK_SIZE, rows - start)
+        df = distribution.sample(n, np.random.default_rng([seed, block]))
+        df['Loan_ID'] = [f'LPS{i:08d}' for i in range(start + 1, start + n + 1)]
+        yield df
+
+
+def write_csv(path, rows, seed=42, source=None):
+    """Write a CSV in the same layout as data/loan_dataset.csv"""
+    with open(path, 'w', newline='') as f:
+        for block, df in enumerate(generate(rows, seed, source)):
+            df.to_csv(f, index=False, header=block == 0, float_format='%.10g')
+    return path
+
+
+def write_parquet(path, rows, seed=42, source=None):
+    """Write a Parquet file (needs pyarrow); one row group per block"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema([
+        (col, pa.float64() if col in ('CoapplicantIncome', 'LoanAmount', 'Loan_Amount_Term', 'Credit_History')
+         else pa.int64() if col == 'ApplicantIncome' else pa.string())
+        for col in DATASET_COLUMNS
+    ])
+    with pq.ParquetWriter(path, schema) as writer:
+        for df in generate(rows, seed, source):
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+    return path
+
+
+def applicant_names(n, rng):
+    first = rng.choice(FIRST_NAMES, size=n)
+    lengths = rng.integers(2, 5, size=n)
+    syllables = rng.choice(SYLLABLES, size=(n, 4))
+    return [f'{name} {"".join(parts[:length]).capitalize()}'
+            for name, parts, length in zip(first, syllables, lengths)]
+
+
+def to_applications(df, rng):
+    """Unsaved LoanApplication objects for a generated block.
+
+    Missing categorical values get the column's most common value, a missing
+    LoanAmount the median and the label becomes loan_status.
+    """
+    from .models import LoanApplication
+    
+    modes = {
+        'Gender': 'Male', 'Married': 'Yes', 'Dependents': '0', 'Self_Employed': 'No',
+        'Loan_Amount_Term': 360.0, 'Credit_History': 1.0,
+    }
+    df = df.fillna({**modes, 'LoanAmount': df['LoanAmount'].median()})
+    names = applicant_names(len(df), rng)
+    return [
+        LoanApplication(
+            applicant_name=name,
+            gender=row.Gender,
+            married=row.Married,
+            dependents=row.Dependents,
+            education=row.Education,
+            self_employed=row.Self_Employed,
+            applicant_income=int(row.ApplicantIncome),
+            coapplicant_income=int(row.CoapplicantIncome),
+            loan_amount=int(row.LoanAmount),
+            loan_amount_term=int(row.Loan_Amount_Term),
+            credit_history=bool(row.Credit_History),
+            property_area=row.Property_Area,
+            loan_status='Approved' if row.Loan_Status == 'Y' else 'Rejected',
+        )
+        for name, row in zip(names, df.itertuples(index=False))
+    ]
+
+
+def insert_applications(rows, seed=42, batch_size=10000, source=None):
+    """bulk_create rows generated LoanApplications, then rebuild the counters"""
+    from .models import LoanApplication
+    from .stats import rebuild_stats
+    
+    created = 0
+    for block, df in enumerate(generate(rows, seed, source)):
+        applications = to_applications(df, np.random.default_rng([seed, block, 1]))
+        LoanApplication.objects.bulk_create(applications, batch_size=batch_size)
+        created += len(applications)
+    
+    # bulk_create bypasses the counter signals
+    rebuild_stats()
+    return created
@@ -0,0 +1,826 @@
+import csv
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.apps import apps
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import model_registry
+from .batching import MicroBatcher
+from .apps import load_for_serving
+from .ml_predictor import LoanPredictor, ModelBundle, loan_predictor, prediction_cache_from_settings
+from .models import LoanApplication, LoanStatsBucket
+from .pagination import MAX_PAGE_SIZE
+from .prediction_cache import PredictionCache
+from .scoring_queue import CLAIM_PREFIX, CLAIM_TIMEOUT, QUEUED_VERSION, ScoringQueue, release_stale_claims
+from . import search, views
+from .management.commands import rescore_applications
+from .search import FTS_TABLE, repair_search_index, search_applications, uses_fts
+from .stats import find_drift, get_application_stats, live_buckets
+
+
+MODELS_DIR = os.path.join(settings.BASE_DIR, 'ml_models')
+
+
+def application_fields(**overrides):
+    fields = {
+        'applicant_name': 'Test Applicant',
+        'gender': 'Male',
+        'married': 'Yes',
+        'dependents': '0',
+        'education': 'Graduate',
+        'self_employed': 'No',
+        'applicant_income': 5000,
+        'coapplicant_income': 1500,
+        'loan_amount': 150,
+        'loan_amount_term': 360,
+        'credit_history': True,
+        'property_area': 'Urban',
+        'loan_status': 'Approved',
+        'approval_probability': 80.0,
+    }
+    fields.update(overrides)
+    return fields
+
+
+def create_application(**overrides):
+    return LoanApplication.objects.create(**application_fields(**overrides))
+
+
+def application_variants():
+    """Unsaved applications covering every category, '3+' dependents and zero income"""
+    variants = []
+    for gender, married, dependents, education, self_employed, property_area, credit_history in itertools.product(
+        ['Male', 'Female'], ['Yes', 'No'], ['0', '1', '2', '3+'], ['Graduate', 'Not Graduate'],
+        ['Yes', 'No'], ['Urban', 'Semiurban', 'Rural'], [True, False],
+    ):
+        variants.append(LoanApplication(**application_fields(
+            gender=gender, married=married, dependents=dependents, education=education,
+            self_employed=self_employed, property_area=property_area, credit_history=credit_history,
+            applicant_income=len(variants) * 97 % 20000, coapplicant_income=len(variants) * 31 % 5000,
+            loan_amount=50 + len(variants) % 400,
+        )))
+    for applicant_income, coapplicant_income in [(0, 0), (0, 2500), (4000, 0)]:
+        variants.append(LoanApplication(**application_fields(
+            applicant_income=applicant_income, coapplicant_income=coapplicant_income, dependents='3+',
+        )))
+    return variants
+
+
+def joblib_bundle():
+    return ModelBundle(
+        'legacy',
+        joblib.load(os.path.join(MODELS_DIR, 'loan_models.joblib')),
+        joblib.load(os.path.join(MODELS_DIR, 'encoders.joblib')),
+        joblib.load(os.path.join(MODELS_DIR, 'scaler.joblib')),
+        joblib.load(os.path.join(MODELS_DIR, 'features.joblib')),
+    )
+
+
+class DashboardQueryCountTests(TestCase):
+    """Dashboard pages read the counters table, not the applications, for their totals"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(30):
+            create_application(
+                applicant_name=f'Applicant {i}',
+                loan_status=['Approved', 'Rejected', None][i % 3],
+                approval_probability=None if i % 3 == 2 else 40.0 + i,
+                education=['Graduate', 'Not Graduate'][i % 2],
+            )
+    
+    def test_home(self):
+        # One aggregate over the counters table
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_applications'], 30)
+    
+    def test_ml_analytics(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('ml_analytics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_applications'], 30)
+    
+    def test_admin_dashboard(self):
+        # The page of applications and the counters
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['matching_applications'], 30)
+    
+    def test_admin_dashboard_filtered(self):
+        # One more query: the filtered count
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('admin_dashboard'), {'education': 'Graduate'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['matching_applications'], 15)
+    
+    def test_admin_dashboard_does_not_grow_with_rows(self):
+        for i in range(30):
+            create_application(applicant_name=f'Extra {i}')
+        with self.assertNumQueries(2):
+            self.client.get(reverse('admin_dashboard'))
+
+
+class StatsCounterTests(TestCase):
+    """The counters table stays equal to live counts through every write path"""
+    
+    def test_no_drift_after_writes(self):
+        applications = [
+            create_application(applicant_name=f'Applicant {i}',
+                               loan_status=['Approved', 'Rejected', None][i % 3],
+                               approval_probability=None if i % 3 == 2 else 50.0 + i,
+                               property_area=['Urban', 'Semiurban', 'Rural'][i % 3])
+            for i in range(12)
+        ]
+        self.assertEqual(find_drift(), {})
+        
+        # Moves between status, education and probability buckets
+        applications[0].loan_status = 'Rejected'
+        applications[0].approval_probability = 12.5
+        applications[0].save()
+        applications[1].education = 'Not Graduate'
+        applications[1].save()
+        applications[2].approval_probability = 64.0
+        applications[2].save()
+        self.assertEqual(find_drift(), {})
+        
+        applications[3].delete()
+        LoanApplication.objects.filter(pk__in=[applications[4].pk, applications[5].pk]).delete()
+        self.assertEqual(find_drift(), {})
+        
+        loan_predictor.predict_many(LoanApplication.objects.all(), chunk_size=4, save=True)
+        self.assertEqual(find_drift(), {})
+        loan_predictor.predict_many(list(LoanApplication.objects.all()), save=True)
+        self.assertEqual(find_drift(), {})
+        
+        stats = get_application_stats()
+        self.assertEqual(stats['total'], 9)
+        self.assertEqual(stats['approved'] + stats['rejected'], 9)
+
+
+class QueryPlanTests(TestCase):
+    """Every dashboard/export filter combination is served by an index"""
+    
+    def test_queries_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('use an index', out.getvalue())
+    
+    def test_dropped_index_fails(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX loanapp_created_id_idx')
+        with self.assertRaises(CommandError):
+            call_command('check_query_plans', stdout=StringIO())
+
+
+class SearchIndexTests(TestCase):
+    """The applicant search index follows writes made after every migration"""
+    
+    def tearDown(self):
+        # Tests drop triggers inside the test transaction; forget what was seen
+        search._fts_ready.clear()
+    
+    def search(self, text):
+        return sorted(search_applications(LoanApplication.objects.all(), text).values_list('pk', flat=True))
+    
+    def test_new_and_edited_rows_are_found(self):
+        application = create_application(applicant_name='Zebulon Quux')
+        self.assertEqual(self.search('Zebulon'), [application.pk])
+        
+        application.applicant_name = 'Xavier Quux'
+        application.save()
+        self.assertEqual(self.search('Zebulon'), [])
+        self.assertEqual(self.search('Xavier'), [application.pk])
+    
+    def test_prefix_match(self):
+        self.assertTrue(uses_fts(connection))
+        zebulon = create_application(applicant_name='Zebulon Quux', loan_status='Approved')
+        zelda = create_application(applicant_name='Zelda Quinn', loan_status='Rejected')
+        self.assertEqual(self.search('Zeb'), [zebulon.pk])
+        self.assertEqual(self.search('ze qu'), [zebulon.pk, zelda.pk])
+        self.assertEqual(self.search('zel rej'), [zelda.pk])
+        # Prefixes only: no match inside a word
+        self.assertEqual(self.search('ulon'), [])
+    
+    def test_delete_removes_from_index(self):
+        application = create_application(applicant_name='Zebulon Quux')
+        application.delete()
+        self.assertEqual(self.search('Zebulon'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH 'zebulon'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+    
+    def test_icontains_fallback(self):
+        application = create_application(applicant_name='Zebulon Quux')
+        with mock.patch.object(search, 'uses_fts', return_value=False):
+            # Other databases match anywhere in the name
+            self.assertEqual(self.search('ulon'), [application.pk])
+            self.assertEqual(self.search('Zebulon'), [application.pk])
+    
+    def test_missing_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {FTS_TABLE}_insert')
+        search._fts_ready.clear()
+        self.assertFalse(uses_fts(connection))
+        # Not in the index, but still found through icontains
+        application = create_application(applicant_name='Zebulon Quux')
+        self.assertEqual(self.search('Zebulon'), [application.pk])
+        
+        # What post_migrate runs after every migrate
+        repair_search_index(using=connection.alias)
+        self.assertTrue(uses_fts(connection))
+        self.assertEqual(self.search('Zebulon'), [application.pk])
+
+
+@override_settings(LOAN_PREDICTOR_COMPILED=True)
+class CompiledScorerTests(SimpleTestCase):
+    """The compiled scorer gives the probabilities of scaler -> LogisticRegression.predict_proba"""
+    
+    def assert_matches_sklearn(self, bundle):
+        bundle.compile()
+        self.assertIsNotNone(bundle.compiled)
+        predictor = LoanPredictor()
+        applications = application_variants()
+        data = [predictor.preprocess_application(application) for application in applications]
+        compiled = np.array([bundle.compiled.probability(row) for row in data])
+        
+        reference = ModelBundle.__new__(ModelBundle)
+        reference.__dict__.update(bundle.__dict__, compiled=None)
+        expected = np.array([predictor._predict_with(reference, application)[0]['approval_probability'] / 100
+                             for application in applications])
+        self.assertTrue(np.allclose(compiled, expected, rtol=0, atol=1e-9))
+        
+        # The vectorized path agrees as well
+        X = np.array([bundle.compiled.feature_vector(row) for row in data])
+        self.assertTrue(np.allclose(bundle.compiled.probabilities(X), expected, rtol=0, atol=1e-9))
+    
+    def test_joblib_bundle(self):
+        self.assert_matches_sklearn(joblib_bundle())
+    
+    def test_serving_artifact(self):
+        bundle = ModelBundle.load_serving(os.path.join(MODELS_DIR, model_registry.SERVING_ARTIFACT), 'legacy')
+        bundle.models, bundle.encoders, bundle.scaler = bundle.build_estimators()
+        self.assert_matches_sklearn(bundle)
+
+
+class PredictManyTests(TestCase):
+    """predict_many() is predict() for many rows, and its writes keep the counters in sync"""
+    
+    def assert_same_results(self, batch, single):
+        self.assertEqual(len(batch), len(single))
+        for many, one in zip(batch, single):
+            self.assertEqual(many['approved'], one['approved'])
+            self.assertEqual(many['model_version'], one['model_version'])
+            self.assertAlmostEqual(many['approval_probability'], one['approval_probability'], places=9)
+            self.assertAlmostEqual(many['confidence'], one['confidence'], places=9)
+    
+    def test_matches_predict(self):
+        predictor = LoanPredictor()
+        applications = application_variants()
+        single = [predictor.predict(application) for application in applications]
+        self.assert_same_results(predictor.predict_many(applications, chunk_size=50), single)
+        
+        saved = [create_application(**application_fields(
+            dependents=dependents, applicant_income=income, property_area=area,
+        )) for dependents, income, area in itertools.product(['0', '3+'], [0, 2500, 9000], ['Urban', 'Rural'])]
+        self.assert_same_results(
+            predictor.predict_many(LoanApplication.objects.filter(pk__in=[a.pk for a in saved]).order_by('pk'),
+                                   chunk_size=5),
+            [predictor.predict(application) for application in saved],
+        )
+    
+    def test_save_keeps_counters_in_sync(self):
+        for i in range(25):
+            create_application(
+                applicant_name=f'Applicant {i}',
+                loan_status=['Approved', 'Rejected', None, 'Pending'][i % 4],
+                approval_probability=None if i % 4 >= 2 else 30.0 + i,
+                education=['Graduate', 'Not Graduate'][i % 2],
+                property_area=['Urban', 'Semiurban', 'Rural'][i % 3],
+                credit_history=i % 5 != 0,
+            )
+        results = LoanPredictor().predict_many(LoanApplication.objects.order_by('pk'), chunk_size=7, save=True)
+        
+        stored = list(LoanApplication.objects.order_by('pk').values_list(
+            'loan_status', 'approval_probability', 'model_version'))
+        self.assertEqual(stored, [
+            ('Approved' if result['approved'] else 'Rejected', result['approval_probability'], result['model_version'])
+            for result in results
+        ])
+        self.assertEqual(find_drift(), {})
+        self.assertEqual(
+            sum(bucket.count for bucket in LoanStatsBucket.objects.all()),
+            sum(counts[0] for counts in live_buckets().values()),
+        )
+        self.assertEqual(get_application_stats()['pending'], 0)
+    
+    def test_malformed_row_only_falls_back_itself(self):
+        predictor = LoanPredictor()
+        applications = application_variants()[:6]
+        applications.insert(2, LoanApplication(**application_fields(dependents='two')))
+        expected = [predictor.predict(application) for application in applications[:2] + applications[3:]]
+        
+        batcher = MicroBatcher(predictor, window=0.5)
+        futures = [batcher.submit(application) for application in applications]
+        for results in (predictor.predict_many(applications), [future.result() for future in futures]):
+            self.assertEqual(results[2]['model_version'], 'rule-based')
+            # The valid rows of the same batch keep their model probabilities
+            self.assert_same_results(results[:2] + results[3:], expected)
+            self.assertNotIn('rule-based', {result['model_version'] for result in expected})
+
+
+@override_settings(LOAN_PREDICTOR_COMPILED=False)
+class SklearnPredictManyTests(PredictManyTests):
+    """The same checks on the sklearn pipeline"""
+
+
+class RescoreResumeTests(TestCase):
+    """rescore_applications --resume picks up where an interrupted run stopped"""
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = os.path.join(directory.name, 'checkpoint.json')
+        self.applications = [create_application(applicant_name=f'Applicant {i}', loan_status=None,
+                                                approval_probability=None) for i in range(30)]
+    
+    def rescore(self, *args):
+        call_command('rescore_applications', '--workers', '1', '--range-size', '10',
+                     '--checkpoint', self.checkpoint, *args, stdout=StringIO())
+    
+    def test_interrupt_and_resume(self):
+        scored = []
+        score_range = rescore_applications.score_range
+        
+        def interrupted(start, end, *args):
+            if len(scored) == 2:
+                raise KeyboardInterrupt
+            scored.append((start, end))
+            return score_range(start, end, *args)
+        
+        with mock.patch.object(rescore_applications, 'score_range', interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                self.rescore()
+        with open(self.checkpoint) as f:
+            self.assertEqual(sorted(tuple(r) for r in json.load(f)['done']), scored)
+        
+        # Rows deleted at the low end and added at the top must not move the ranges
+        LoanApplication.objects.filter(pk=self.applications[0].pk).delete()
+        added = create_application(applicant_name='Late Applicant', loan_status=None, approval_probability=None)
+        
+        resumed = []
+        
+        def recording(start, end, *args):
+            resumed.append((start, end))
+            return score_range(start, end, *args)
+        
+        with mock.patch.object(rescore_applications, 'score_range', recording):
+            self.rescore('--resume')
+        self.assertFalse(set(resumed) & set(scored))
+        for start, end in resumed:
+            self.assertEqual(start % 10, 0)
+            self.assertEqual(end - start, 10)
+        
+        self.assertFalse(LoanApplication.objects.filter(loan_status__isnull=True).exists())
+        self.assertIn(added.pk, [pk for start, end in resumed for pk in range(start, end)])
+        self.assertFalse(os.path.exists(self.checkpoint))
+        self.assertEqual(find_drift(), {})
+
+
+class KeysetPaginationTests(TestCase):
+    """Pages walk (created_at, id) newest first without duplicates or gaps"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        LoanApplication.objects.bulk_create([
+            LoanApplication(**application_fields(applicant_name=f'Applicant {i}')) for i in range(40)
+        ])
+        # Groups of five rows share a created_at, so pages split inside ties
+        base = timezone.now()
+        for i, pk in enumerate(LoanApplication.objects.order_by('pk').values_list('pk', flat=True)):
+            LoanApplication.objects.filter(pk=pk).update(created_at=base - timedelta(minutes=i // 5))
+        cls.expected = list(LoanApplication.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+    
+    def test_api_walk(self):
+        seen = []
+        params = {'page_size': 7}
+        while True:
+            response = self.client.get(reverse('list_applications'), params)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertLessEqual(len(body['data']), 7)
+            seen.extend(row['id'] for row in body['data'])
+            if body['next_cursor'] is None:
+                break
+            params['cursor'] = body['next_cursor']
+        self.assertEqual(seen, self.expected)
+    
+    def test_dashboard_walk(self):
+        seen = []
+        url = reverse('admin_dashboard')
+        while url:
+            response = self.client.get(url)
+            seen.extend(application.pk for application in response.context['applications'])
+            next_page_url = response.context['next_page_url']
+            url = reverse('admin_dashboard') + next_page_url if next_page_url else None
+        self.assertEqual(seen, self.expected)
+    
+    def test_malformed_cursor(self):
+        for cursor in ['not-a-cursor', 'W10', 'WyJ4IiwgMV0']:
+            response = self.client.get(reverse('list_applications'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertFalse(response.json()['success'])
+        # The dashboard starts over at the first page instead
+        response = self.client.get(reverse('admin_dashboard'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([a.pk for a in response.context['applications']], self.expected)
+    
+    def test_page_size_bounds(self):
+        for page_size in ['0', '-3', 'many']:
+            response = self.client.get(reverse('list_applications'), {'page_size': page_size})
+            self.assertEqual(response.status_code, 400, page_size)
+        response = self.client.get(reverse('list_applications'), {'page_size': 1})
+        self.assertEqual([row['id'] for row in response.json()['data']], self.expected[:1])
+        
+        LoanApplication.objects.bulk_create([
+            LoanApplication(**application_fields()) for _ in range(MAX_PAGE_SIZE)
+        ])
+        body = self.client.get(reverse('list_applications'), {'page_size': MAX_PAGE_SIZE * 2}).json()
+        self.assertEqual(len(body['data']), MAX_PAGE_SIZE)
+        self.assertIsNotNone(body['next_cursor'])
+
+
+class ModelRegistryTests(SimpleTestCase):
+    """Publish, verify and activate versions; running predictors follow CURRENT"""
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        settings_override = override_settings(
+            LOAN_MODEL_REGISTRY=os.path.join(self.root, 'registry'), LOAN_MODEL_RELOAD_INTERVAL=0.01,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+    
+    def source(self, name, files):
+        path = os.path.join(self.root, name)
+        os.makedirs(path)
+        for file in files:
+            shutil.copy2(os.path.join(MODELS_DIR, file), path)
+        return path
+    
+    def probabilities(self, predictor):
+        return np.array([result['approval_probability']
+                         for result in predictor.predict_many(application_variants(), chunk_size=100)])
+    
+    def test_publish_activate_and_hot_swap(self):
+        joblib_source = self.source('joblib', model_registry.BUNDLE_FILES)
+        serving_source = self.source('serving', [model_registry.SERVING_ARTIFACT])
+        call_command('publish_model', '--source', joblib_source, '--name', 'v1', '--activate', stdout=StringIO())
+        call_command('publish_model', '--source', serving_source, '--name', 'v2', stdout=StringIO())
+        self.assertEqual(model_registry.list_versions(), ['v1', 'v2'])
+        self.assertEqual(model_registry.current_version(), 'v1')
+        
+        predictor = LoanPredictor()
+        predictor.load_models()
+        self.assertEqual(predictor.model_version, 'v1')
+        self.assertIsNone(predictor.bundle.artifact)
+        joblib_scores = self.probabilities(predictor)
+        
+        call_command('activate_model', 'v2', stdout=StringIO())
+        self.assertEqual(model_registry.current_version(), 'v2')
+        predictor._next_pointer_check = 0
+        predictor.check_for_new_version()
+        # Held by the reload thread until the swap is done
+        with predictor._reload_lock:
+            pass
+        self.assertEqual(predictor.model_version, 'v2')
+        self.assertIsNotNone(predictor.bundle.artifact)
+        # The pickle-free artifact scores like the joblib bundle it was exported from
+        self.assertTrue(np.allclose(self.probabilities(predictor), joblib_scores, rtol=0, atol=1e-7))
+    
+    def test_verify_rejects_tampered_and_unknown_versions(self):
+        call_command('publish_model', '--source', self.source('serving', [model_registry.SERVING_ARTIFACT]),
+                     '--name', 'v1', stdout=StringIO())
+        self.assertEqual(model_registry.verify('v1')['version'], 'v1')
+        with self.assertRaises(CommandError):
+            call_command('publish_model', '--source', os.path.join(self.root, 'serving'), '--name', 'v1',
+                         stdout=StringIO())
+        
+        with open(os.path.join(model_registry.bundle_dir('v1'), model_registry.SERVING_ARTIFACT), 'ab') as f:
+            f.write(b'tampered')
+        with self.assertRaises(CommandError):
+            call_command('activate_model', 'v1', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('activate_model', 'missing', stdout=StringIO())
+        self.assertIsNone(model_registry.current_version())
+
+
+class EagerLoadTests(SimpleTestCase):
+    def test_only_serving_entry_points_load_the_predictor(self):
+        config = apps.get_app_config('loan_predictor')
+        with mock.patch.object(config, 'load_predictor') as load:
+            config.ready()
+            load.assert_not_called()
+            
+            with override_settings(LOAN_PREDICTOR_EAGER_LOAD=False):
+                load_for_serving()
+            load.assert_not_called()
+            
+            with override_settings(LOAN_PREDICTOR_EAGER_LOAD=True):
+                load_for_serving()
+            load.assert_called_once_with()
+
+
+class ScoringEndpointTests(TestCase):
+    """api/score/ and api/score/batch/"""
+    
+    def payload(self, **overrides):
+        fields = application_fields(**overrides)
+        for field in ('loan_status', 'approval_probability'):
+            fields.pop(field)
+        return fields
+    
+    def expected(self, payload):
+        return loan_predictor.predict(LoanApplication(**payload))
+    
+    def post_batch(self, body, content_type, persist=False):
+        url = reverse('score_application_batch') + ('?persist=1' if persist else '')
+        response = self.client.post(url, body, content_type=content_type)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+    
+    def test_score_application(self):
+        payload = self.payload(dependents='3+', applicant_income=0)
+        # No CSRF token needed: the view stays exempt and async
+        response = Client(enforce_csrf_checks=True).post(
+            reverse('score_application'), json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['success'])
+        expected = self.expected(payload)
+        self.assertEqual(data['approved'], expected['approved'])
+        self.assertEqual(data['model_version'], expected['model_version'])
+        self.assertAlmostEqual(data['approval_probability'], expected['approval_probability'], places=9)
+        self.assertFalse(LoanApplication.objects.exists())
+    
+    async def test_score_application_async(self):
+        response = await self.async_client.post(
+            reverse('score_application'), json.dumps(self.payload()), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(json.loads(response.content)['success'])
+    
+    def test_score_application_rejects_bad_input(self):
+        url = reverse('score_application')
+        for body in ['{"gender": ', '[1, 2]']:
+            response = self.client.post(url, body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid JSON', response.json()['error'])
+        
+        response = self.client.post(url, json.dumps(self.payload(gender='Other')), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('gender', response.json()['errors'])
+        self.assertEqual(self.client.get(url).status_code, 405)
+    
+    def test_batch_ndjson(self):
+        payloads = [self.payload(), self.payload(dependents='3+', applicant_income=0)]
+        body = '\n'.join([json.dumps(payloads[0]), '{"gender": ', json.dumps(payloads[1]), '[]']) + '\n'
+        lines = [json.loads(line) for line in self.post_batch(body, 'application/x-ndjson').splitlines()]
+        
+        self.assertEqual([line['row'] for line in lines], [1, 2, 3, 4])
+        self.assertIn('errors', lines[1])
+        self.assertIn('errors', lines[3])
+        for line, payload in zip([lines[0], lines[2]], payloads):
+            expected = self.expected(payload)
+            self.assertEqual(line['approved'], expected['approved'])
+            self.assertAlmostEqual(line['approval_probability'], expected['approval_probability'], places=9)
+            self.assertNotIn('id', line)
+        self.assertFalse(LoanApplication.objects.exists())
+    
+    def test_batch_csv(self):
+        payloads = [self.payload(credit_history=False), self.payload(property_area='Rural')]
+        buffer = StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(payloads[0]))
+        writer.writeheader()
+        writer.writerows(payloads)
+        writer.writerow(self.payload(education='Unknown'))
+        
+        rows = list(csv.DictReader(StringIO(self.post_batch(buffer.getvalue(), 'text/csv'))))
+        self.assertEqual([row['row'] for row in rows], ['1', '2', '3'])
+        for row, payload in zip(rows, payloads):
+            expected = self.expected(payload)
+            self.assertEqual(row['approved'], str(expected['approved']))
+            self.assertAlmostEqual(float(row['approval_probability']), expected['approval_probability'], places=9)
+            self.assertEqual(row['errors'], '')
+        self.assertIn('education', json.loads(rows[2]['errors']))
+    
+    def test_batch_persist_is_staff_only_and_keeps_counters_in_sync(self):
+        create_application()
+        body = '\n'.join(json.dumps(self.payload(applicant_name=f'Batch {i}', credit_history=i % 2 == 0,
+                                                   education=['Graduate', 'Not Graduate'][i % 2]))
+                         for i in range(6))
+        url = reverse('score_application_batch') + '?persist=1'
+        self.assertEqual(self.client.post(url, body, content_type='application/x-ndjson').status_code, 403)
+        self.assertEqual(LoanApplication.objects.count(), 1)
+        
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        lines = [json.loads(line) for line in self.post_batch(body, 'application/x-ndjson', persist=True).splitlines()]
+        saved = LoanApplication.objects.in_bulk([line['id'] for line in lines])
+        self.assertEqual(len(saved), 6)
+        for line in lines:
+            application = saved[line['id']]
+            self.assertEqual(application.loan_status, 'Approved' if line['approved'] else 'Rejected')
+            self.assertEqual(application.approval_probability, line['approval_probability'])
+        self.assertEqual(find_drift(), {})
+        self.assertEqual(sum(bucket.count for bucket in LoanStatsBucket.objects.all()), 7)
+
+
+class ScoringQueueTests(TestCase):
+    """Queued applications are scored exactly once, whichever worker claims them"""
+    
+    def setUp(self):
+        self.scored = []
+        self.racing_worker = None
+        predict_many = loan_predictor.predict_many
+        
+        def score(applications, *args, **kwargs):
+            self.scored.extend(application.pk for application in applications)
+            # Another worker runs while this one holds its claim, before it writes
+            racing_worker, self.racing_worker = self.racing_worker, None
+            if racing_worker is not None:
+                racing_worker()
+            return predict_many(applications, *args, **kwargs)
+        patcher = mock.patch.object(loan_predictor, 'predict_many', side_effect=score)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def queue_applications(self, count, model_version=QUEUED_VERSION):
+        return [create_application(applicant_name=f'Queued {i}', loan_status='Pending',
+                                   approval_probability=None, model_version=model_version).pk
+                for i in range(count)]
+    
+    def claim(self, age):
+        return f'{CLAIM_PREFIX}{int(time.time() - age)}:1:1'
+    
+    def assert_scored(self, pks):
+        self.assertEqual(sorted(self.scored), sorted(pks))
+        for application in LoanApplication.objects.filter(pk__in=pks):
+            self.assertIn(application.loan_status, ('Approved', 'Rejected'))
+            self.assertNotEqual(application.model_version, QUEUED_VERSION)
+            self.assertFalse(application.model_version.startswith(CLAIM_PREFIX))
+        self.assertEqual(find_drift(), {})
+    
+    def assert_claimed(self, pk):
+        self.assertTrue(LoanApplication.objects.get(pk=pk).model_version.startswith(CLAIM_PREFIX))
+    
+    @override_settings(LOAN_SCORING_MODE='thread')
+    def test_thread_mode(self):
+        scoring_queue = ScoringQueue(batch_size=100, linger=0)
+        # Worker threads are driven by hand below
+        scoring_queue._pid = os.getpid()
+        form = {field: value for field, value in application_fields().items()
+                if field not in ('loan_status', 'approval_probability')}
+        with mock.patch.object(views, 'scoring_queue', scoring_queue), self.captureOnCommitCallbacks(execute=True):
+            for i in range(4):
+                self.client.post(reverse('loan_application'), {**form, 'applicant_name': f'Form {i}'})
+        pks = [scoring_queue.queue.get_nowait() for _ in range(4)]
+        self.assertTrue(scoring_queue.queue.empty())
+        self.assertEqual(LoanApplication.objects.filter(pk__in=pks, model_version=QUEUED_VERSION).count(), 4)
+        stale = self.queue_applications(1, self.claim(age=CLAIM_TIMEOUT + 60))
+        fresh = self.queue_applications(1, self.claim(age=0))
+        
+        # A second worker handed the same pks while the first has them claimed
+        self.racing_worker = lambda: scoring_queue.score(pks + stale + fresh)
+        scoring_queue.score(pks + stale + fresh)
+        self.assert_scored(pks)
+        for pk in pks:
+            self.assertTrue(scoring_queue.wait_for_result(pk, timeout=0))
+        # Scored rows submitted again are skipped
+        scoring_queue.score(pks)
+        self.assert_scored(pks)
+        
+        # Claims are only taken back once stale, then any worker can score them
+        self.assert_claimed(stale[0])
+        self.assertEqual(release_stale_claims(), 1)
+        scoring_queue.score(stale + fresh)
+        self.assert_scored(pks + stale)
+        self.assert_claimed(fresh[0])
+    
+    @override_settings(LOAN_SCORING_MODE='db')
+    def test_db_mode_score_pending(self):
+        form = {field: value for field, value in application_fields().items()
+                if field not in ('loan_status', 'approval_probability')}
+        for i in range(4):
+            self.client.post(reverse('loan_application'), {**form, 'applicant_name': f'Form {i}'})
+        pks = list(LoanApplication.objects.filter(model_version=QUEUED_VERSION).values_list('pk', flat=True))
+        self.assertEqual(len(pks), 4)
+        pks += self.queue_applications(6)
+        stale = self.queue_applications(2, self.claim(age=CLAIM_TIMEOUT + 60))
+        fresh = self.queue_applications(1, self.claim(age=0))
+        
+        # A second score_pending starts while the first has its first batch claimed
+        self.racing_worker = lambda: call_command('score_pending', '--once', '--batch-size', '3', stdout=StringIO())
+        out = StringIO()
+        call_command('score_pending', '--once', '--batch-size', '3', stdout=out)
+        self.assert_scored(pks + stale)
+        self.assert_claimed(fresh[0])
+        self.assertIn('Scored 3 applications', out.getvalue())
+        
+        call_command('score_pending', '--once', stdout=out)
+        self.assert_scored(pks + stale)
+
+
+@override_settings(LOAN_MODEL_RELOAD_INTERVAL=0)
+class PredictionCacheTests(SimpleTestCase):
+    def predictor(self, cache):
+        predictor = LoanPredictor(cache=cache)
+        self.activate(predictor, joblib_bundle())
+        # Count the predictions actually scored
+        patcher = mock.patch.object(predictor, '_predict_with', wraps=predictor._predict_with)
+        self.scored = patcher.start()
+        self.addCleanup(patcher.stop)
+        return predictor
+    
+    def activate(self, predictor, bundle):
+        bundle.compile()
+        predictor.bundle = bundle
+        predictor._models_loaded = True
+    
+    def test_new_bundle_invalidates_cached_results(self):
+        predictor = self.predictor(PredictionCache(100))
+        application = application_variants()[7]
+        legacy = predictor.predict(application)
+        self.assertEqual(predictor.predict(application), legacy)
+        self.assertEqual(self.scored.call_count, 1)
+        
+        # A new version with the same parameters
+        bundle = joblib_bundle()
+        bundle.version = 'v2'
+        self.activate(predictor, bundle)
+        result = predictor.predict(application)
+        self.assertEqual(self.scored.call_count, 2)
+        self.assertEqual(result['model_version'], 'v2')
+        self.assertEqual(len(predictor.cache.entries), 1)
+        
+        # Retrained files that keep the 'legacy' version
+        bundle = joblib_bundle()
+        bundle.models['logistic_regression'].intercept_ = bundle.models['logistic_regression'].intercept_ + 1
+        self.activate(predictor, bundle)
+        retrained = predictor.predict(application)
+        self.assertEqual(self.scored.call_count, 3)
+        self.assertEqual(retrained['model_version'], 'legacy')
+        self.assertGreater(retrained['approval_probability'], legacy['approval_probability'])
+        self.assertEqual(predictor.predict(application), retrained)
+        self.assertEqual(self.scored.call_count, 3)
+        
+        # A result scored by a bundle replaced meanwhile is not cached
+        application = application_variants()[8]
+        cached, entry = predictor.cached_prediction(application)
+        self.assertIsNone(cached)
+        stale = predictor.predict(application)
+        self.activate(predictor, joblib_bundle())
+        self.assertIsNone(predictor.cached_prediction(application)[0])
+        predictor.cache_prediction(entry, stale)
+        self.assertEqual(len(predictor.cache.entries), 0)
+        self.assertNotEqual(predictor.predict(application), stale)
+        self.assertEqual(self.scored.call_count, 5)
+    
+    def test_size_zero_bypasses_the_cache(self):
+        with override_settings(LOAN_PREDICTION_CACHE_SIZE=0):
+            self.assertIsNone(prediction_cache_from_settings())
+        predictor = self.predictor(None)
+        application = application_variants()[7]
+        self.assertEqual(predictor.predict(application), predictor.predict(application))
+        self.assertEqual(self.scored.call_count, 2)
+        self.assertEqual(predictor.cached_prediction(application), (None, None))
+        
+        with override_settings(LOAN_PREDICTION_CACHE_SIZE=3):
+            cache = prediction_cache_from_settings()
+        predictor = self.predictor(cache)
+        applications = application_variants()[:4]
+        for application in applications + applications[-1:]:
+            predictor.predict(application)
+        self.assertEqual(self.scored.call_count, 4)
+        # The least recently used result was evicted
+        self.assertEqual(len(cache.entries), 3)
+        predictor.predict(applications[0])
+        self.assertEqual(self.scored.call_count, 5)
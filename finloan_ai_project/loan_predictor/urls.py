@@ -10,9 +10,14 @@ urlpatterns = [
     path('ml-analytics/', views.ml_analytics_view, name='ml_analytics'),
     
     # CRUD API endpoints
+    path('api/applications/', views.list_applications, name='list_applications'),
     path('api/application/<int:pk>/', views.get_application_data, name='get_application_data'),
     path('api/application/<int:pk>/update/', views.update_application, name='update_application'),
     path('api/application/<int:pk>/delete/', views.delete_application, name='delete_application'),
     path('export-csv/', views.export_applications_csv, name='export_csv'),
+    path('api/models/', views.model_versions, name='model_versions'),
+    path('api/score/', views.score_application, name='score_application'),
+    path('api/score/batch/', views.score_application_batch, name='score_application_batch'),
+    path('metrics', views.metrics_view, name='metrics'),
     
 ]
@@ -1,50 +1,63 @@
+from asgiref.sync import markcoroutinefunction
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.db.models import Q, Count
-from django.db import models
-from django.http import HttpResponse, JsonResponse
+from django.db import models, transaction
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 import json
-import csv
 from datetime import datetime
 from .models import LoanApplication
-from .forms import LoanApplicationForm
+from .exports import ARROW_AVAILABLE, EXPORT_FORMATS, export_rows, gzip_stream
+from .filters import filter_applications
+from .forms import LoanApplicationForm, LoanScoringForm
+from . import metrics, model_registry
+from .pagination import MAX_PAGE_SIZE, PAGE_SIZE, InvalidCursor, keyset_page
+from .scoring_queue import QUEUED_VERSION, is_waiting, scoring_mode, scoring_queue
+from .search import search_applications
+from .stats import aget_application_stats, get_application_stats
+import logging
 import os
 import sys
 
 # Add the parent directory to the path to import ml_predictor
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+logger = logging.getLogger(__name__)
+
+# Fields returned by the JSON list API
+API_FIELDS = [
+    'id', 'applicant_name', 'gender', 'married', 'dependents', 'education',
+    'self_employed', 'applicant_income', 'coapplicant_income', 'loan_amount',
+    'loan_amount_term', 'credit_history', 'property_area', 'loan_status',
+    'approval_probability', 'model_version', 'created_at',
+]
+
 # Try to import the ML predictor
 try:
     from .ml_predictor import loan_predictor
+    from .batching import micro_batcher
+    from .bulk_scoring import CONTENT_TYPES, WRITERS, async_blocks, score_stream
     ML_AVAILABLE = True
-    print("ML models loaded successfully!")
 except ImportError as e:
-    print(f"ML models not available: {e}")
+    logger.warning("ML models not available: %s", e)
     ML_AVAILABLE = False
 
-def home(request):
+async def home(request):
     """SIMPLE DEBUG VERSION"""
-    from django.db.models import Q
-    
-    # Get actual counts
-    all_apps = LoanApplication.objects.all()
-    total = all_apps.count()
-    approved = all_apps.filter(loan_status='Approved').count()  
-    rejected = all_apps.filter(loan_status='Rejected').count()
-    
-    # Calculate rate
-    rate = round((approved/total)*100, 1) if total > 0 else 0
+    stats = await aget_application_stats()
     
-    print(f"DEBUG: total={total}, approved={approved}, rejected={rejected}, rate={rate}")
+    logger.debug("Home stats: total=%s, approved=%s, rejected=%s, rate=%s",
+                 stats['total'], stats['approved'], stats['rejected'], stats['approval_rate'])
     
     context = {
-        'total_applications': total,
-        'approved_applications': approved, 
-        'rejected_applications': rejected,
-        'approval_rate': rate,
+        'total_applications': stats['total'],
+        'approved_applications': stats['approved'], 
+        'rejected_applications': stats['rejected'],
+        'approval_rate': stats['approval_rate'],
     }
     
     return render(request, 'loan_predictor/home.html', context)
@@ -54,17 +67,28 @@ def loan_application_view(request):
     if request.method == 'POST':
         form = LoanApplicationForm(request.POST)
         if form.is_valid():
+            if scoring_mode() != 'sync':
+                # Save once as Pending; a worker scores it (see scoring_queue.py)
+                application = form.save(commit=False)
+                application.loan_status = 'Pending'
+                application.model_version = QUEUED_VERSION
+                application.save()
+                if scoring_mode() == 'thread':
+                    transaction.on_commit(lambda: scoring_queue.submit(application.pk))
+                return redirect('loan_result', pk=application.pk)
+            
             application = form.save()
             
             # Run ML prediction if available
             if ML_AVAILABLE:
                 try:
-                    prediction_result = loan_predictor.predict(application)
+                    prediction_result = micro_batcher.predict(application)
                     application.approval_probability = prediction_result['approval_probability']
                     application.loan_status = 'Approved' if prediction_result['approved'] else 'Rejected'
+                    application.model_version = prediction_result['model_version']
                     application.save()
-                except Exception as e:
-                    print(f"ML prediction error: {e}")
+                except Exception:
+                    logger.exception("ML prediction error")
                     application.loan_status = 'Pending'
                     application.save()
             else:
@@ -81,24 +105,15 @@ def ml_analytics_view(request):
     """Display ML Analytics Dashboard with real statistics"""
     
     # Get the same statistics as home page
-    applications = LoanApplication.objects.all()
-    total_applications = applications.count()
-    approved_applications = applications.filter(loan_status='Approved').count()
-    rejected_applications = applications.filter(loan_status='Rejected').count()
-    
-    # Calculate approval rate
-    if total_applications > 0:
-        approval_rate = round((approved_applications / total_applications) * 100, 1)
-    else:
-        approval_rate = 0
+    stats = get_application_stats()
     
     context = {
         'page_title': 'ML Analytics Dashboard',
         # Real statistics data
-        'total_applications': total_applications,
-        'approved_applications': approved_applications, 
-        'rejected_applications': rejected_applications,
-        'approval_rate': approval_rate,
+        'total_applications': stats['total'],
+        'approved_applications': stats['approved'], 
+        'rejected_applications': stats['rejected'],
+        'approval_rate': stats['approval_rate'],
         # ML model data (static for now)
         'models_performance': {
             'logistic_regression': 86,
@@ -115,9 +130,27 @@ def ml_analytics_view(request):
     }
     return render(request, 'loan_predictor/ml_analytics.html', context)
 
-def loan_result_view(request, pk):
+async def loan_result_view(request, pk):
     """Enhanced loan result view with detailed analysis"""
-    application = get_object_or_404(LoanApplication, pk=pk)
+    application = await LoanApplication.objects.filter(pk=pk).afirst()
+    if application is None:
+        raise Http404("No LoanApplication matches the given query.")
+    
+    # Long-poll briefly for a queued application; the page refreshes itself
+    # after that, up to LOAN_SCORING_RESULT_REFRESHES times (?wait counts them)
+    scoring = scoring_mode() != 'sync' and is_waiting(application)
+    refresh_url = None
+    if scoring:
+        if await scoring_queue.await_result(pk, getattr(settings, 'LOAN_SCORING_RESULT_WAIT', 1.0)):
+            await application.arefresh_from_db()
+            scoring = False
+        else:
+            try:
+                refreshes = max(int(request.GET.get('wait', 0)), 0)
+            except ValueError:
+                refreshes = 0
+            if refreshes < getattr(settings, 'LOAN_SCORING_RESULT_REFRESHES', 30):
+                refresh_url = f'?wait={refreshes + 1}'
     
     # Calculate additional insights
     total_income = application.applicant_income + (application.coapplicant_income or 0)
@@ -138,88 +171,60 @@ def loan_result_view(request, pk):
         'loan_income_ratio': loan_income_ratio,
         'monthly_payment': monthly_payment,
         'risk_level': risk_level,
+        'scoring': scoring,
+        'refresh_url': refresh_url,
     }
     
     return render(request, 'loan_predictor/result.html', context)
 
 def admin_dashboard_view(request):
     """Enhanced admin dashboard view with comprehensive filtering"""
-    from django.db.models import Q, Count, Avg
-    
-    # Get all applications
-    applications = LoanApplication.objects.all()
-    
-    # Apply search filter
-    search_query = request.GET.get('search', '')
-    if search_query:
-        applications = applications.filter(
-            Q(applicant_name__icontains=search_query) |
-            Q(loan_status__icontains=search_query)
-        )
-    
-    # Apply status filter
-    status_filter = request.GET.get('status', '')
-    if status_filter:
-        if status_filter == 'Pending':
-            applications = applications.filter(
-                Q(loan_status__isnull=True) | Q(loan_status='') | Q(loan_status='Pending')
-            )
-        else:
-            applications = applications.filter(loan_status=status_filter)
+    matching, filters = filter_applications(request.GET)
     
-    # Apply education filter
-    education_filter = request.GET.get('education', '')
-    if education_filter:
-        applications = applications.filter(education=education_filter)
-    
-    # Apply property area filter
-    property_area_filter = request.GET.get('property_area', '')
-    if property_area_filter:
-        applications = applications.filter(property_area=property_area_filter)
-    
-    # Order by most recent first
-    applications = applications.order_by('-created_at')
+    # Most recent first, one keyset page at a time
+    cursor = request.GET.get('cursor', '')
+    try:
+        applications, next_cursor = keyset_page(matching, cursor)
+    except InvalidCursor:
+        cursor = ''
+        applications, next_cursor = keyset_page(matching)
+    
+    next_page_url = first_page_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_page_url = f'?{params.urlencode()}'
+    if cursor:
+        params = request.GET.copy()
+        params.pop('cursor', None)
+        first_page_url = f'?{params.urlencode()}'
     
     # FIXED: Calculate comprehensive statistics (for all applications, not filtered)
-    all_applications = LoanApplication.objects.all()
-    total_applications = all_applications.count()
-    
-    # Count each status separately with safe defaults
-    approved_count = all_applications.filter(loan_status='Approved').count()
-    rejected_count = all_applications.filter(loan_status='Rejected').count()
-    pending_count = all_applications.filter(
-        Q(loan_status__isnull=True) | Q(loan_status='') | Q(loan_status='Pending')
-    ).count()
+    stats = get_application_stats()
     
-    # Calculate approval rate safely
-    if total_applications > 0:
-        approval_rate = round((approved_count / total_applications) * 100, 1)
-    else:
-        approval_rate = 0
-    
-    # Calculate average ML accuracy if available
-    apps_with_probability = all_applications.exclude(approval_probability__isnull=True)
-    if apps_with_probability.exists():
-        avg_accuracy = round(apps_with_probability.aggregate(
-            avg_prob=Avg('approval_probability')
-        )['avg_prob'] or 0, 1)
+    # Average ML probability if available
+    if stats['avg_probability'] is not None:
+        avg_accuracy = round(stats['avg_probability'], 1)
     else:
         avg_accuracy = 86  # Default ML accuracy
     
+    # Unfiltered, the counters already hold the total
+    filtered = any(filters.values())
+    
     context = {
         'applications': applications,
-        'total_applications': total_applications,
-        'approved_applications': approved_count,
-        'rejected_applications': rejected_count,
-        'pending_applications': pending_count,
-        'approval_rate': approval_rate,
+        'matching_applications': matching.count() if filtered else stats['total'],
+        'total_applications': stats['total'],
+        'approved_applications': stats['approved'],
+        'rejected_applications': stats['rejected'],
+        'pending_applications': stats['pending'],
+        'approval_rate': stats['approval_rate'],
         'ml_accuracy': avg_accuracy,
         
         # Pass filter values back to template
-        'search_query': search_query,
-        'status_filter': status_filter,
-        'education_filter': education_filter,
-        'property_area_filter': property_area_filter,
+        **filters,
+        'next_page_url': next_page_url,
+        'first_page_url': first_page_url,
     }
     
     return render(request, 'loan_predictor/admin_dashboard.html', context)
@@ -227,11 +232,15 @@ def admin_dashboard_view(request):
    
 # CRUD API ENDPOINTS
 
-@require_http_methods(["GET"])
-def get_application_data(request, pk):
+async def get_application_data(request, pk):
     """Get application data for editing"""
+    # require_http_methods only wraps sync views before Django 5.0
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
     try:
-        application = get_object_or_404(LoanApplication, pk=pk)
+        application = await LoanApplication.objects.filter(pk=pk).afirst()
+        if application is None:
+            raise Http404("No LoanApplication matches the given query.")
         data = {
             'id': application.id,
             'applicant_name': application.applicant_name,
@@ -248,11 +257,44 @@ def get_application_data(request, pk):
             'property_area': application.property_area,
             'loan_status': application.loan_status or 'Pending',
             'approval_probability': application.approval_probability,
+            'model_version': application.model_version,
         }
         return JsonResponse({'success': True, 'data': data})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+@require_http_methods(["GET"])
+def list_applications(request):
+    """Filtered applications as JSON, newest first, with keyset pagination.
+
+    With ?search=...&order=relevance the best matches come first instead.
+    """
+    applications, filters = filter_applications(request.GET)
+    try:
+        page_size = min(int(request.GET.get('page_size', PAGE_SIZE)), MAX_PAGE_SIZE)
+        if page_size < 1:
+            raise ValueError(page_size)
+        
+        if request.GET.get('order') == 'relevance' and filters['search_query']:
+            # Best search matches first; a single page, no cursor
+            params = request.GET.copy()
+            params.pop('search')
+            applications, _ = filter_applications(params)
+            ranked = search_applications(applications, filters['search_query'], ranked=True)
+            rows, next_cursor = list(ranked.values(*API_FIELDS)[:page_size]), None
+        else:
+            rows, next_cursor = keyset_page(
+                applications.values(*API_FIELDS), request.GET.get('cursor'), page_size
+            )
+    except (InvalidCursor, ValueError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    for row in rows:
+        row['loan_status'] = row['loan_status'] or 'Pending'
+        row['created_at'] = row['created_at'].isoformat()
+    
+    return JsonResponse({'success': True, 'data': rows, 'next_cursor': next_cursor})
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def update_application(request, pk):
@@ -280,13 +322,14 @@ def update_application(request, pk):
         if any(key in data for key in ['applicant_income', 'coapplicant_income', 'loan_amount', 'credit_history']):
             if ML_AVAILABLE:
                 try:
-                    prediction_result = loan_predictor.predict(application)
+                    prediction_result = micro_batcher.predict(application)
                     application.approval_probability = prediction_result['approval_probability']
+                    application.model_version = prediction_result['model_version']
                     # Only update status if not manually set
                     if not data.get('loan_status') or data.get('loan_status') == 'Pending':
                         application.loan_status = 'Approved' if prediction_result['approved'] else 'Rejected'
-                except Exception as e:
-                    print(f"ML prediction error during update: {e}")
+                except Exception:
+                    logger.exception("ML prediction error during update")
         
         application.save()
         
@@ -314,75 +357,117 @@ def delete_application(request, pk):
         return JsonResponse({'success': False, 'error': str(e)})
 
 def export_applications_csv(request):
-    """Export applications to CSV with current filters"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="finloan_applications_{datetime.now().strftime("%Y%m%d_%H%M")}.csv"'
-    
-    writer = csv.writer(response)
-    
-    # Write header
-    writer.writerow([
-        'ID', 'Applicant Name', 'Gender', 'Married', 'Dependents', 'Education', 
-        'Self Employed', 'Applicant Income', 'Coapplicant Income', 'Loan Amount', 
-        'Loan Term', 'Credit History', 'Property Area', 'Status', 'ML Probability', 
-        'Total Income', 'Loan-Income Ratio', 'Date Created'
-    ])
+    """Export applications with current filters.
+
+    ?format= selects csv (default), ndjson, parquet or arrow (Arrow IPC
+    stream); parquet and arrow need pyarrow and keep numeric column types.
+    Rows are streamed from a chunked values_list() iterator, so memory stays
+    flat however many applications match. Add ?gzip=1 to compress on the fly.
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'success': False, 'error': f'Unknown export format: {export_format}'}, status=400)
+    stream_function, content_type, extension, needs_arrow = EXPORT_FORMATS[export_format]
+    if needs_arrow and not ARROW_AVAILABLE:
+        return JsonResponse({'success': False, 'error': f'{export_format} export requires pyarrow'}, status=501)
     
     # Apply same filters as dashboard
-    applications = LoanApplication.objects.all()
-    
-    # Apply search filter
-    search_query = request.GET.get('search', '')
-    if search_query:
-        applications = applications.filter(
-            Q(applicant_name__icontains=search_query) |
-            Q(loan_status__icontains=search_query)
-        )
+    applications, _ = filter_applications(request.GET)
+    stream = stream_function(export_rows(applications.order_by('-created_at')))
+    filename = f'finloan_applications_{datetime.now().strftime("%Y%m%d_%H%M")}.{extension}'
     
-    # Apply status filter
-    status_filter = request.GET.get('status', '')
-    if status_filter:
-        if status_filter == 'Pending':
-            applications = applications.filter(
-                Q(loan_status__isnull=True) | Q(loan_status='') | Q(loan_status='Pending')
-            )
-        else:
-            applications = applications.filter(loan_status=status_filter)
-    
-    # Apply education filter
-    education_filter = request.GET.get('education', '')
-    if education_filter:
-        applications = applications.filter(education=education_filter)
+    if request.GET.get('gzip'):
+        response = StreamingHttpResponse(gzip_stream(stream), content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     
-    # Apply property area filter
-    property_area_filter = request.GET.get('property_area', '')
-    if property_area_filter:
-        applications = applications.filter(property_area=property_area_filter)
+    return response
+
+# Before Django 5.0 csrf_exempt returns a sync wrapper; keep it an async view
+@markcoroutinefunction
+@csrf_exempt
+async def score_application(request):
+    """Score JSON applicant data without saving anything.
+
+    Accepts the LoanApplicationForm fields (applicant_name optional) and
+    returns the decision. Inference runs in the micro-batcher or on its
+    bounded thread pool, so the event loop keeps serving other requests.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    if not ML_AVAILABLE:
+        return JsonResponse({'success': False, 'error': 'ML models not available'}, status=503)
     
-    # Write data rows
-    for app in applications.order_by('-created_at'):
-        total_income = app.applicant_income + (app.coapplicant_income or 0)
-        loan_income_ratio = (app.loan_amount * 1000) / total_income if total_income > 0 else 0
-        
-        writer.writerow([
-            app.id,
-            app.applicant_name or 'N/A',
-            app.gender or 'N/A',
-            app.married or 'N/A',
-            app.dependents or 'N/A',
-            app.education or 'N/A',
-            app.self_employed or 'N/A',
-            app.applicant_income or 0,
-            app.coapplicant_income or 0,
-            app.loan_amount or 0,
-            app.loan_amount_term or 360,
-            'Yes' if app.credit_history else 'No',
-            app.property_area or 'N/A',
-            app.loan_status or 'Pending',
-            f"{app.approval_probability:.1f}%" if app.approval_probability else 'N/A',
-            total_income,
-            f"{loan_income_ratio:.2f}",
-            app.created_at.strftime('%Y-%m-%d %H:%M:%S') if hasattr(app, 'created_at') else 'N/A'
-        ])
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError("expected a JSON object")
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': f'Invalid JSON: {e}'}, status=400)
+    
+    form = LoanScoringForm(data)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'error': 'Invalid application',
+                             'errors': form.errors.get_json_data()}, status=400)
+    
+    result = await micro_batcher.apredict(form.save(commit=False))
+    return JsonResponse({'success': True, **result})
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def score_application_batch(request):
+    """Score a streamed NDJSON or CSV body of applications (see bulk_scoring.py).
+
+    The format comes from the Content-Type (application/x-ndjson, text/csv)
+    or ?format=ndjson|csv, and results are streamed back in the same format,
+    one per input row. ?persist=1 also saves the valid rows (staff only,
+    like model_versions; scoring alone writes nothing).
+    """
+    persist = request.GET.get('persist') in ('1', 'true')
+    if persist and not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Staff access required'}, status=403)
+    if not ML_AVAILABLE:
+        return JsonResponse({'success': False, 'error': 'ML models not available'}, status=503)
+    input_format = request.GET.get('format') or CONTENT_TYPES.get(request.content_type)
+    if input_format not in WRITERS:
+        return JsonResponse({'success': False, 'error': 'Send application/x-ndjson or text/csv'}, status=415)
+    
+    blocks = score_stream(request, input_format, persist=persist)
+    if isinstance(request, ASGIRequest):
+        blocks = async_blocks(blocks)
+    return StreamingHttpResponse(blocks, content_type=WRITERS[input_format].content_type)
+
+@require_http_methods(["GET", "POST"])
+def model_versions(request):
+    """List registry versions, or activate one with POST {"version": ...}.
+
+    Activation moves the registry pointer and swaps this process to the new
+    bundle immediately; other workers follow within LOAN_MODEL_RELOAD_INTERVAL.
+    Staff only.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Staff access required'}, status=403)
     
-    return response
+    if request.method == 'POST':
+        try:
+            version = json.loads(request.body).get('version')
+            model_registry.activate(version)
+            if ML_AVAILABLE:
+                loan_predictor.swap_to(version)
+        except (ValueError, AttributeError, model_registry.RegistryError) as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'current': model_registry.current_version(),
+        'loaded': loan_predictor.model_version if ML_AVAILABLE else None,
+        'versions': model_registry.list_versions(),
+    })
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for this process's prediction and request metrics"""
+    if not getattr(settings, 'LOAN_METRICS_ENABLED', True):
+        raise Http404
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
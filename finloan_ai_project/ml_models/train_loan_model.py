@@ -1,7 +1,19 @@
+import argparse
+import hashlib
+import json
 import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
+from joblib import Parallel, delayed
+from scipy.stats import loguniform, randint
+from sklearn.base import clone
+from sklearn.model_selection import (
+    ParameterGrid, ParameterSampler, StratifiedKFold, train_test_split
+)
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
@@ -11,12 +23,83 @@ import joblib
 import warnings
 warnings.filterwarnings('ignore')
 
+CATEGORICAL_COLS = ['Gender', 'Married', 'Dependents', 'Education', 'Self_Employed', 'Property_Area']
+
+# Bump when load_and_preprocess_data or encode_features change, so cached
+# feature matrices are rebuilt
+PREPROCESS_VERSION = 1
+
+# Search spaces for --search grid and --search random
+PARAM_GRIDS = {
+    'logistic_regression': {'C': [0.01, 0.1, 1.0, 10.0]},
+    'random_forest': {'n_estimators': [100, 200], 'max_depth': [None, 8, 16], 'min_samples_leaf': [1, 5]},
+    'svm': {'C': [0.1, 1.0, 10.0], 'gamma': ['scale', 0.01, 0.1]},
+}
+PARAM_DISTRIBUTIONS = {
+    'logistic_regression': {'C': loguniform(1e-3, 1e2)},
+    'random_forest': {
+        'n_estimators': randint(50, 300), 'max_depth': [None, 4, 8, 16, 32],
+        'min_samples_leaf': randint(1, 20),
+    },
+    'svm': {'C': loguniform(1e-2, 1e2), 'gamma': loguniform(1e-3, 1e0)},
+}
+
+SCALED_MODELS = ['svm', 'logistic_regression']
+# RBF SVM training is quadratic in rows, so it is fitted on a stratified
+# sample of at most this many rows
+MAX_FIT_ROWS = {'svm': 10000}
+# Random forest trees are grown on bootstrap samples of at most this many
+# rows, so forest size and fit time stop growing with the dataset
+FOREST_MAX_SAMPLES = 100000
+# Test rows used for the accuracy report
+MAX_TEST_ROWS = 50000
+
+
+def dataset_hash(csv_path):
+    """sha256 of the dataset file and PREPROCESS_VERSION"""
+    digest = hashlib.sha256(f'preprocess-v{PREPROCESS_VERSION}'.encode())
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stratified_sample(indices, y, rows, random_state=42):
+    """At most `rows` of `indices`, keeping the class balance of y"""
+    if rows is None or len(indices) <= rows:
+        return indices
+    sample, _ = train_test_split(indices, train_size=rows, stratify=y[indices], random_state=random_state)
+    return np.sort(sample)
+
+
+def forest_max_samples(rows):
+    """max_samples for a random forest fitted on `rows` rows"""
+    return FOREST_MAX_SAMPLES if rows > FOREST_MAX_SAMPLES else None
+
+
+def fit_and_score(estimator, params, X, y, train, test):
+    """Fit one CV fold; returns (accuracy, fit seconds)"""
+    model = clone(estimator).set_params(**params)
+    start = time.perf_counter()
+    model.fit(X[train], y[train])
+    return model.score(X[test], y[test]), time.perf_counter() - start
+
+
 class LoanPredictor:
     def __init__(self):
         self.models = {}
         self.encoders = {}
         self.scaler = StandardScaler()
         self.feature_names = []
+        self.timings = {}
+        self.search_results = {}
+        
+    @contextmanager
+    def stage(self, name):
+        """Record the wall time of a training stage in self.timings"""
+        start = time.perf_counter()
+        yield
+        self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
         
     def load_and_preprocess_data(self, csv_path):
         """Load and preprocess the loan dataset"""
@@ -52,10 +135,7 @@ class LoanPredictor:
         print("=== ENCODING FEATURES ===")
         df_encoded = df.copy()
         
-        # Categorical columns to encode
-        categorical_cols = ['Gender', 'Married', 'Dependents', 'Education', 'Self_Employed', 'Property_Area']
-        
-        for col in categorical_cols:
+        for col in CATEGORICAL_COLS:
             le = LabelEncoder()
             df_encoded[col] = le.fit_transform(df_encoded[col])
             self.encoders[col] = le
@@ -68,8 +148,72 @@ class LoanPredictor:
         print("Encoding completed!")
         return df_encoded
     
-    def train_models(self, df_encoded):
-        """Train multiple ML models"""
+    def load_encoded(self, csv_path, cache_dir=None):
+        """load_and_preprocess_data + encode_features, cached by dataset hash.
+
+        The encoded frame and encoder classes are kept in cache_dir as an
+        .npz named after dataset_hash(), so retraining on an unchanged file
+        skips parsing and encoding. cache_dir=None disables the cache.
+        """
+        cache_path = None
+        if cache_dir:
+            with self.stage('hash'):
+                key = dataset_hash(csv_path)
+            cache_path = os.path.join(cache_dir, f'encoded_{key[:16]}.npz')
+            if os.path.exists(cache_path):
+                with self.stage('load_cache'):
+                    df_encoded = self.load_cached(cache_path)
+                print(f"=== LOADED ENCODED FEATURES FROM CACHE ({cache_path}) ===")
+                return df_encoded
+        
+        with self.stage('load_and_preprocess'):
+            df = self.load_and_preprocess_data(csv_path)
+        with self.stage('encode'):
+            df_encoded = self.encode_features(df)
+        if cache_path:
+            with self.stage('save_cache'):
+                self.save_cached(cache_path, df_encoded)
+        return df_encoded
+    
+    def save_cached(self, path, df_encoded):
+        arrays = {'columns': np.array(df_encoded.columns, dtype=str)}
+        for i, col in enumerate(df_encoded.columns):
+            arrays[f'column_{i}'] = df_encoded[col].to_numpy()
+        for col, encoder in self.encoders.items():
+            arrays[f'classes_{col}'] = np.asarray(encoder.classes_, dtype=str)
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+    
+    def load_cached(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            columns = data['columns'].tolist()
+            df_encoded = pd.DataFrame({col: data[f'column_{i}'] for i, col in enumerate(columns)})
+            for col in CATEGORICAL_COLS + ['Loan_Status']:
+                encoder = LabelEncoder()
+                encoder.classes_ = data[f'classes_{col}'].astype(object)
+                self.encoders[col] = encoder
+        return df_encoded
+    
+    def candidates(self, name, search, n_iter, random_state=42):
+        """Parameter sets to cross-validate for one model"""
+        if search == 'grid':
+            return list(ParameterGrid(PARAM_GRIDS[name]))
+        if search == 'random':
+            return list(ParameterSampler(PARAM_DISTRIBUTIONS[name], n_iter, random_state=random_state))
+        return [{}]
+    
+    def train_models(self, df_encoded, n_jobs=1, search=None, n_iter=10, search_rows=None, cv=5):
+        """Train multiple ML models.
+
+        Every (model, parameter set, CV fold) fit runs as one task in a single
+        joblib pool of n_jobs workers, so models, candidates and folds all run
+        in parallel. search is None (defaults only), 'grid' or 'random';
+        search_rows caps the rows used for cross-validation. Each model is
+        then refitted with its best parameters on the training split.
+        """
         print("=== TRAINING ML MODELS ===")
         
         # Prepare features and target
@@ -78,13 +222,19 @@ class LoanPredictor:
         self.feature_names = X.columns.tolist()
         
         # Split the data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        with self.stage('split'):
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=42, stratify=y
+            )
+            if len(y_test) > MAX_TEST_ROWS:
+                X_test, _, y_test, _ = train_test_split(
+                    X_test, y_test, train_size=MAX_TEST_ROWS, random_state=42, stratify=y_test
+                )
         
         # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        with self.stage('scale'):
+            X_train_scaled = self.scaler.fit_transform(X_train)
+            X_test_scaled = self.scaler.transform(X_test)
         
         # Initialize models
         models = {
@@ -93,33 +243,79 @@ class LoanPredictor:
             'svm': SVC(kernel='rbf', probability=True, random_state=42)
         }
         
+        # Use scaled data for SVM and Logistic Regression, original for Random Forest
+        X_raw = X_train.to_numpy()
+        y_values = y_train.to_numpy()
+        rows = np.arange(len(y_values))
+        
+        tasks = []
+        folds = StratifiedKFold(n_splits=cv)
+        for name, model in models.items():
+            X_cv = X_train_scaled if name in SCALED_MODELS else X_raw
+            cv_rows = stratified_sample(rows, y_values, min(search_rows or len(rows), MAX_FIT_ROWS.get(name, len(rows))))
+            estimator = model
+            if name == 'svm':
+                # CV only scores accuracy, so skip the SVM's Platt calibration
+                estimator = clone(model).set_params(probability=False)
+            elif name == 'random_forest':
+                smallest_fold = len(cv_rows) - -(-len(cv_rows) // cv)
+                estimator = clone(model).set_params(max_samples=forest_max_samples(smallest_fold))
+            for index, params in enumerate(self.candidates(name, search, n_iter)):
+                for train, test in folds.split(cv_rows, y_values[cv_rows]):
+                    tasks.append((name, index, params, delayed(fit_and_score)(
+                        estimator, params, X_cv, y_values, cv_rows[train], cv_rows[test]
+                    )))
+        
+        print(f"Cross-validating {len(tasks)} fits with n_jobs={n_jobs}...")
+        with self.stage('search'):
+            scores = Parallel(n_jobs=n_jobs)(task for *_, task in tasks)
+        
+        self.search_results = {}
+        for (name, index, params, _), (score, seconds) in zip(tasks, scores):
+            candidates = self.search_results.setdefault(name, {})
+            entry = candidates.setdefault(index, {'params': params, 'scores': [], 'fit_seconds': 0.0})
+            entry['scores'].append(score)
+            entry['fit_seconds'] += seconds
+        
         results = {}
         
-        # Train and evaluate each model
+        # Refit and evaluate each model
         for name, model in models.items():
-            print(f"\nTraining {name}...")
+            candidates = sorted(self.search_results[name].values(), key=lambda c: -np.mean(c['scores']))
+            self.search_results[name] = candidates
+            best = candidates[0]
+            cv_scores = np.array(best['scores'])
+            model.set_params(**best['params'])
+            print(f"\nTraining {name} {best['params'] or '(defaults)'}...")
             
-            # Use scaled data for SVM and Logistic Regression, original for Random Forest
-            if name in ['svm', 'logistic_regression']:
-                model.fit(X_train_scaled, y_train)
-                y_pred = model.predict(X_test_scaled)
-                y_prob = model.predict_proba(X_test_scaled)[:, 1]
-                
-                # Cross-validation with scaled data
-                cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5)
-            else:
-                model.fit(X_train, y_train)
-                y_pred = model.predict(X_test)
-                y_prob = model.predict_proba(X_test)[:, 1]
-                
-                # Cross-validation with original data
-                cv_scores = cross_val_score(model, X_train, y_train, cv=5)
+            X_fit, y_fit = (X_train_scaled if name in SCALED_MODELS else X_train), y_values
+            if name in MAX_FIT_ROWS:
+                fit_rows = stratified_sample(rows, y_values, MAX_FIT_ROWS[name])
+                X_fit = X_fit.iloc[fit_rows] if hasattr(X_fit, 'iloc') else X_fit[fit_rows]
+                y_fit = y_values[fit_rows]
+            with self.stage(f'fit.{name}'):
+                if name == 'random_forest':
+                    # Trees are built in parallel; reset so the saved model is single-threaded
+                    model.set_params(n_jobs=n_jobs, max_samples=forest_max_samples(len(y_fit)))
+                    model.fit(X_fit, y_fit)
+                    model.set_params(n_jobs=None)
+                else:
+                    model.fit(X_fit, y_fit)
+            
+            with self.stage(f'evaluate.{name}'):
+                if name in SCALED_MODELS:
+                    y_pred = model.predict(X_test_scaled)
+                    y_prob = model.predict_proba(X_test_scaled)[:, 1]
+                else:
+                    y_pred = model.predict(X_test)
+                    y_prob = model.predict_proba(X_test)[:, 1]
             
             # Calculate metrics
             accuracy = accuracy_score(y_test, y_pred)
             
             results[name] = {
                 'model': model,
+                'params': best['params'],
                 'accuracy': accuracy,
                 'cv_mean': cv_scores.mean(),
                 'cv_std': cv_scores.std(),
@@ -132,6 +328,40 @@ class LoanPredictor:
         self.models = models
         return results, X_test, y_test
     
+    def write_report(self, path, results, **run):
+        """Write stage timings, search results and scores as JSON"""
+        def plain(value):
+            return value.item() if isinstance(value, np.generic) else value
+        
+        report = {
+            **run,
+            'timings': {name: round(seconds, 4) for name, seconds in self.timings.items()},
+            'models': {
+                name: {
+                    'accuracy': result['accuracy'],
+                    'cv_mean': result['cv_mean'],
+                    'cv_std': result['cv_std'],
+                    'params': {k: plain(v) for k, v in result['params'].items()},
+                    'candidates': [
+                        {
+                            'params': {k: plain(v) for k, v in c['params'].items()},
+                            'cv_mean': float(np.mean(c['scores'])),
+                            'fit_seconds': round(c['fit_seconds'], 4),
+                        }
+                        for c in self.search_results[name]
+                    ],
+                }
+                for name, result in results.items()
+            },
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        
+        print("\n=== TIMING PER STAGE ===")
+        for name, seconds in self.timings.items():
+            print(f"{name:<28} {seconds:9.2f}s")
+        print(f"Report: {path}")
+    
     def get_feature_importance(self):
         """Get feature importance from Random Forest"""
         if 'random_forest' in self.models:
@@ -171,22 +401,75 @@ class LoanPredictor:
         joblib.dump(self.scaler, 'scaler.joblib')
         joblib.dump(self.feature_names, 'features.joblib')
         
+        self.save_serving_artifact()
+        
         print("✅ Models saved successfully!")
         print(f"   Saved in: {os.getcwd()}")
-        print("   Files: loan_models.joblib, encoders.joblib, scaler.joblib, features.joblib")
+        print("   Files: loan_models.joblib, encoders.joblib, scaler.joblib, features.joblib, loan_serving.npz")
+    
+    def load_saved_models(self, path=''):
+        """Load the joblib files written by save_models"""
+        self.models = joblib.load(os.path.join(path, 'loan_models.joblib'))
+        self.encoders = joblib.load(os.path.join(path, 'encoders.joblib'))
+        self.scaler = joblib.load(os.path.join(path, 'scaler.joblib'))
+        self.feature_names = joblib.load(os.path.join(path, 'features.joblib'))
+    
+    def save_serving_artifact(self, path='loan_serving.npz'):
+        """Save only what the web app needs to score, as a pickle-free .npz.
+
+        Logistic regression weights, scaler statistics, feature order and the
+        label encoder classes. Loading it needs neither sklearn nor unpickling
+        the random forest and SVM.
+        """
+        model = self.models['logistic_regression']
+        arrays = {
+            'format': np.array(1),
+            'feature_names': np.array(self.feature_names, dtype=str),
+            'coef': np.asarray(model.coef_, dtype=np.float64).ravel(),
+            'intercept': np.array(model.intercept_[0], dtype=np.float64),
+            'classes': np.asarray(model.classes_),
+            'mean': np.asarray(self.scaler.mean_, dtype=np.float64),
+            'scale': np.asarray(self.scaler.scale_, dtype=np.float64),
+        }
+        for col in CATEGORICAL_COLS:
+            arrays[f'classes_{col}'] = np.asarray(self.encoders[col].classes_, dtype=str)
+        
+        np.savez(path, **arrays)
+        print(f"   Serving artifact: {path} ({os.path.getsize(path) / 1024:.1f} KB)")
 
 
 # Training script
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train the loan approval models')
+    parser.add_argument('--data', default='../../data/loan_dataset.csv')
+    parser.add_argument('--n-jobs', type=int, default=1, help='Parallel workers, -1 for all cores')
+    parser.add_argument('--search', choices=['none', 'grid', 'random'], default='none')
+    parser.add_argument('--n-iter', type=int, default=10, help='Candidates per model for --search random')
+    parser.add_argument('--search-rows', type=int, default=50000,
+                        help='Training rows used for cross-validation')
+    parser.add_argument('--cache-dir', default=os.path.join(tempfile.gettempdir(), 'finloan_training_cache'))
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--report', default='training_report.json')
+    parser.add_argument('--serving-only', action='store_true',
+                        help='Only convert the saved joblib files into loan_serving.npz')
+    args = parser.parse_args()
+    
     # Initialize predictor
     predictor = LoanPredictor()
     
+    if args.serving_only:
+        predictor.load_saved_models()
+        predictor.save_serving_artifact()
+        sys.exit(0)
+    
     # Load and preprocess data
-    df = predictor.load_and_preprocess_data('../../data/loan_dataset.csv')
-    df_encoded = predictor.encode_features(df)
+    df_encoded = predictor.load_encoded(args.data, None if args.no_cache else args.cache_dir)
     
     # Train models
-    results, X_test, y_test = predictor.train_models(df_encoded)
+    results, X_test, y_test = predictor.train_models(
+        df_encoded, n_jobs=args.n_jobs, search=None if args.search == 'none' else args.search,
+        n_iter=args.n_iter, search_rows=args.search_rows,
+    )
     
     # Display results
     print("\n=== FINAL RESULTS ===")
@@ -200,7 +483,12 @@ if __name__ == "__main__":
         print(f"{feature}: {importance:.4f}")
     
     # Save models
-    predictor.save_models()
+    with predictor.stage('save'):
+        predictor.save_models()
+    predictor.write_report(
+        args.report, results, dataset=os.path.abspath(args.data), rows=len(df_encoded),
+        n_jobs=args.n_jobs, search=args.search,
+    )
     
     # Test prediction
     sample_data = {